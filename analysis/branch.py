@@ -0,0 +1,205 @@
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, List, TextIO
+
+import numpy as np
+
+from analysis.profiler import source_file
+from interpreter.classes import Branch, BranchFloat
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+class BranchTrace(Tracer):
+    '''Records the address and outcome of every conditional branch executed.'''
+
+    def __init__(self) -> None:
+        self.pcs = array('I')
+        self.taken = array('B')
+        self.targets = {}  # type: Dict[int, int]
+
+    def attach(self, inter) -> None:
+        self.text = inter.mem.text
+
+        # Branch targets, for the static predictor that takes backward branches
+        for addr, instr in inter.mem.text.items():
+            if type(instr) is Branch or type(instr) is BranchFloat:
+                target = inter.mem.getLabel(instr.label.name)
+                if target is not None:
+                    self.targets[int(addr)] = target
+
+    def step(self, inter, pc: int, instr) -> None:
+        if type(instr) is Branch or type(instr) is BranchFloat:
+            self.pcs.append(pc)
+            self.taken.append(inter.reg['pc'] != pc + 4)
+
+    def arrays(self):
+        '''The trace as numpy arrays of addresses and outcomes.'''
+        return np.frombuffer(self.pcs, dtype=np.uint32).astype(np.int64), np.frombuffer(self.taken, dtype=np.uint8).astype(bool)
+
+
+class Predictor(ABC):
+    '''Predicts a whole trace at once: predict returns the prediction for every branch of it.'''
+    name = ''
+
+    @abstractmethod
+    def predict(self, pcs: np.ndarray, taken: np.ndarray, trace: BranchTrace) -> np.ndarray:
+        pass
+
+
+class Static(Predictor):
+    '''Always taken, never taken, or backward taken/forward not taken (btfn).'''
+
+    def __init__(self, kind: str = 'btfn') -> None:
+        if kind not in ('taken', 'not-taken', 'btfn'):
+            raise ValueError('Static prediction must be taken, not-taken or btfn')
+        self.kind = self.name = kind
+
+    def predict(self, pcs: np.ndarray, taken: np.ndarray, trace: BranchTrace) -> np.ndarray:
+        if self.kind != 'btfn':
+            return np.full(len(pcs), self.kind == 'taken')
+
+        sites = np.unique(pcs)
+        backward = np.array([trace.targets.get(pc, pc + 4) <= pc for pc in sites.tolist()], dtype=bool)
+        return backward[np.searchsorted(sites, pcs)]
+
+
+class OneBit(Predictor):
+    '''A table of the last outcome of the branches mapping to each entry.'''
+
+    def __init__(self, entries: int = 1024) -> None:
+        self.entries = entries
+        self.name = f'1bit:{entries}'
+
+    def predict(self, pcs: np.ndarray, taken: np.ndarray, trace: BranchTrace) -> np.ndarray:
+        # The prediction is the previous outcome at the same entry, not taken at first
+        index = (pcs >> 2) % self.entries
+        order = np.argsort(index, kind='stable')
+        ordered = index[order]
+        previous = np.concatenate(([False], taken[order][:-1]))
+        previous[np.concatenate(([True], ordered[1:] != ordered[:-1]))] = False
+
+        prediction = np.empty(len(pcs), dtype=bool)
+        prediction[order] = previous
+        return prediction
+
+
+class TwoBit(Predictor):
+    '''A table of saturating counters, predicting taken at 2 and 3. Counters start weakly not taken.'''
+
+    def __init__(self, entries: int = 1024) -> None:
+        self.entries = entries
+        self.name = f'2bit:{entries}'
+
+    def indices(self, pcs: np.ndarray, taken: np.ndarray) -> List[int]:
+        return ((pcs >> 2) % self.entries).tolist()
+
+    def predict(self, pcs: np.ndarray, taken: np.ndarray, trace: BranchTrace) -> np.ndarray:
+        counters = bytearray([1]) * self.entries
+        prediction = bytearray(len(pcs))
+        for i, (entry, outcome) in enumerate(zip(self.indices(pcs, taken), taken.tolist())):
+            counter = counters[entry]
+            prediction[i] = counter >= 2
+            if outcome:
+                if counter < 3:
+                    counters[entry] = counter + 1
+            elif counter > 0:
+                counters[entry] = counter - 1
+        return np.frombuffer(prediction, dtype=np.uint8).astype(bool)
+
+
+class GShare(TwoBit):
+    '''Two bit counters indexed by the address xor the outcomes of the last history_bits branches.'''
+
+    def __init__(self, entries: int = 4096, history_bits: int = 12) -> None:
+        super().__init__(entries)
+        self.history_bits = history_bits
+        self.name = f'gshare:{entries}:{history_bits}'
+
+    def indices(self, pcs: np.ndarray, taken: np.ndarray) -> List[int]:
+        # The global history before each branch, as an integer of its last outcomes
+        history = np.zeros(len(pcs), dtype=np.int64)
+        outcomes = taken.astype(np.int64)
+        for age in range(1, self.history_bits + 1):
+            history[age:] |= outcomes[:-age] << (age - 1)
+        return (((pcs >> 2) ^ history) % self.entries).tolist()
+
+
+def parse_predictors(spec: str) -> List[Predictor]:
+    '''Build predictors from a spec like "btfn,1bit:1024,2bit:1024,gshare:4096:12"; empty for all of them.'''
+    if not spec:
+        spec = 'not-taken,taken,btfn,1bit,2bit,gshare'
+
+    predictors = []
+    for option in spec.split(','):
+        kind, *sizes = option.split(':')
+        sizes = [int(size) for size in sizes]
+        if kind in ('taken', 'not-taken', 'btfn'):
+            predictors.append(Static(kind))
+        elif kind == '1bit':
+            predictors.append(OneBit(*sizes))
+        elif kind == '2bit':
+            predictors.append(TwoBit(*sizes))
+        elif kind == 'gshare':
+            predictors.append(GShare(*sizes))
+        else:
+            raise ValueError(f'Unknown branch predictor {kind}')
+    return predictors
+
+
+def evaluate(trace: BranchTrace, predictors: List[Predictor]) -> Dict:
+    '''Mispredictions of each predictor on the trace, overall and per branch address.'''
+    pcs, taken = trace.arrays()
+    sites, site_index = np.unique(pcs, return_inverse=True)
+    results = {
+        'branches': len(pcs),
+        'sites': {int(pc): {'executed': int(executed), 'taken': int(count)}
+                  for pc, executed, count in zip(sites, np.bincount(site_index, minlength=len(sites)),
+                                                 np.bincount(site_index, weights=taken, minlength=len(sites)))},
+        'predictors': {},
+    }
+
+    for predictor in predictors:
+        wrong = predictor.predict(pcs, taken, trace) != taken
+        per_site = np.bincount(site_index, weights=wrong, minlength=len(sites))
+        results['predictors'][predictor.name] = {
+            'mispredictions': int(wrong.sum()),
+            'rate': float(wrong.mean()) if len(wrong) else 0.0,
+            'sites': {int(pc): int(count) for pc, count in zip(sites, per_site)},
+        }
+    return results
+
+
+def report(trace: BranchTrace, predictors: List[Predictor], out: TextIO = sys.stderr) -> None:
+    '''Print the misprediction rate of each predictor, overall and per branch.'''
+    results = evaluate(trace, predictors)
+    names = list(results['predictors'])
+
+    out.write(f'Branches: {results["branches"]}\n')
+    out.write(f'{"predictor":<20} {"mispredicted":>12} {"%":>7}\n')
+    for name, result in results['predictors'].items():
+        out.write(f'{name:<20} {result["mispredictions"]:12d} {100 * result["rate"]:7.2f}\n')
+
+    out.write(f'\n{"executed":>10} {"taken %":>8} ' + ' '.join(f'{name:>14}' for name in names) + '  branch (% mispredicted)\n')
+    for pc, site in results['sites'].items():
+        executed = site['executed']
+        rates = ' '.join(f'{100 * results["predictors"][name]["sites"][pc] / executed:14.2f}' for name in names)
+        instr = trace.text[str(pc)]
+        out.write(f'{executed:10d} {100 * site["taken"] / executed:8.2f} {rates}  '
+                  f'{source_file(instr.filetag.file_name)}:{instr.filetag.line_no}  {instr.original_text.strip()}\n')
@@ -0,0 +1,225 @@
+import random
+import sys
+from array import array
+from typing import Dict, List, Optional, TextIO
+
+import numpy as np
+
+from analysis.profiler import by_line, source_lines
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+POLICIES = ['lru', 'fifo', 'random']
+BATCH = 1 << 16  # Accesses buffered before they are simulated
+
+
+def log2(n: int, what: str) -> int:
+    if n <= 0 or n & (n - 1):
+        raise ValueError(f'{what} must be a power of 2')
+    return n.bit_length() - 1
+
+
+class Cache:
+    '''A set associative, write allocate cache.
+
+    Only the tags are simulated. Write-back caches count the dirty blocks they
+    evict as writes to memory, write-through caches count every store.'''
+
+    def __init__(self, name: str, size: int = 4096, assoc: int = 1, block_size: int = 16,
+                 policy: str = 'lru', write_back: bool = True, seed: int = 0) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f'Replacement policy must be one of {", ".join(POLICIES)}')
+        if size < assoc * block_size:
+            raise ValueError('Cache size must be at least associativity * block size')
+
+        self.name = name
+        self.size = size
+        self.assoc = assoc
+        self.block_size = block_size
+        self.policy = policy
+        self.write_back = write_back
+        self.block_bits = log2(block_size, 'Block size')
+        self.set_mask = (1 << log2(size // (assoc * block_size), 'Number of sets')) - 1
+        self.rng = random.Random(seed)
+
+        # Blocks of each set, the next victim first: least recently used or first filled
+        self.sets = [[] for _ in range(self.set_mask + 1)]  # type: List[List[int]]
+        self.dirty = set()
+
+        self.accesses = 0
+        self.misses = 0
+        self.writes = 0  # Stores (write-through) or dirty evictions (write-back) reaching memory
+        self.line_accesses = None  # type: Optional[np.ndarray]
+        self.line_misses = None  # type: Optional[np.ndarray]
+
+    def simulate(self, addrs: np.ndarray, slots: np.ndarray, stores: Optional[np.ndarray] = None) -> None:
+        '''Run a batch of accesses through the cache. slots is the pc slot of the instruction making each access.
+
+        An access to the block accessed just before it is a hit that leaves the
+        replacement order as it is under every policy, so only the first access
+        of each run of accesses to a block is simulated one by one.'''
+        if len(addrs) == 0:
+            return
+        blocks = addrs >> self.block_bits
+        starts = np.flatnonzero(np.concatenate(([True], blocks[1:] != blocks[:-1])))
+        if stores is not None:
+            run_stores = np.logical_or.reduceat(stores, starts)
+            if not self.write_back:
+                self.writes += int(np.count_nonzero(stores))
+        else:
+            run_stores = np.zeros(len(starts), dtype=bool)
+
+        sets, dirty, assoc, set_mask = self.sets, self.dirty, self.assoc, self.set_mask
+        lru = self.policy == 'lru'
+        fifo = self.policy == 'fifo'
+        write_back = self.write_back
+        missed = []
+        for i, block, store in zip(starts.tolist(), blocks[starts].tolist(), run_stores.tolist()):
+            ways = sets[block & set_mask]
+            if block in ways:
+                if lru:
+                    ways.remove(block)
+                    ways.append(block)
+            else:
+                missed.append(i)
+                if len(ways) == assoc:
+                    victim = ways.pop(0 if lru or fifo else self.rng.randrange(assoc))
+                    if victim in dirty:
+                        dirty.discard(victim)
+                        self.writes += 1
+                ways.append(block)
+            if store and write_back:
+                dirty.add(block)
+
+        self.accesses += len(addrs)
+        self.misses += len(missed)
+        if self.line_accesses is not None:
+            np.add.at(self.line_accesses, slots, 1)
+            np.add.at(self.line_misses, slots[missed], 1)
+
+    @property
+    def hits(self) -> int:
+        return self.accesses - self.misses
+
+    def stats(self) -> Dict:
+        return {
+            'size': self.size,
+            'assoc': self.assoc,
+            'block_size': self.block_size,
+            'policy': self.policy,
+            'write_back': self.write_back,
+            'accesses': self.accesses,
+            'hits': self.hits,
+            'misses': self.misses,
+            'miss_rate': self.misses / self.accesses if self.accesses else 0.0,
+            'memory_writes': self.writes,
+        }
+
+
+class CacheSim(Tracer):
+    '''Feeds instruction fetches to an L1 instruction cache and loads/stores to an L1 data cache.
+
+    Addresses are collected in arrays and simulated a batch at a time; call
+    flush (report does) to simulate what is left before reading the counts.'''
+
+    def __init__(self, icache: Optional[Cache] = None, dcache: Optional[Cache] = None) -> None:
+        self.icache = icache
+        self.dcache = dcache
+        self.fetches = array('I')
+        self.data = array('I')
+        self.data_slots = array('I')
+        self.data_stores = array('B')
+
+    def attach(self, inter) -> None:
+        self.base = inter.config.initial_pc
+        self.text = inter.mem.text
+        slots = (inter.mem.textPtr - self.base) >> 2
+        for cache in self.caches():
+            cache.line_accesses = np.zeros(slots, dtype=np.int64)
+            cache.line_misses = np.zeros(slots, dtype=np.int64)
+
+    def caches(self) -> List[Cache]:
+        return [cache for cache in (self.icache, self.dcache) if cache is not None]
+
+    def step(self, inter, pc: int, instr) -> None:
+        if self.icache is not None:
+            self.fetches.append(pc)
+            if len(self.fetches) >= BATCH:
+                self.flush()
+
+    def memory(self, inter, addr: int, size: int, store: bool) -> None:
+        if self.dcache is not None:
+            self.data.append(addr & 0xFFFFFFFF)
+            # Loads and stores don't change pc, so it already points past the instruction
+            self.data_slots.append((inter.reg['pc'] - 4 - self.base) >> 2)
+            self.data_stores.append(store)
+            if len(self.data) >= BATCH:
+                self.flush()
+
+    def flush(self) -> None:
+        '''Simulate the buffered accesses.'''
+        if self.fetches:
+            fetches = np.frombuffer(self.fetches, dtype=np.uint32).astype(np.int64)
+            self.icache.simulate(fetches, (fetches - self.base) >> 2)
+            self.fetches = array('I')
+
+        if self.data:
+            self.dcache.simulate(np.frombuffer(self.data, dtype=np.uint32).astype(np.int64),
+                                 np.frombuffer(self.data_slots, dtype=np.uint32).astype(np.int64),
+                                 np.frombuffer(self.data_stores, dtype=np.uint8).astype(bool))
+            self.data = array('I')
+            self.data_slots = array('I')
+            self.data_stores = array('B')
+
+    def report(self, out: TextIO = sys.stderr, limit: int = 10) -> None:
+        '''Print the counts of each cache and the source lines with the most misses.'''
+        self.flush()
+        sources = source_lines(self.text)
+        for cache in self.caches():
+            stats = cache.stats()
+            out.write(f'{cache.name}: {cache.size} bytes, {cache.assoc}-way, {cache.block_size} byte blocks, '
+                      f'{cache.policy}, {"write-back" if cache.write_back else "write-through"}\n')
+            out.write(f'  accesses {stats["accesses"]}  hits {stats["hits"]}  misses {stats["misses"]}  '
+                      f'miss rate {100 * stats["miss_rate"]:.2f}%  memory writes {stats["memory_writes"]}\n')
+
+            accesses = by_line(self.text, self.base, cache.line_accesses)
+            misses = by_line(self.text, self.base, cache.line_misses)
+            lines = sorted((line for line in misses if misses[line]), key=lambda line: -misses[line])[:limit]
+            if lines:
+                out.write(f'{"accesses":>12} {"misses":>12}  line\n')
+            for line in lines:
+                out.write(f'{accesses[line]:12d} {misses[line]:12d}  {line[0]}:{line[1]}  {sources[line].strip()}\n')
+            out.write('\n')
+
+
+def parse_cache(name: str, spec: str) -> Cache:
+    '''Build a cache from a spec like "size=4096,assoc=2,block=16,policy=lru,write=back".'''
+    options = {}
+    for option in filter(None, spec.split(',')):
+        key, _, value = option.partition('=')
+        if key in ('size', 'assoc', 'block'):
+            options['block_size' if key == 'block' else key] = int(value)
+        elif key == 'policy':
+            options['policy'] = value
+        elif key == 'write':
+            if value not in ('back', 'through'):
+                raise ValueError('write must be back or through')
+            options['write_back'] = value == 'back'
+        else:
+            raise ValueError(f'Unknown cache option {key}')
+    return Cache(name, **options)
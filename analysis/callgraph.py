@@ -0,0 +1,112 @@
+import sys
+from typing import Dict, List, TextIO, Tuple
+
+from interpreter.classes import Branch, JType
+from interpreter.debugger import is_call, is_return
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+Stack = Tuple[str, ...]  # Function names from the outermost call in
+
+
+class CallGraph(Tracer):
+    '''Follows calls with a shadow stack: jal/jalr push the target, jr $ra pops back to the caller.
+
+    Instructions are counted per call stack, which gives the collapsed stacks
+    flamegraph tools read; per-function totals are derived from them.'''
+
+    def __init__(self) -> None:
+        self.names = {}  # type: Dict[int, str]
+        self.stack = []  # (function, return address) of every call in progress
+        self.current = ()  # type: Stack
+        self.counts = {}  # type: Dict[Stack, int]
+        self.calls = {}  # type: Dict[Tuple[str, str], int]
+
+    def attach(self, inter) -> None:
+        mem = inter.mem
+        text_start = inter.config.initial_pc
+        # Labels in the text segment name the functions; the first one wins for an address with several
+        for label, addr in mem.labels.items():
+            if text_start <= addr < mem.textPtr:
+                self.names.setdefault(addr, label)
+
+        entry = self.name(inter.reg['pc'])
+        self.current = (entry,)
+        self.stack = [(entry, None)]
+
+    def name(self, addr: int) -> str:
+        return self.names.get(addr, f'0x{addr:08x}')
+
+    def step(self, inter, pc: int, instr) -> None:
+        # The instruction belongs to the function it executed in, including the call or return itself
+        current = self.current
+        self.counts[current] = self.counts.get(current, 0) + 1
+
+        if type(instr) is not JType and type(instr) is not Branch:
+            return
+
+        if is_call(instr):
+            if inter.reg['pc'] == pc + 4 and type(instr) is Branch:
+                return  # A branch and link that wasn't taken
+            callee = self.name(inter.reg['pc'])
+            edge = (current[-1], callee)
+            self.calls[edge] = self.calls.get(edge, 0) + 1
+            self.stack.append((callee, pc + 4))
+            self.current = current + (callee,)
+
+        elif is_return(instr):
+            # Pop back to the frame that returns there. A return that matches no call
+            # (e.g. $ra set by hand) leaves the stack alone.
+            ret = inter.reg['pc']
+            for depth in range(len(self.stack) - 1, 0, -1):
+                if self.stack[depth][1] == ret:
+                    del self.stack[depth:]
+                    self.current = current[:depth]
+                    break
+
+    def functions(self) -> List[Tuple[str, int, int, int]]:
+        '''(name, calls, inclusive count, exclusive count) of every function, by inclusive count.'''
+        inclusive = {}
+        exclusive = {}
+        for stack, count in self.counts.items():
+            exclusive[stack[-1]] = exclusive.get(stack[-1], 0) + count
+            # Recursive functions count once per stack
+            for name in set(stack):
+                inclusive[name] = inclusive.get(name, 0) + count
+
+        calls = {}
+        for (_, callee), count in self.calls.items():
+            calls[callee] = calls.get(callee, 0) + count
+
+        rows = [(name, calls.get(name, 0), total, exclusive.get(name, 0)) for name, total in inclusive.items()]
+        return sorted(rows, key=lambda row: -row[2])
+
+    def report(self, out: TextIO = sys.stderr) -> None:
+        '''Print the function table and the caller -> callee edges.'''
+        out.write(f'{"calls":>10} {"inclusive":>12} {"exclusive":>12}  function\n')
+        for name, calls, inclusive, exclusive in self.functions():
+            out.write(f'{calls:10d} {inclusive:12d} {exclusive:12d}  {name}\n')
+
+        out.write(f'\n{"calls":>10}  caller -> callee\n')
+        for (caller, callee), count in sorted(self.calls.items(), key=lambda item: -item[1]):
+            out.write(f'{count:10d}  {caller} -> {callee}\n')
+
+    def collapsed(self, out: TextIO) -> None:
+        '''Write a "outer;inner count" line per call stack, the input format of flamegraph.pl and speedscope.'''
+        for stack, count in self.counts.items():
+            out.write(f'{";".join(stack)} {count}\n')
@@ -0,0 +1,199 @@
+import os
+import sys
+from collections import OrderedDict
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from analysis.profiler import source_file
+from interpreter.classes import Branch, BranchFloat
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Outcomes seen at a branch, as bits
+TAKEN = 1
+NOT_TAKEN = 2
+
+# Coverage of a source file, as in an lcov tracefile:
+#     lines       {line: hits}
+#     branches    {(line, block, branch): hits, or None if the branch never executed}
+# where block numbers the branches of a line and branch is 0 for taken and 1 for not taken.
+# The hits of one run are 0 or 1, so after merging they count the runs.
+Record = Dict[str, Dict]
+
+
+class Coverage(Tracer):
+    '''Marks the instructions that execute and the outcomes of each branch, in bytearrays indexed by pc slot.'''
+
+    def __init__(self) -> None:
+        self.base = 0
+        self.executed = bytearray()
+        self.outcomes = bytearray()
+        self.is_branch = bytearray()
+
+    def attach(self, inter) -> None:
+        self.base = inter.config.initial_pc
+        self.text = inter.mem.text
+        slots = (inter.mem.textPtr - self.base) >> 2
+        self.executed = bytearray(slots)
+        self.outcomes = bytearray(slots)
+        self.is_branch = bytearray(type(self.text[str(self.base + 4 * slot)]) in (Branch, BranchFloat)
+                                   for slot in range(slots))
+
+    def step(self, inter, pc: int, instr) -> None:
+        slot = (pc - self.base) >> 2
+        self.executed[slot] = 1
+        if self.is_branch[slot]:
+            self.outcomes[slot] |= TAKEN if inter.reg['pc'] != pc + 4 else NOT_TAKEN
+
+    def merge(self, other: 'Coverage') -> None:
+        '''Add the coverage of another run of the same program.'''
+        if len(other.executed) != len(self.executed):
+            raise ValueError('Coverage of a different program')
+        for slot in range(len(self.executed)):
+            self.executed[slot] |= other.executed[slot]
+            self.outcomes[slot] |= other.outcomes[slot]
+
+    def records(self) -> Dict[str, Record]:
+        '''Coverage by source file. A line is covered if any of its instructions executed.'''
+        files = OrderedDict()  # type: Dict[str, Record]
+        blocks = {}  # type: Dict[Tuple[str, int], int]  # Branches seen so far on each line
+        for slot in range(len(self.executed)):
+            instr = self.text[str(self.base + 4 * slot)]
+            if type(instr) is str:
+                continue
+
+            file, line = source_file(instr.filetag.file_name), instr.filetag.line_no
+            record = files.setdefault(file, {'lines': OrderedDict(), 'branches': OrderedDict()})
+            executed = self.executed[slot]
+            record['lines'][line] = max(record['lines'].get(line, 0), executed)
+
+            if self.is_branch[slot]:
+                branches = record['branches']
+                block = blocks.get((file, line), 0)
+                blocks[(file, line)] = block + 1
+                outcomes = self.outcomes[slot]
+                branches[(line, block, 0)] = int(bool(outcomes & TAKEN)) if executed else None
+                branches[(line, block, 1)] = int(bool(outcomes & NOT_TAKEN)) if executed else None
+        return files
+
+    def report(self, out: TextIO = sys.stderr) -> None:
+        '''Print the line and branch coverage of each source file and the lines that never executed.'''
+        for file, record in self.records().items():
+            lines = record['lines']
+            hit = sum(1 for hits in lines.values() if hits)
+            out.write(f'{file}: lines {hit}/{len(lines)} ({100 * hit / len(lines):.2f}%)')
+            branches = record['branches']
+            if branches:
+                taken = sum(1 for hits in branches.values() if hits)
+                out.write(f'  branches {taken}/{len(branches)} ({100 * taken / len(branches):.2f}%)')
+            out.write('\n')
+
+            missed = [line for line, hits in lines.items() if not hits]
+            if missed:
+                out.write(f'  not executed: {ranges(missed)}\n')
+
+            partial = [line for line, block, branch in branches
+                       if branch == 0 and branches[(line, block, 0)] is not None
+                       and not (branches[(line, block, 0)] and branches[(line, block, 1)])]
+            if partial:
+                out.write(f'  branches taken one way only: {ranges(partial)}\n')
+
+    def write_lcov(self, out: TextIO, test_name: str = '') -> None:
+        write_lcov(self.records(), out, test_name)
+
+    def save(self, filename: str, test_name: str = '') -> None:
+        '''Add the coverage to an lcov tracefile, summed with the earlier runs saved under the same test name.'''
+        tests = OrderedDict()  # type: Dict[str, Dict[str, Record]]
+        if os.path.exists(filename):
+            with open(filename) as f:
+                tests = read_lcov(f)
+        tests[test_name] = merge_records(tests.get(test_name, {}), self.records())
+        with open(filename, 'w') as f:
+            for name, records in tests.items():
+                write_lcov(records, f, name)
+
+
+def ranges(lines: List[int]) -> str:
+    '''Line numbers as "3, 5-8".'''
+    parts = []
+    for line in sorted(set(lines)):
+        if parts and parts[-1][1] == line - 1:
+            parts[-1][1] = line
+        else:
+            parts.append([line, line])
+    return ', '.join(str(a) if a == b else f'{a}-{b}' for a, b in parts)
+
+
+def write_lcov(records: Dict[str, Record], out: TextIO, test_name: str = '') -> None:
+    '''Write coverage records in the lcov tracefile format, read by genhtml and most CI coverage tools.'''
+    for file, record in records.items():
+        out.write(f'TN:{test_name}\nSF:{os.path.abspath(file)}\n')
+        branches = record['branches']
+        for (line, block, branch), hits in branches.items():
+            out.write(f'BRDA:{line},{block},{branch},{"-" if hits is None else hits}\n')
+        out.write(f'BRF:{len(branches)}\nBRH:{sum(1 for hits in branches.values() if hits)}\n')
+
+        lines = record['lines']
+        for line, hits in lines.items():
+            out.write(f'DA:{line},{hits}\n')
+        out.write(f'LF:{len(lines)}\nLH:{sum(1 for hits in lines.values() if hits)}\nend_of_record\n')
+
+
+def read_lcov(f: TextIO) -> Dict[str, Dict[str, Record]]:
+    '''Read the line and branch records of an lcov tracefile by test name. Records of the same test and file are merged.'''
+    tests = OrderedDict()  # type: Dict[str, Dict[str, Record]]
+    test_name = ''
+    record = None  # type: Optional[Record]
+    for line in f:
+        key, _, value = line.strip().partition(':')
+        if key == 'TN':
+            test_name = value
+        elif key == 'SF':
+            files = tests.setdefault(test_name, OrderedDict())
+            record = files.setdefault(value, {'lines': OrderedDict(), 'branches': OrderedDict()})
+        elif key == 'DA' and record is not None:
+            number, hits = value.split(',')[:2]
+            record['lines'][int(number)] = record['lines'].get(int(number), 0) + int(hits)
+        elif key == 'BRDA' and record is not None:
+            number, block, branch, hits = value.split(',')
+            branch_key = (int(number), int(block), int(branch))
+            record['branches'][branch_key] = add_hits(record['branches'].get(branch_key),
+                                                      None if hits == '-' else int(hits))
+        elif key == 'end_of_record':
+            record = None
+    return tests
+
+
+def add_hits(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    # None (never executed) only if neither run executed the branch
+    if a is None:
+        return b
+    return a if b is None else a + b
+
+
+def merge_records(a: Dict[str, Record], b: Dict[str, Record]) -> Dict[str, Record]:
+    '''Coverage of two sets of runs, summing the hits of each line and branch.'''
+    merged = OrderedDict()  # type: Dict[str, Record]
+    for records in (a, b):
+        for file, record in records.items():
+            file = os.path.abspath(file)
+            into = merged.setdefault(file, {'lines': OrderedDict(), 'branches': OrderedDict()})
+            for line, hits in record['lines'].items():
+                into['lines'][line] = into['lines'].get(line, 0) + hits
+            for key, hits in record['branches'].items():
+                into['branches'][key] = add_hits(into['branches'].get(key), hits)
+    return merged
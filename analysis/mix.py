@@ -0,0 +1,126 @@
+import json
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Dict, TextIO
+
+from interpreter.classes import *
+from interpreter.tracer import ACCESS_WIDTH, Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+def instruction_class(instr: Instruction) -> str:
+    '''alu, fpu, load, store, branch, jump, syscall or other.'''
+    op = instr.operation
+    kind = type(instr)
+    if kind is LoadMem:
+        return 'load' if op[0] == 'l' else 'store'
+    if kind is Branch or kind is BranchFloat:
+        return 'branch'
+    if kind is JType:
+        return 'jump'
+    if kind is Syscall:
+        return 'syscall'
+    if kind in (Compare, Convert, MoveFloat) or op[-2:] in ('.s', '.d'):
+        return 'fpu'
+    if kind in (RType, IType, LoadImm, Move, MoveCond):
+        return 'alu'
+    return 'other'
+
+
+class InstructionMix(Tracer):
+    '''Counts executions and taken branches per pc slot.
+
+    Every slot holds one instruction, so the counts by opcode, class and
+    access width are sums over the slots, computed when the report is made.'''
+
+    def __init__(self) -> None:
+        self.base = 0
+        self.counts = array('Q')
+        self.taken = array('Q')
+
+    def attach(self, inter) -> None:
+        self.base = inter.config.initial_pc
+        slots = (inter.mem.textPtr - self.base) >> 2
+        self.counts = array('Q', bytes(8 * slots))
+        self.taken = array('Q', bytes(8 * slots))
+        self.text = inter.mem.text
+
+    def step(self, inter, pc: int, instr: Instruction) -> None:
+        slot = (pc - self.base) >> 2
+        self.counts[slot] += 1
+        # A taken branch doesn't continue with the next instruction
+        if (type(instr) is Branch or type(instr) is BranchFloat) and inter.reg['pc'] != pc + 4:
+            self.taken[slot] += 1
+
+    def stats(self) -> Dict:
+        '''The dynamic counts by opcode, by class, of branches and of memory accesses by width.'''
+        opcodes = {}
+        classes = OrderedDict((name, 0) for name in ['alu', 'fpu', 'load', 'store', 'branch', 'jump', 'syscall', 'other'])
+        branches = {'taken': 0, 'not_taken': 0}
+        loads = {}
+        stores = {}
+
+        for slot, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            instr = self.text[str(self.base + 4 * slot)]
+            op = instr.operation
+            opcodes[op] = opcodes.get(op, 0) + count
+
+            kind = instruction_class(instr)
+            classes[kind] += count
+            if kind == 'branch':
+                branches['taken'] += self.taken[slot]
+                branches['not_taken'] += count - self.taken[slot]
+            elif kind == 'load' or kind == 'store':
+                widths = loads if kind == 'load' else stores
+                width = ACCESS_WIDTH[op]
+                widths[width] = widths.get(width, 0) + count
+
+        return {
+            'total': sum(classes.values()),
+            'opcodes': OrderedDict(sorted(opcodes.items(), key=lambda item: -item[1])),
+            'classes': classes,
+            'branches': branches,
+            'loads': OrderedDict(sorted(loads.items())),
+            'stores': OrderedDict(sorted(stores.items())),
+        }
+
+    def report(self, out: TextIO = sys.stderr, fmt: str = 'table') -> None:
+        '''Print the statistics as a table, or as JSON if fmt is 'json'.'''
+        stats = self.stats()
+        if fmt == 'json':
+            json.dump(stats, out, indent=2)
+            out.write('\n')
+            return
+
+        total = stats['total'] or 1
+
+        def section(title: str, counts: Dict) -> None:
+            out.write(f'{title:<12} {"count":>12} {"%":>7}\n')
+            for name, count in counts.items():
+                out.write(f'{str(name):<12} {count:12d} {100 * count / total:7.2f}\n')
+            out.write('\n')
+
+        out.write(f'Instructions: {stats["total"]}\n\n')
+        section('class', stats['classes'])
+        section('branch', stats['branches'])
+        section('load bytes', stats['loads'])
+        section('store bytes', stats['stores'])
+        section('opcode', stats['opcodes'])
@@ -0,0 +1,219 @@
+import sys
+from array import array
+from typing import Dict, List, TextIO, Tuple
+
+from analysis.profiler import by_line, source_lines
+from interpreter.classes import *
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+FLAGS = 'cc'  # The floating point condition flags, as one register
+BRANCH = 1
+JUMP = 2
+SYSCALL_READS = ('$v0', '$a0', '$a1', '$a2', '$a3', '$f12', '$f13')
+
+
+def _regs(*names: str) -> List[str]:
+    regs = []
+    for name in names:
+        if name is not None and name not in ('$zero', '$0'):
+            regs.append(name)
+    return regs
+
+
+def _float(regs: List[str], op: str) -> List[str]:
+    # Doubles also use the odd register of the pair
+    if op[-2:] == '.d' or op in ('cvt.s.d', 'cvt.w.d'):
+        regs = regs + [f'$f{int(reg[2:]) + 1}' for reg in regs if reg.startswith('$f')]
+    return regs
+
+
+def operands(instr: Instruction) -> Tuple[List[str], List[str]]:
+    '''The registers instr reads and the registers it writes.'''
+    kind = type(instr)
+    op = instr.operation
+
+    if kind is RType or kind is MoveFloat:
+        if op == 'mfc1':
+            return _regs(instr.rt), _regs(instr.rs)
+        if op == 'mtc1':
+            return _regs(instr.rs), _regs(instr.rt)
+        if hasattr(instr, 'rd'):
+            return _float(_regs(instr.rs, instr.rt), op), _float(_regs(instr.rd), op)
+        if op in ('mult', 'multu', 'div', 'divu'):
+            return _regs(instr.rs, instr.rt), ['hi', 'lo']
+        if op in ('madd', 'maddu', 'msub', 'msubu'):
+            return _regs(instr.rs, instr.rt, 'hi', 'lo'), ['hi', 'lo']
+        # Two register forms write rs
+        return _float(_regs(instr.rt), op), _float(_regs(instr.rs), op)
+
+    if kind is Compare:
+        return _float(_regs(instr.rs, instr.rt), op), [FLAGS]
+    if kind is Convert:
+        return _float(_regs(instr.rs), op), _regs(instr.rt)
+    if kind is IType:
+        return _regs(instr.rs), _regs(instr.rt)
+    if kind is LoadImm:
+        return [], _regs(instr.rt)
+    if kind is LoadMem:
+        if op[0] == 's':
+            return _float(_regs(instr.rs, instr.rt), op), []
+        reads = _regs(instr.rs, instr.rt) if op in ('lwl', 'lwr') else _regs(instr.rs)
+        return reads, _float(_regs(instr.rt), op)
+    if kind is Branch:
+        return _regs(instr.rs, instr.rt), ['$ra'] if 'al' in op else []
+    if kind is BranchFloat:
+        return [FLAGS], []
+    if kind is Move:
+        return _regs(instr.rs), _regs(instr.rd)
+    if kind is MoveCond:
+        return _float(_regs(instr.rs), op) + [FLAGS], _float(_regs(instr.rt), op)
+    if kind is JType:
+        reads = [] if type(instr.target) is Label else _regs(instr.target)
+        return reads, ['$ra'] if op in ('jal', 'jalr') else []
+    if kind is Syscall:
+        return list(SYSCALL_READS), ['$v0']
+    return [], []
+
+
+class Pipeline(Tracer):
+    '''Estimates the cycles of the run on the classic 5-stage pipeline (IF ID EX MEM WB), without delay slots.
+
+    Each instruction enters ID one cycle after the one before it, unless it
+    reads a register that isn't available yet (a RAW hazard; a load-use
+    hazard if a load produces it) or follows a taken branch or a jump, which
+    costs branch_penalty cycles. With forwarding, results are available to
+    the next instruction's EX stage, after EX for ALU instructions and after
+    MEM for loads. Without it, they can be read in ID the cycle they are
+    written back.'''
+
+    def __init__(self, forwarding: bool = True, branch_penalty: int = 1) -> None:
+        self.forwarding = forwarding
+        self.branch_penalty = branch_penalty
+        self.alu_latency = 1 if forwarding else 3
+        self.load_latency = 2 if forwarding else 3
+
+        self.issue = 1  # Cycle at which the last instruction entered ID
+        self.penalty = 0  # Bubbles before the next instruction, after a taken branch
+        self.ready = {}  # type: Dict[str, Tuple[int, bool]]  # register -> (first cycle it can be read in ID, written by a load)
+        self.instructions = 0
+
+    def attach(self, inter) -> None:
+        self.base = inter.config.initial_pc
+        self.text = inter.mem.text
+        slots = (inter.mem.textPtr - self.base) >> 2
+        self.decoded = [None] * slots
+        self.raw = array('Q', bytes(8 * slots))
+        self.load_use = array('Q', bytes(8 * slots))
+        self.branch = array('Q', bytes(8 * slots))
+
+        for slot in range(slots):
+            instr = self.text[str(self.base + 4 * slot)]
+            if type(instr) is not str:
+                reads, writes = operands(instr)
+                # Jumps are always taken, even to the next instruction
+                control = JUMP if type(instr) is JType else BRANCH if type(instr) in (Branch, BranchFloat) else 0
+                self.decoded[slot] = (reads, writes, type(instr) is LoadMem and instr.operation[0] == 'l', control)
+
+    def step(self, inter, pc: int, instr: Instruction) -> None:
+        slot = (pc - self.base) >> 2
+        reads, writes, load, control = self.decoded[slot]
+
+        issue = self.issue + 1 + self.penalty
+
+        # Wait for the operands
+        ready = self.ready
+        earliest = issue
+        from_load = False
+        for reg in reads:
+            if reg in ready:
+                cycle, loaded = ready[reg]
+                if cycle > earliest:
+                    earliest, from_load = cycle, loaded
+        if earliest > issue:
+            if from_load:
+                self.load_use[slot] += earliest - issue
+            else:
+                self.raw[slot] += earliest - issue
+            issue = earliest
+
+        latency = self.load_latency if load else self.alu_latency
+        for reg in writes:
+            ready[reg] = (issue + latency, load)
+
+        self.issue = issue
+        # The bubbles after a taken branch are charged to the branch
+        if control == JUMP or (control == BRANCH and inter.reg['pc'] != pc + 4):
+            self.penalty = self.branch_penalty
+            self.branch[slot] += self.branch_penalty
+        else:
+            self.penalty = 0
+        self.instructions += 1
+
+    @property
+    def cycles(self) -> int:
+        # The first instruction is fetched at cycle 1 and the last one is written back 3 cycles after its ID
+        return self.issue + 3 if self.instructions else 0
+
+    def stats(self) -> Dict:
+        stalls = {'raw': sum(self.raw), 'load_use': sum(self.load_use), 'branch': sum(self.branch)}
+        return {
+            'instructions': self.instructions,
+            'cycles': self.cycles,
+            'cpi': self.cycles / self.instructions if self.instructions else 0.0,
+            'stalls': stalls,
+        }
+
+    def report(self, out: TextIO = sys.stderr, limit: int = 20) -> None:
+        '''Print the cycle count, CPI and the stall cycles by kind and by source line.'''
+        stats = self.stats()
+        stalls = stats['stalls']
+        out.write(f'5-stage pipeline, {"with" if self.forwarding else "without"} forwarding, '
+                  f'{self.branch_penalty} cycle branch penalty\n')
+        out.write(f'  instructions {stats["instructions"]}  cycles {stats["cycles"]}  CPI {stats["cpi"]:.3f}\n')
+        out.write(f'  stalls: RAW {stalls["raw"]}  load-use {stalls["load_use"]}  branch {stalls["branch"]}\n')
+
+        raw = by_line(self.text, self.base, self.raw)
+        load_use = by_line(self.text, self.base, self.load_use)
+        branch = by_line(self.text, self.base, self.branch)
+        total = {line: raw[line] + load_use[line] + branch[line] for line in raw}
+        lines = sorted((line for line in total if total[line]), key=lambda line: -total[line])[:limit]
+        if not lines:
+            return
+
+        sources = source_lines(self.text)
+        out.write(f'\n{"RAW":>10} {"load-use":>10} {"branch":>10}  line\n')
+        for line in lines:
+            out.write(f'{raw[line]:10d} {load_use[line]:10d} {branch[line]:10d}  '
+                      f'{line[0]}:{line[1]}  {sources[line].strip()}\n')
+
+
+def parse_pipeline(spec: str) -> Pipeline:
+    '''Build a pipeline from a spec like "forwarding=off,branch=2".'''
+    options = {}
+    for option in filter(None, spec.split(',')):
+        key, _, value = option.partition('=')
+        if key == 'forwarding':
+            if value not in ('on', 'off'):
+                raise ValueError('forwarding must be on or off')
+            options['forwarding'] = value == 'on'
+        elif key == 'branch':
+            options['branch_penalty'] = int(value)
+        else:
+            raise ValueError(f'Unknown pipeline option {key}')
+    return Pipeline(**options)
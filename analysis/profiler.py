@@ -0,0 +1,111 @@
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Dict, Sequence, TextIO, Tuple
+
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+Line = Tuple[str, int]  # (file name, line number)
+
+
+def source_file(file_name: str) -> str:
+    # FileTags keep the quotes around file names
+    return file_name[1:-1] if file_name.startswith('"') else file_name
+
+
+def by_line(text: Dict, base: int, counts: Sequence[int]) -> Dict[Line, int]:
+    '''Sum counts kept per pc slot of the text segment by source line.'''
+    lines = OrderedDict()
+    for slot, count in enumerate(counts):
+        instr = text[str(base + 4 * slot)]
+        if type(instr) is str:
+            continue
+        line = source_file(instr.filetag.file_name), instr.filetag.line_no
+        lines[line] = lines.get(line, 0) + int(count)
+    return lines
+
+
+def source_lines(text: Dict) -> Dict[Line, str]:
+    '''Source text of each line that has instructions.'''
+    lines = {}
+    for instr in text.values():
+        if type(instr) is not str:
+            lines.setdefault((source_file(instr.filetag.file_name), instr.filetag.line_no), instr.original_text)
+    return lines
+
+
+class Profiler(Tracer):
+    '''Counts how many times each instruction executes, in an array indexed by pc slot.'''
+
+    def __init__(self) -> None:
+        self.base = 0
+        self.counts = array('Q')
+
+    def attach(self, inter) -> None:
+        self.base = inter.config.initial_pc
+        slots = (inter.mem.textPtr - self.base) >> 2
+        self.counts = array('Q', bytes(8 * slots))
+        self.text = inter.mem.text
+
+    def step(self, inter, pc: int, instr) -> None:
+        self.counts[(pc - self.base) >> 2] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def line_counts(self) -> Dict[Line, int]:
+        '''Executions per source line. A pseudo-instruction counts once per basic instruction.'''
+        return by_line(self.text, self.base, self.counts)
+
+    def hotspots(self, out: TextIO = sys.stderr, limit: int = 20) -> None:
+        '''Print the most executed source lines.'''
+        total = self.total or 1
+        sources = source_lines(self.text)
+        lines = sorted(self.line_counts().items(), key=lambda item: -item[1])[:limit]
+
+        out.write(f'{"count":>12} {"%":>6}  line\n')
+        for (file, line_no), count in lines:
+            if count == 0:
+                break
+            text = sources[(file, line_no)].strip()
+            out.write(f'{count:12d} {100 * count / total:6.2f}  {file}:{line_no}  {text}\n')
+
+    def annotate(self, out: TextIO = sys.stderr) -> None:
+        '''Print every source file with the execution count of each line.'''
+        counts = self.line_counts()
+        files = OrderedDict()
+        for file, line_no in counts:
+            files.setdefault(file, []).append(line_no)
+
+        sources = source_lines(self.text)
+        for file in files:
+            out.write(f'-- {file}\n')
+            try:
+                with open(file) as f:
+                    listing = f.read().splitlines()
+            except OSError:
+                # Fall back to the lines that have instructions
+                listing = [''] * max(files[file])
+                for line_no in files[file]:
+                    listing[line_no - 1] = sources[(file, line_no)].strip()
+
+            for line_no, text in enumerate(listing, 1):
+                count = counts.get((file, line_no))
+                out.write(f'{"" if count is None else count:>12}  {line_no:5d}  {text}\n')
@@ -0,0 +1,154 @@
+import gzip
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+import constants as const
+from analysis.pipeline import operands
+from interpreter.classes import Convert, Syscall
+from interpreter.syscalls import RETURNS_V0
+from interpreter.tracer import Tracer
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+MAGIC = b'STARTRC1'
+
+# One record per instruction: pc, memory address, new value of the destination register
+# (all 64 bits of a double, with the pair named by its even register), value loaded or stored,
+# destination register, memory access kind and size, padding
+RECORD = struct.Struct('<IIQQBBBx')
+DTYPE = np.dtype([('pc', '<u4'), ('addr', '<u4'), ('value', '<u8'), ('mem_value', '<u8'),
+                  ('reg', 'u1'), ('access', 'u1'), ('size', 'u1'), ('pad', 'u1')])
+
+# Register numbers in records: the integer registers, then the float registers
+REG_NAMES = [name for name in const.REGS if name != 'pc'] + const.F_REGS
+REG_NUMBERS = {name: number for number, name in enumerate(REG_NAMES)}
+NO_REG = 0xFF
+NO_ACCESS, LOAD, STORE = 0, 1, 2
+
+BUFFER = 1 << 20  # Bytes of records written at a time
+
+
+def writes_double(instr) -> bool:
+    '''Whether the float register instr writes is a double (cvt.d.*, l.d and the .d arithmetic and moves).'''
+    if type(instr) is Convert:
+        return instr.format_to == 'd'
+    op = instr.operation
+    return op[-2:] == '.d' and op[-4:-2] != '.w'  # round.w.d etc. write a word
+
+
+class TraceWriter(Tracer):
+    '''Writes a fixed size record for every instruction executed to a file, gzip compressed if compress is set.
+
+    The records are buffered and written a megabyte at a time. close must be
+    called at the end of the run to write the rest.'''
+
+    def __init__(self, filename: str, compress: Optional[bool] = None) -> None:
+        if compress is None:
+            compress = filename.endswith('.gz')
+        self.file = gzip.open(filename, 'wb', compresslevel=6) if compress else open(filename, 'wb')
+        self.file.write(MAGIC)
+        self.buffer = bytearray()
+        self.access = None
+        self.records = 0
+        self.syscall = None  # Service number in $v0 when the next instruction is a syscall
+
+    def attach(self, inter) -> None:
+        base = inter.config.initial_pc
+        slots = (inter.mem.textPtr - base) >> 2
+        self.base = base
+        # The register each instruction writes and whether it is a double, decoded once
+        self.dest = [None] * slots  # type: List[Optional[str]]
+        self.double = bytearray(slots)
+        self.syscalls = set()  # Addresses of the syscall instructions
+        for slot in range(slots):
+            instr = inter.mem.text[str(base + 4 * slot)]
+            if type(instr) is Syscall:
+                self.syscalls.add(base + 4 * slot)
+            if type(instr) is not str:
+                written = [reg for reg in operands(instr)[1] if reg in REG_NUMBERS]
+                if written:
+                    self.dest[slot] = written[0]
+                    self.double[slot] = written[0][1] == 'f' and writes_double(instr)
+        if inter.reg['pc'] in self.syscalls:
+            self.syscall = inter.reg['$v0']
+
+    def memory(self, inter, addr: int, size: int, store: bool) -> None:
+        self.access = (addr & const.WORD_MASK, size, STORE if store else LOAD)
+
+    def step(self, inter, pc: int, instr) -> None:
+        slot = (pc - self.base) >> 2
+        reg = self.dest[slot]
+        if reg is not None and pc in self.syscalls and self.syscall not in RETURNS_V0:
+            reg = None
+        if reg is None:
+            number, value = NO_REG, 0
+        else:
+            number, value = REG_NUMBERS[reg], inter.reg[reg]
+            if self.double[slot]:
+                value = struct.unpack('<Q', struct.pack('<d', inter.get_reg_double(reg)))[0]
+            elif reg[1] == 'f':
+                value = struct.unpack('<I', struct.pack('<f', value))[0]
+            else:
+                value &= const.WORD_MASK
+
+        if self.access is None:
+            record = RECORD.pack(pc, 0, value, 0, number, NO_ACCESS, 0)
+        else:
+            addr, size, kind = self.access
+            data = inter.mem.data
+            # Memory holds the value loaded or just stored
+            mem_value = int.from_bytes(bytes(data.get(str(addr + i), 0) & 0xFF for i in range(size)), 'little')
+            record = RECORD.pack(pc, addr, value, mem_value, number, kind, size)
+            self.access = None
+
+        self.buffer += record
+        self.records += 1
+        if len(self.buffer) >= BUFFER:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+
+        # Which syscall runs is only known before it executes, and only some of them write $v0
+        if inter.reg['pc'] in self.syscalls:
+            self.syscall = inter.reg['$v0']
+
+    def close(self) -> None:
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+        self.file.close()
+
+
+def load_trace(filename: str) -> np.ndarray:
+    '''Read a trace as a structured array with the fields of DTYPE. Uncompressed traces are memory mapped.'''
+    with open(filename, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+
+    if compressed:
+        with gzip.open(filename, 'rb') as f:
+            raw = f.read()
+        if raw[:len(MAGIC)] != MAGIC:
+            raise ValueError('Not a STARS trace')
+        return np.frombuffer(raw, dtype=DTYPE, offset=len(MAGIC))
+
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a STARS trace')
+        if not f.read(1):
+            return np.zeros(0, dtype=DTYPE)  # Empty files can't be mapped
+    return np.memmap(filename, dtype=DTYPE, mode='r', offset=len(MAGIC))
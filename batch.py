@@ -0,0 +1,177 @@
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import forkserver
+from runner import load_program, run
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Batch mode: run many (program, input, args) jobs across a pool of worker processes.
+#
+# A manifest is a JSON list of jobs, or an object {"defaults": {...}, "jobs": [...]}.
+# Each job is an object with the keys
+#     program       path to the .asm file (relative to the manifest)
+#     id            optional name reported with the result
+#     stdin         input text, or
+#     stdin_file    path to a file with the input text
+#     expected      output the program should print, or
+#     expected_file path to a file with the expected output; the run stops at the first
+#                   difference unless stop_on_mismatch is false, and the result's mismatch
+#                   gives its byte offset, line of output and source line
+#     stats         true to add the time and peak memory of each phase and the time of each
+#                   syscall to the result (with --fork, only the run itself is measured).
+#                   peak_rss is the high-water mark of the worker process, so it includes the
+#                   jobs it ran before; rss_growth is how much the job's phase raised it
+#     args          list of program arguments
+#     max_instructions, time_limit, ...   any RunConfig setting to override; with --fork, the
+#                   settings used to initialize the machine (forkserver.INIT_SETTINGS, e.g.
+#                   garbage_memory or seed) are only accepted in defaults and fail the job otherwise
+# Results are written as JSON lines, one per job, in the order jobs finish.
+
+JOB_KEYS = {'id', 'program', 'stdin', 'stdin_file', 'expected', 'expected_file', 'stop_on_mismatch', 'stats', 'args'}
+JOBS_PER_TASK = 16  # Upper bound on the number of jobs for one program sent to a worker at once
+
+# Assembled programs of this worker process, keyed by path
+_programs = {}
+# Fork servers of this worker process, keyed by (path, args)
+_servers = {}
+
+
+def load_manifest(filename: str) -> List[Dict]:
+    '''Read a manifest and return its jobs with defaults applied and paths resolved.'''
+    with open(filename) as f:
+        manifest = json.load(f)
+
+    if isinstance(manifest, dict):
+        defaults, jobs = manifest.get('defaults', {}), manifest['jobs']
+    else:
+        defaults, jobs = {}, manifest
+
+    base = os.path.dirname(os.path.abspath(filename))
+    resolved = []
+    for i, job in enumerate(jobs):
+        job = {**defaults, **job}
+        job.setdefault('id', i)
+        job['program'] = os.path.join(base, job['program'])
+
+        if 'stdin_file' in job:
+            with open(os.path.join(base, job.pop('stdin_file'))) as f:
+                job['stdin'] = f.read()
+
+        if 'expected_file' in job:
+            with open(os.path.join(base, job.pop('expected_file'))) as f:
+                job['expected'] = f.read()
+
+        resolved.append(job)
+    return resolved
+
+
+def make_tasks(jobs: List[Dict]) -> List[List[Dict]]:
+    '''Group jobs by program (and split large groups) so that a worker assembles each program once.'''
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job['program'], []).append(job)
+
+    tasks = []
+    for group in groups.values():
+        for i in range(0, len(group), JOBS_PER_TASK):
+            tasks.append(group[i:i + JOBS_PER_TASK])
+    return tasks
+
+
+def get_program(path: str):
+    if path not in _programs:
+        try:
+            _programs[path] = load_program(path)
+        except Exception as e:
+            _programs[path] = e  # Don't reassemble a broken program for every input
+
+    if isinstance(_programs[path], Exception):
+        raise _programs[path]
+    return _programs[path]
+
+
+def get_server(path: str, args: List[str], defaults: Optional[Dict]) -> forkserver.ForkServer:
+    key = path, tuple(args)
+    if key not in _servers:
+        _servers[key] = forkserver.ForkServer(get_program(path), args, limits=defaults)
+    return _servers[key]
+
+
+def run_job(job: Dict, defaults: Optional[Dict] = None, fork: bool = False) -> Dict:
+    '''Run a single job and return its JSON-ready result.
+
+    fork: run the job in a child of a fork server instead of in this process'''
+    limits = {k: v for k, v in job.items() if k not in JOB_KEYS}
+    start = time.perf_counter()
+
+    try:
+        if fork:
+            server = get_server(job['program'], job.get('args', []), defaults)
+            record = server.run(job.get('stdin', ''), limits, job.get('expected'), job.get('stop_on_mismatch', True),
+                                job.get('stats', False)).to_dict()
+        else:
+            program = get_program(job['program'])
+            record = run(program, stdin=job.get('stdin', ''), args=job.get('args'),
+                         limits={**(defaults or {}), **limits}, expected=job.get('expected'),
+                         stop_on_mismatch=job.get('stop_on_mismatch', True), stats=job.get('stats', False)).to_dict()
+
+    except Exception as e:
+        # Report assembly errors like any other failed run
+        record = {'exception': type(e).__name__, 'message': str(e).strip()}
+
+    record['wall_time'] = time.perf_counter() - start
+    return {'id': job['id'], 'program': job['program'], **record}
+
+
+def run_task(task) -> List[Dict]:
+    jobs, defaults, fork = task
+    return [run_job(job, defaults, fork) for job in jobs]
+
+
+def run_batch(jobs: List[Dict], processes: Optional[int] = None, defaults: Optional[Dict] = None,
+              fork: bool = False) -> Iterator[Dict]:
+    '''Run the jobs on a pool of processes, yielding results as they complete.
+
+    defaults: RunConfig settings applied to every job (job settings take precedence)
+    fork: initialize each (program, args) once per worker and fork a child per job'''
+    fork = fork and forkserver.available()
+    tasks = [(task, defaults, fork) for task in make_tasks(jobs)]
+
+    if processes == 1:
+        for task in tasks:
+            yield from run_task(task)
+        return
+
+    with Pool(processes) as pool:
+        for results in pool.imap_unordered(run_task, tasks):
+            yield from results
+
+
+def write_results(results: Iterator[Dict], out: TextIO = sys.stdout) -> int:
+    '''Write results as JSON lines and return the number of failed jobs.'''
+    failed = 0
+    for result in results:
+        if result.get('exception') is not None:
+            failed += 1
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+    return failed
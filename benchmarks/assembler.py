@@ -0,0 +1,110 @@
+import sys
+import tempfile
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, TextIO
+
+from benchmarks.generate import Generator
+from interpreter.stats import Stats
+from sbumips import assemble
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+STAGES = ['walk', 'preprocess', 'lex', 'parse', 'link']  # The assembly phases of sbumips.assemble
+
+# Each sweep varies one setting of the generator, with the others fixed
+SWEEPS = {
+    'instructions': ('instructions', [1000, 2000, 4000, 8000], {}),
+    'labels': ('labels', [50, 200, 800, 3200], {'instructions': 4000}),
+    'eqvs': ('eqvs', [0, 10, 40, 160], {'instructions': 2000}),
+    'includes': ('depth', [0, 1, 2, 3, 4], {'instructions': 4000, 'width': 2}),
+    'data': ('words', [1000, 4000, 16000], {'instructions': 1000, 'strings': 100}),
+}
+
+
+class PeakMemory(Stats):
+    '''Stats keeping the peak memory allocated by each phase (traced with tracemalloc) in peaks instead of its time.'''
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.peaks = {}  # type: Dict[str, int]
+
+    def phase(self, name: str) -> 'TracedPhase':
+        return TracedPhase(self.peaks, name)
+
+    def split(self, name: str, part: str, seconds: float) -> None:
+        # The parser asks for the tokens as it goes, so the memory of lex is counted in parse
+        pass
+
+
+class TracedPhase:
+    def __init__(self, peaks: Dict[str, int], name: str) -> None:
+        self.peaks = peaks
+        self.name = name
+
+    def __enter__(self) -> None:
+        tracemalloc.start()
+
+    def __exit__(self, *exc) -> bool:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.peaks[self.name] = max(self.peaks.get(self.name, 0), peak)
+        return False
+
+
+def measure_program(filename: str, repeat: int = 3) -> Dict:
+    '''The fastest time of each stage over repeat runs and the peak memory of each stage.
+
+    Memory is measured in a separate run, since tracing allocations slows everything down.'''
+    times = {}
+    for _ in range(repeat):
+        stats = Stats()
+        assemble(filename, stats)
+        for stage in STAGES:
+            seconds = stats.phases[stage]['seconds']
+            times[stage] = min(times.get(stage, seconds), seconds)
+
+    memory = PeakMemory()
+    assemble(filename, memory)
+    return {'seconds': OrderedDict((stage, times[stage]) for stage in STAGES),
+            'peak_bytes': OrderedDict((stage, memory.peaks.get(stage)) for stage in STAGES)}
+
+
+def sweep(name: str, repeat: int = 3, out: TextIO = sys.stderr) -> Dict:
+    '''Measure the stages on generated programs of growing size along one of SWEEPS.
+
+    Times are also printed per source line: a stage whose time per line grows
+    along the sweep scales worse than linearly in that setting.'''
+    setting, values, fixed = SWEEPS[name]
+    rows = []
+    out.write(f'{setting:>12} {"lines":>8} ' + ' '.join(f'{stage:>10}' for stage in STAGES)
+              + f' {"total ms":>10}   (us per line; peak KB)\n')
+    for value in values:
+        with tempfile.TemporaryDirectory() as tmp:
+            main = Generator(**dict(fixed, **{setting: value})).write(Path(tmp))
+            lines = sum(len(path.read_text().splitlines()) for path in Path(tmp).rglob('*.asm'))
+            row = measure_program(str(main), repeat)
+        row.update({setting: value, 'lines': lines})
+        rows.append(row)
+
+        seconds, peaks = row['seconds'], row['peak_bytes']
+        out.write(f'{value:12d} {lines:8d} ' + ' '.join(f'{1e6 * seconds[stage] / lines:10.2f}' for stage in STAGES)
+                  + f' {1000 * sum(seconds.values()):10.1f}\n')
+        out.write(f'{"":21} ' + ' '.join(f'{"-":>10}' if peaks[stage] is None else f'{peaks[stage] / 1024:10.0f}'
+                                         for stage in STAGES) + '\n')
+    return {'sweep': name, 'setting': setting, 'fixed': fixed, 'rows': rows}
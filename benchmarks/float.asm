@@ -0,0 +1,41 @@
+# Floating point workload: single and double precision arithmetic,
+# conversions and compares in a loop.
+
+.data
+.align 2
+x:     .float 1.5
+step:  .float 0.25
+limit: .float 1000.0
+
+.text
+main:
+	la $t0, x
+	l.s $f0, 0($t0)		# $f0: x
+	l.s $f1, 4($t0)		# $f1: step
+	l.s $f2, 8($t0)		# $f2: limit
+	li $t1, 0
+	li $t2, 10000		# iterations
+
+loop:
+	mul.s $f4, $f0, $f0	# x^2
+	add.s $f4, $f4, $f1
+	div.s $f5, $f4, $f0	# (x^2 + step) / x
+	sqrt.s $f6, $f5
+	cvt.d.s $f8, $f6
+	add.d $f10, $f8, $f8
+	mul.d $f10, $f10, $f8
+	cvt.s.d $f12, $f10
+	c.lt.s $f12, $f2
+	bc1f reset
+	add.s $f0, $f0, $f1
+	j next
+reset:
+	l.s $f0, 0($t0)
+next:
+	cvt.w.s $f14, $f12
+	mfc1 $t3, $f14
+	addi $t1, $t1, 1
+	blt $t1, $t2, loop
+
+	li $v0, 10
+	syscall
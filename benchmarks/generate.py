@@ -0,0 +1,150 @@
+import random
+from pathlib import Path
+from typing import List
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Synthetic programs for the assembler benchmarks. They assemble, but are not meant to be run.
+
+REGS = ['$t0', '$t1', '$t2', '$t3', '$t4', '$t5', '$t6', '$t7', '$s0', '$s1', '$s2', '$a1', '$v1']
+FLOAT_REGS = ['$f0', '$f2', '$f4', '$f6', '$f8', '$f10']
+WORDS_PER_LINE = 16
+
+
+class Generator:
+    '''Generates a program with about the given number of instruction lines and labels, spread over
+    a tree of .include files depth levels deep with width includes per file, using eqvs .eqv
+    constants, and with words .word values and strings .asciiz strings of data.
+
+    The same settings and seed give the same program.'''
+
+    def __init__(self, instructions: int = 1000, labels: int = 100, eqvs: int = 10, depth: int = 0, width: int = 2,
+                 words: int = 256, strings: int = 16, seed: int = 0) -> None:
+        self.instructions = instructions
+        self.labels = max(labels, 1)
+        self.eqvs = eqvs
+        self.depth = depth
+        self.width = width
+        self.words = words
+        self.strings = strings
+        self.seed = seed
+
+    def tree(self, node: str = '') -> List[str]:
+        '''The include files under node, in the order they are included (node '' is the main file).'''
+        if len(node) == self.depth:
+            return []
+        files = []
+        for i in range(self.width):
+            files += [node + str(i)] + self.tree(node + str(i))
+        return files
+
+    def write(self, directory: Path) -> Path:
+        '''Write the program to directory and return the path of its main file.'''
+        rng = random.Random(self.seed)
+        directory = Path(directory)
+        nodes = [''] + self.tree()
+        if len(nodes) > 1:
+            (directory / 'inc').mkdir(parents=True, exist_ok=True)
+
+        labels = [f'L{i}' for i in range(self.labels)]
+        data = [f'w{i}' for i in range(0, self.words, WORDS_PER_LINE)] + [f's{i}' for i in range(self.strings)]
+
+        for index, node in enumerate(nodes):
+            # The instructions and labels are shared evenly between the files
+            count = self.instructions // len(nodes) + (index < self.instructions % len(nodes))
+            code = self.code(rng, count, labels[index::len(nodes)], labels, data)
+            children = [f'.include "{include_name(node + str(i))}"' for i in range(self.width) if len(node) < self.depth]
+
+            if node:
+                lines = ['.text'] + code + children
+            else:
+                lines = self.header(rng) + ['.text', 'main:'] + code + ['\tli $v0, 10', '\tsyscall'] + children
+            (directory / (include_name(node) if node else 'main.asm')).write_text('\n'.join(lines) + '\n')
+        return directory / 'main.asm'
+
+    def header(self, rng: random.Random) -> List[str]:
+        lines = ['# Generated program', '', '.data']
+        lines += [f'.eqv K{i} {rng.randrange(-32768, 32768)}' for i in range(self.eqvs)]
+        for start in range(0, self.words, WORDS_PER_LINE):
+            values = [str(rng.randrange(-2 ** 31, 2 ** 31)) if rng.random() < 0.7 else hex(rng.randrange(2 ** 32))
+                      for _ in range(min(WORDS_PER_LINE, self.words - start))]
+            lines.append(f'w{start}: .word {", ".join(values)}')
+        for i in range(self.strings):
+            text = ' '.join(rng.choice(['hello', 'world', 'value', 'tab\\t', 'line\\n', 'x']) for _ in range(8))
+            lines.append(f's{i}: .asciiz "{text}"')
+        lines.append('')
+        return lines
+
+    def code(self, rng: random.Random, count: int, own: List[str], labels: List[str], data: List[str]) -> List[str]:
+        '''count lines of instructions, with the labels of own placed evenly among them.'''
+        at = {}
+        for i, label in enumerate(own):
+            at.setdefault(i * count // len(own), []).append(label)
+
+        lines = []
+        for i in range(count):
+            lines += [f'{label}:' for label in at.get(i, [])]
+            line = '\t' + self.instruction(rng, labels, data)
+            if rng.random() < 0.1:
+                line += '\t# comment'
+            lines.append(line)
+            if rng.random() < 0.05:
+                lines.append('')
+        if not count:
+            lines += [f'{label}:' for label in own]
+        return lines
+
+    def instruction(self, rng: random.Random, labels: List[str], data: List[str]) -> str:
+        r = lambda: rng.choice(REGS)
+        f = lambda: rng.choice(FLOAT_REGS)
+        kind = rng.randrange(16)
+        if kind == 0:
+            return f'{rng.choice(["add", "addu", "sub", "subu", "and", "or", "xor", "nor", "slt", "sltu"])} {r()}, {r()}, {r()}'
+        if kind == 1:
+            return f'{rng.choice(["addi", "addiu", "slti"])} {r()}, {r()}, {rng.randrange(-32768, 32768)}'
+        if kind == 2:
+            return f'{rng.choice(["andi", "ori", "xori"])} {r()}, {r()}, {hex(rng.randrange(65536))}'
+        if kind == 3:
+            return f'{rng.choice(["sll", "srl", "sra"])} {r()}, {r()}, {rng.randrange(32)}'
+        if kind == 4:
+            return f'{rng.choice(["lw", "sw"])} {r()}, {4 * rng.randrange(-64, 64)}($sp)'
+        if kind == 5:
+            return f'{rng.choice(["lb", "lbu", "sb", "lh", "sh"])} {r()}, {2 * rng.randrange(64)}($gp)'
+        if kind == 6:
+            return f'li {r()}, {rng.randrange(-2 ** 31, 2 ** 31)}'
+        if kind == 7 and self.eqvs:
+            constant = f'K{rng.randrange(self.eqvs)}'
+            return f'li {r()}, {constant}' if rng.random() < 0.5 else f'addi {r()}, {r()}, {constant}'
+        if kind == 8 and data:
+            return f'la {r()}, {rng.choice(data)}'
+        if kind == 9:
+            return f'move {r()}, {r()}'
+        if kind == 10:
+            return f'{rng.choice(["beq", "bne"])} {r()}, {r()}, {rng.choice(labels)}'
+        if kind == 11:
+            return f'{rng.choice(["blt", "bge", "bgt", "ble"])} {r()}, {r()}, {rng.choice(labels)}'
+        if kind == 12:
+            return f'{rng.choice(["j", "jal"])} {rng.choice(labels)}'
+        if kind == 13:
+            return f'{rng.choice(["mult", "div"])} {r()}, {r()}' if rng.random() < 0.5 else f'{rng.choice(["mfhi", "mflo"])} {r()}'
+        if kind == 14:
+            return f'{rng.choice(["add.s", "sub.s", "mul.s", "div.s"])} {f()}, {f()}, {f()}'
+        return f"li $a0, '{rng.choice('abcxyz')}'"
+
+
+def include_name(node: str) -> str:
+    return f'inc/f{node}.asm'
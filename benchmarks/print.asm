@@ -0,0 +1,31 @@
+# Syscall workload: prints numbers, characters and strings.
+
+.data
+label: .asciiz "value: "
+
+.text
+main:
+	li $t0, 0
+	li $t1, 5000		# lines printed
+
+loop:
+	la $a0, label
+	li $v0, 4
+	syscall
+	move $a0, $t0
+	li $v0, 1
+	syscall
+	li $a0, ' '
+	li $v0, 11
+	syscall
+	sll $a0, $t0, 3
+	li $v0, 34		# hex
+	syscall
+	li $a0, '\n'
+	li $v0, 11
+	syscall
+	addi $t0, $t0, 1
+	blt $t0, $t1, loop
+
+	li $v0, 10
+	syscall
@@ -0,0 +1,224 @@
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO
+
+from interpreter.interpreter import Interpreter
+from runner import load_program, make_config, run_interpreter
+from sbumips import assemble
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+ROOT = Path(__file__).resolve().parent.parent
+LIMITS = {'max_instructions': 10 ** 9}
+
+# A result is a dict with
+#     kind          execute, assemble or startup
+#     seconds       the fastest of the timed repetitions (of one run)
+#     median        their median
+#     times         all of them
+# and, for execute, the instruction count and instructions_per_second.
+# A result file is {'machine': {...}, 'results': {name: result}}.
+
+
+def loop_source(iterations: int = 100000) -> str:
+    '''A tight integer loop of iterations * 4 instructions.'''
+    return f'''.text
+main:
+    li $t0, 0
+    li $t1, {iterations}
+loop:
+    addi $t0, $t0, 1
+    xor $t2, $t2, $t0
+    sll $t3, $t2, 2
+    bne $t0, $t1, loop
+    li $v0, 10
+    syscall
+'''
+
+
+def large_source(blocks: int = 500) -> str:
+    '''A program of blocks * 10 lines of straight-line code with a label and a branch to it in each block.'''
+    lines = ['.data', 'table: .word ' + ', '.join(str(i) for i in range(64)), 'message: .asciiz "done\\n"', '.text', 'main:']
+    for block in range(blocks):
+        lines += [
+            f'block{block}:',
+            f'    addi $t0, $t0, {block % 100}',
+            '    add $t1, $t0, $t1',
+            '    sll $t2, $t1, 3',
+            '    la $t3, table',
+            f'    lw $t4, {4 * (block % 64)}($t3)',
+            '    mul $t5, $t4, $t2',
+            f'    li $t6, {block * 1000}',
+            f'    bgt $t6, $t5, block{block}_end',
+            '    move $t7, $t6',
+            f'block{block}_end:',
+        ]
+    lines += ['    la $a0, message', '    li $v0, 4', '    syscall', '    li $v0, 10', '    syscall', '']
+    return '\n'.join(lines)
+
+
+def time_runs(fn: Callable[[], object], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(kind: str, times: List[float]) -> Dict:
+    return {'kind': kind, 'seconds': min(times), 'median': statistics.median(times), 'times': times}
+
+
+def bench_execute(program: str, repeat: int = 5, number: int = 1, stdin: str = '') -> Dict:
+    '''Time the run of an assembled program, without assembly or memory initialization.
+
+    Each repetition times number runs, for programs too short to time one run of.'''
+    code = load_program(program)
+    times = []
+    count = 0
+    for _ in range(repeat):
+        machines = [Interpreter(code, [], make_config(LIMITS)) for _ in range(number)]
+        start = time.perf_counter()
+        results = [run_interpreter(inter, stdin) for inter in machines]
+        times.append((time.perf_counter() - start) / number)
+        for result in results:
+            if result.exception is not None:
+                raise RuntimeError(f'{result.exception}: {result.message}')
+        count = results[0].instruction_count
+
+    result = summarize('execute', times)
+    result['instructions'] = count
+    result['instructions_per_second'] = count / result['seconds'] if result['seconds'] else 0.0
+    return result
+
+
+def bench_assemble(source: str, repeat: int = 5) -> Dict:
+    '''Time assembling source text from a file, through preprocessing, parsing and linking.'''
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, 'main.asm')
+        path.write_text(source)
+        result = summarize('assemble', time_runs(lambda: assemble(str(path)), repeat))
+    result['lines'] = source.count('\n')
+    return result
+
+
+def bench_snapshot(heap_bytes: int, repeat: int = 5) -> Dict:
+    '''Time a snapshot of a machine with heap_bytes of memory in use, taken after a store, like time travel
+    takes a checkpoint every interval instructions.'''
+    inter = Interpreter(load_program('.text\nmain:\n    nop\n'), [], make_config(LIMITS))
+    heap = inter.mem.heapPtr
+    for addr in range(heap, heap + heap_bytes):
+        inter.mem.setByte(addr, addr & 0xFF)
+    inter.snapshot()
+
+    def store_and_snapshot():
+        inter.mem.addWord(inter.instruction_count, heap)
+        inter.instruction_count += 1
+        inter.snapshot()
+
+    result = summarize('snapshot', time_runs(store_and_snapshot, repeat))
+    result['bytes'] = heap_bytes
+    return result
+
+
+def bench_startup(repeat: int = 5) -> Dict:
+    '''Time a fresh interpreter process running a program that exits at once.'''
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, 'exit.asm')
+        path.write_text('.text\nmain:\n    li $v0, 10\n    syscall\n')
+        # Run in the temporary directory so the parser's debug file is not left behind
+        command = [sys.executable, str(ROOT / 'sbumips.py'), str(path)]
+        return summarize('startup', time_runs(lambda: subprocess.run(command, cwd=tmp, check=True,
+                                                                       stdout=subprocess.DEVNULL), repeat))
+
+
+def benchmarks() -> Dict[str, Callable[[int], Dict]]:
+    '''The suite, by name. Each benchmark takes the number of repetitions.'''
+    here = Path(__file__).resolve().parent
+    return {
+        'execute/big': lambda repeat: bench_execute(str(ROOT / 'tests' / 'big.asm'), repeat),
+        'execute/selection_sort': lambda repeat: bench_execute(str(ROOT / 'examples' / 'arrays' / 'selection_sort.asm'),
+                                                               repeat, number=200),
+        'execute/loop': lambda repeat: bench_execute(loop_source(), repeat),
+        'execute/float': lambda repeat: bench_execute(str(here / 'float.asm'), repeat),
+        'execute/print': lambda repeat: bench_execute(str(here / 'print.asm'), repeat),
+        'assemble/5k_lines': lambda repeat: bench_assemble(large_source(500), repeat),
+        'assemble/20k_lines': lambda repeat: bench_assemble(large_source(2000), repeat),
+        'snapshot/64k': lambda repeat: bench_snapshot(2 ** 16, repeat),
+        'snapshot/1m': lambda repeat: bench_snapshot(2 ** 20, repeat),
+        'startup': bench_startup,
+    }
+
+
+def machine() -> Dict:
+    '''Where the results were measured, to tell apart results that can't be compared.'''
+    info = {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def run_suite(names: Optional[List[str]] = None, repeat: int = 5, out: Optional[TextIO] = sys.stderr) -> Dict:
+    '''Run the benchmarks whose names start with one of names (all of them by default).'''
+    results = {}
+    for name, bench in benchmarks().items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        results[name] = bench(repeat)
+        if out is not None:
+            out.write(describe(name, results[name]) + '\n')
+    return {'machine': machine(), 'results': results}
+
+
+def describe(name: str, result: Dict) -> str:
+    line = f'{name:<28} {result["seconds"] * 1000:10.2f} ms  (median {result["median"] * 1000:.2f} ms)'
+    if result['kind'] == 'execute':
+        line += f'  {result["instructions"]} instructions, {result["instructions_per_second"]:,.0f}/s'
+    elif result['kind'] == 'assemble':
+        line += f'  {result["lines"]} lines'
+    elif result['kind'] == 'snapshot':
+        line += f'  {result["bytes"] // 1024} KiB in use'
+    return line
+
+
+def compare(old: Dict, new: Dict, threshold: float = 0.1, out: TextIO = sys.stderr) -> List[str]:
+    '''Print the change of each benchmark in both results. Returns the ones that got slower by more than threshold.'''
+    regressions = []
+    out.write(f'{"benchmark":<28} {"old ms":>10} {"new ms":>10} {"change":>8}\n')
+    for name, result in new['results'].items():
+        if name not in old['results']:
+            continue
+        before, after = old['results'][name]['seconds'], result['seconds']
+        change = after / before - 1 if before else 0.0
+        slower = change > threshold
+        if slower:
+            regressions.append(name)
+        out.write(f'{name:<28} {before * 1000:10.1f} {after * 1000:10.1f} {100 * change:+7.1f}%'
+                  f'{"  slower" if slower else ""}\n')
+    return regressions
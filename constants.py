@@ -182,6 +182,9 @@ MENU_BAR = {
         },
         'Warnings': {
             'Checkbox': 'warnings'
+        },
+        'Reverse Stepping': {
+            'Checkbox': 'reverse_stepping'
         }
     },
     'Tools': {
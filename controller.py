@@ -54,6 +54,25 @@ class Controller():
     def reverse(self):
         self.debug.reverse(None, self.interp)
 
+    def goto(self, count: int):
+        self.debug.goto(['goto', str(count)], self.interp)
+
+    # The debugger commands return False when the program should run on, and True when they
+    # were rejected: then the program stays paused. These return whether the program runs on.
+    def step_over(self) -> bool:
+        return self.resume_if(not self.debug.over(None, self.interp))
+
+    def step_out(self) -> bool:
+        return self.resume_if(not self.debug.finish(None, self.interp))
+
+    def run_until(self, target: str) -> bool:
+        return self.resume_if(not self.debug.until(['until', target], self.interp))
+
+    def resume_if(self, accepted: bool) -> bool:
+        if accepted:
+            self.interp.pause_lock.set()
+        return accepted
+
     def good(self) -> bool:
         return self.interp is not None
 
@@ -62,6 +81,9 @@ class Controller():
 
     def setSetting(self, key: str, val: bool) -> None:
         settings.settings[key] = val
+        # Apply the change to the current run as well
+        if self.interp is not None and hasattr(self.interp.config, key):
+            setattr(self.interp.config, key, val)
 
     def get_labels(self):
         return self.interp.mem.labels
@@ -0,0 +1,145 @@
+import json
+import os
+import selectors
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from interpreter.interpreter import Interpreter
+from interpreter.stats import Stats
+from runner import Program, RunResult, load_program, make_config, run_interpreter
+from settings import RunConfig
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Input of one run: the stdin text, optionally with RunConfig settings to override for that run,
+# the expected output and whether to stop at the first difference from it
+Job = Union[str, Tuple[str, Dict], Tuple[str, Dict, str], Tuple[str, Dict, str, bool]]
+
+# RunConfig settings read only while the machine is initialized. The children start from the
+# server's initialized machine, so these can only be set for the whole server, not per job.
+INIT_SETTINGS = {'data_min', 'data_max', 'mmio_base', 'initial_registers', 'garbage_registers', 'garbage_memory',
+                 'seed'}
+
+
+def available() -> bool:
+    return hasattr(os, 'fork')
+
+
+class ForkServer:
+    '''Assembles and initializes a program once, then runs every input in a forked child.
+
+    The children share the assembled program and initial memory image with the
+    server through copy-on-write pages, so a run only pays for the fork.
+    Results are sent back to the server as JSON over a pipe. POSIX only.
+
+    The limits of a job can't change the initial machine: settings in
+    INIT_SETTINGS are only accepted by the constructor.'''
+
+    def __init__(self, program: Program, args: Optional[List[str]] = None,
+                 limits: Optional[Dict] = None, config: Optional[RunConfig] = None) -> None:
+        if not available():
+            raise OSError('Fork server mode needs os.fork')
+        self.inter = Interpreter(load_program(program), args or [], make_config(limits, config))
+
+    def _child(self, stdin: str, limits: Optional[Dict], expected: Optional[str], stop_on_mismatch: bool,
+               stats: bool, fd: int) -> None:
+        # Never returns: the child must not run any of the server's cleanup code
+        try:
+            try:
+                if limits:
+                    make_config(limits, self.inter.config)
+                if stats:
+                    self.inter.stats = Stats()
+                data = json.dumps(run_interpreter(self.inter, stdin, expected, stop_on_mismatch).to_dict())
+            except Exception as e:
+                data = json.dumps({'exception': type(e).__name__, 'message': str(e).strip()})
+
+            with os.fdopen(fd, 'w') as pipe:
+                pipe.write(data)
+        finally:
+            os._exit(0)
+
+    def spawn(self, stdin: str = '', limits: Optional[Dict] = None, expected: Optional[str] = None,
+              stop_on_mismatch: bool = True, stats: bool = False) -> Tuple[int, int]:
+        '''Fork a child running one input. Returns the child's pid and the read end of its pipe.'''
+        init = sorted(INIT_SETTINGS.intersection(limits or {}))
+        if init:
+            raise ValueError(f'{", ".join(init)} only apply when the fork server is created, not per job')
+
+        r, w = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            os.close(r)
+            self._child(stdin, limits, expected, stop_on_mismatch, stats, w)
+
+        os.close(w)
+        return pid, r
+
+    def collect(self, pid: int, fd: int) -> RunResult:
+        '''Read the result of a child started by spawn and reap it.'''
+        with os.fdopen(fd) as pipe:
+            data = pipe.read()
+        _, status = os.waitpid(pid, 0)
+
+        if not data:
+            result = RunResult()
+            result.exception = 'ChildProcessError'
+            result.message = f'Child process died with status {status}'
+            return result
+        return RunResult.from_dict(json.loads(data))
+
+    def run(self, stdin: str = '', limits: Optional[Dict] = None, expected: Optional[str] = None,
+            stop_on_mismatch: bool = True, stats: bool = False) -> RunResult:
+        '''Run the program on one input, comparing its output with the expected output if it is given
+        (see runner.run_interpreter).
+
+        With stats, the result has the time of the run and of its syscalls.'''
+        return self.collect(*self.spawn(stdin, limits, expected, stop_on_mismatch, stats))
+
+    def map(self, jobs: Iterable[Job], processes: int = 1) -> Iterator[Tuple[int, RunResult]]:
+        '''Run the program on many inputs with up to processes children at a time.
+
+        Yields (index of the job, result) as the children finish.'''
+        jobs = iter(enumerate(jobs))
+        sel = selectors.DefaultSelector()
+        running = 0
+
+        def start_next() -> bool:
+            job = next(jobs, None)
+            if job is None:
+                return False
+            index, job = job
+            job = (job,) if isinstance(job, str) else tuple(job)
+            # Fill in the defaults of the parts the job leaves out
+            stdin, limits, expected, stop_on_mismatch = job + (None, None, True)[len(job) - 1:]
+            pid, fd = self.spawn(stdin, limits, expected, stop_on_mismatch)
+            sel.register(fd, selectors.EVENT_READ, (index, pid))
+            return True
+
+        while running < processes and start_next():
+            running += 1
+
+        while running > 0:
+            for key, _ in sel.select():
+                index, pid = key.data
+                sel.unregister(key.fd)
+                yield index, self.collect(pid, key.fd)
+
+                if not start_next():
+                    running -= 1
+
+        sel.close()
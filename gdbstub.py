@@ -0,0 +1,275 @@
+import select
+import socket
+import struct
+import sys
+from typing import Optional, Tuple
+
+from numpy import float32
+
+import constants as const
+from interpreter import exceptions as ex
+from interpreter.interpreter import Interpreter
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# GDB remote serial protocol server, so gdb (gdb-multiarch) can debug a program running in STARS:
+#     python sbumips.py --gdb :1234 program.asm
+#     gdb-multiarch -ex "set architecture mips" -ex "set endian little" -ex "target remote :1234"
+# Registers and memory are sent little endian (mipsel). Only the data segments are readable as
+# memory: STARS does not encode instructions, so the text segment reads as zeros.
+# The instruction limit applies as in any run, and the time limit to each continue or step:
+# a program that goes past them stops with SIGXCPU.
+
+# Register numbers used by gdb for MIPS32. Registers STARS doesn't have read as 0.
+REGISTERS = const.REGS[:32] + ['sr', 'lo', 'hi', 'bad', 'cause', 'pc'] + const.F_REGS + ['fsr', 'fir']
+F_REGS = set(const.F_REGS)
+
+TARGET_XML = '<?xml version="1.0"?><!DOCTYPE target SYSTEM "gdb-target.dtd"><target><architecture>mips</architecture></target>'
+
+SIGINT = 2
+SIGILL = 4
+SIGTRAP = 5
+SIGSEGV = 11
+SIGXCPU = 24
+
+# Stop signal reported for an exception that ends the run
+SIGNALS = {ex.MemoryOutOfBounds: SIGSEGV, ex.MemoryAlignmentError: SIGSEGV,
+           ex.BreakpointException: SIGTRAP, ex.InstrCountExceed: SIGXCPU, ex.TimeLimitExceed: SIGXCPU}
+
+PACKET_SIZE = 0x4000
+
+
+def checksum(data: bytes) -> str:
+    return f'{sum(data) & 0xFF:02x}'
+
+
+class GdbServer:
+    '''Serves one gdb connection for an Interpreter.'''
+
+    def __init__(self, inter: Interpreter, host: str = '127.0.0.1', port: int = 1234) -> None:
+        self.inter = inter
+        self.breakpoints = set()
+        self.no_ack = False
+        self.finished = False
+        self.buffer = b''
+        self.conn = None
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(1)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.sock.getsockname()
+
+    def serve(self) -> None:
+        '''Wait for gdb to connect and handle its requests until it detaches or the program ends.'''
+        self.conn, _ = self.sock.accept()
+        self.sock.close()
+        try:
+            while not self.finished:
+                packet = self.read_packet()
+                if packet is None:
+                    break
+                try:
+                    reply = self.handle(packet)
+                except (ValueError, TypeError, IndexError):
+                    reply = 'E01'  # Malformed packet
+                if reply is not None:
+                    self.send(reply)
+        finally:
+            self.conn.close()
+
+    # Packet IO
+
+    def recv(self) -> bool:
+        data = self.conn.recv(4096)
+        self.buffer += data
+        return bool(data)
+
+    def read_packet(self) -> Optional[str]:
+        # Returns the payload of the next packet, None when gdb disconnects
+        while True:
+            start = self.buffer.find(b'$')
+            end = self.buffer.find(b'#', start)
+            if start >= 0 and end >= 0 and len(self.buffer) >= end + 3:
+                break
+            if not self.recv():
+                return None
+
+        # Anything before the packet is an ack (+/-) or a stray interrupt
+        payload = self.buffer[start + 1:end]
+        self.buffer = self.buffer[end + 3:]
+        if not self.no_ack:
+            self.conn.sendall(b'+')
+        return payload.decode('latin-1')
+
+    def send(self, reply: str) -> None:
+        data = reply.encode('latin-1')
+        self.conn.sendall(b'$' + data + b'#' + checksum(data).encode())
+
+    def interrupted(self) -> bool:
+        # gdb sends a bare 0x03 byte to interrupt a running program
+        if select.select([self.conn], [], [], 0)[0]:
+            self.recv()
+        if b'\x03' in self.buffer:
+            self.buffer = self.buffer.replace(b'\x03', b'')
+            return True
+        return False
+
+    # Requests
+
+    def handle(self, packet: str) -> Optional[str]:
+        kind, body = packet[:1], packet[1:]
+
+        if kind == '?':
+            return f'S{SIGTRAP:02x}'
+        elif kind == 'g':
+            return ''.join(self.read_register(i) for i in range(len(REGISTERS)))
+        elif kind == 'G':
+            for i in range(min(len(body) // 8, len(REGISTERS))):
+                self.write_register(i, body[8 * i:8 * i + 8])
+            return 'OK'
+        elif kind == 'p':
+            n = int(body, 16)
+            return self.read_register(n) if n < len(REGISTERS) else 'E01'
+        elif kind == 'P':
+            n, value = body.split('=')
+            self.write_register(int(n, 16), value)
+            return 'OK'
+        elif kind == 'm':
+            addr, length = (int(x, 16) for x in body.split(','))
+            return self.read_memory(addr, min(length, PACKET_SIZE // 2))
+        elif kind == 'M':
+            where, data = body.split(':')
+            addr = int(where.split(',')[0], 16)
+            self.write_memory(addr, bytes.fromhex(data))
+            return 'OK'
+        elif kind in ('Z', 'z'):
+            return self.set_breakpoint(kind == 'Z', *body.split(',')[:3])
+        elif kind == 'c':
+            return self.resume(step=False)
+        elif kind == 's':
+            return self.resume(step=True)
+        elif kind in ('D', 'k'):
+            self.finished = True
+            return 'OK' if kind == 'D' else None
+        elif kind == 'H':
+            return 'OK'
+        elif packet.startswith('qSupported'):
+            return f'PacketSize={PACKET_SIZE:x};QStartNoAckMode+;qXfer:features:read+'
+        elif packet == 'QStartNoAckMode':
+            self.send('OK')
+            self.no_ack = True
+            return None
+        elif packet.startswith('qXfer:features:read:target.xml:'):
+            offset, length = (int(x, 16) for x in packet.split(':')[-1].split(','))
+            chunk = TARGET_XML[offset:offset + length]
+            return ('m' if offset + length < len(TARGET_XML) else 'l') + chunk
+        elif packet == 'qAttached':
+            return '1'
+        elif packet == 'qC':
+            return 'QC1'
+        elif packet == 'qfThreadInfo':
+            return 'm1'
+        elif packet == 'qsThreadInfo':
+            return 'l'
+
+        return ''  # Not supported
+
+    def read_register(self, n: int) -> str:
+        name = REGISTERS[n]
+        value = self.inter.reg.get(name, 0)
+        if name in F_REGS:
+            return struct.pack('<f', value).hex()
+        return struct.pack('<I', value & 0xFFFFFFFF).hex()
+
+    def write_register(self, n: int, value: str) -> None:
+        name = REGISTERS[n]
+        if name not in self.inter.reg or name == '$zero':
+            return
+
+        raw = bytes.fromhex(value)
+        if name in F_REGS:
+            self.inter.reg[name] = float32(struct.unpack('<f', raw)[0])
+        elif name == 'pc':
+            self.inter.reg[name] = struct.unpack('<I', raw)[0]
+        else:
+            self.inter.reg[name] = struct.unpack('<i', raw)[0]
+
+    def read_memory(self, addr: int, length: int) -> str:
+        # Read straight from the byte map so uninitialized memory isn't filled in (or warned about)
+        data = self.inter.mem.data
+        return bytes(data.get(str(a & 0xFFFFFFFF), 0) for a in range(addr, addr + length)).hex()
+
+    def write_memory(self, addr: int, values: bytes) -> None:
+        mem = self.inter.mem
+        for i, byte in enumerate(values):
+            mem.setByte((addr + i) & 0xFFFFFFFF, byte, admin=True)
+
+    def set_breakpoint(self, insert: bool, kind: str, addr: str, length: str) -> str:
+        addr, length = int(addr, 16), int(length, 16)
+
+        if kind in ('0', '1'):  # Software or hardware breakpoint
+            if insert:
+                self.breakpoints.add(addr)
+            else:
+                self.breakpoints.discard(addr)
+        elif kind == '2':  # Write watchpoint
+            if insert:
+                self.inter.mem.add_watch(addr, length)
+            else:
+                self.inter.mem.remove_watch(addr, length)
+        else:
+            return ''
+
+        return 'OK'
+
+    def resume(self, step: bool) -> str:
+        '''Run (or single-step) the program and return the stop reply.'''
+        inter = self.inter
+        mem = inter.mem
+        count = 0
+        inter.start_clock()  # Time spent stopped in gdb doesn't count
+
+        try:
+            while inter.step():
+                if mem.watch_hit is not None:
+                    addr = mem.watch_hit[0]
+                    mem.watch_hit = None
+                    return f'T{SIGTRAP:02x}watch:{addr:x};'
+                if step or inter.reg['pc'] in self.breakpoints:
+                    return f'S{SIGTRAP:02x}'
+
+                count += 1
+                if not count & 0x3FF and self.interrupted():
+                    return f'S{SIGINT:02x}'
+
+        except ex.ProgramExit as e:
+            inter.exit_code = e.code
+            self.finished = True
+            return f'W{e.code & 0xFF:02x}'
+
+        except Exception as e:
+            # Stop with a signal so the state can still be inspected
+            print(f'{type(e).__name__}: {str(e).strip()} {inter.line_info}', file=sys.stderr)
+            return f'S{SIGNALS.get(type(e), SIGILL):02x}'
+
+        # Ran off the end of the text segment
+        self.finished = True
+        return 'W00'
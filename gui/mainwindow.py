@@ -6,7 +6,7 @@ from typing import Dict, Optional, Tuple, Union
 
 sys.path.append(os.getcwd())  # must be ran in sbumips directory (this is bc PYTHONPATH is weird in terminal)
 from constants import *
-from interpreter.interpreter import Interpreter
+from gui.qinterpreter import QInterpreter
 from sbumips import assemble
 from settings import settings
 from controller import Controller
@@ -390,7 +390,7 @@ class MainWindow(QMainWindow):
             for i in range(self.file_count):
                 self.save_file(wid=self.tabs.widget(i), ind=i)
             self.result = assemble(self.tabs.currentWidget().name)
-            self.intr = Interpreter(self.result, self.pa.text().split())
+            self.intr = QInterpreter(self.result, self.pa.text().split())
             self.controller.set_interp(self.intr)
             self.instrs = []
             self.update_screen(self.intr.reg['pc'])
@@ -584,7 +584,7 @@ class MainWindow(QMainWindow):
         self.controller.add_breakpoint(cmd)
 
     def remove_breakpoint(self, cmd: Tuple[str, str]) -> None:
-        self.controller.remove_breakpoint((f'"{cmd[1]}"', cmd[2]))
+        self.controller.remove_breakpoint(cmd)
 
     def search(self, text: str) -> None:
         '''Highlight text that matches the provided text in the current widget.'''
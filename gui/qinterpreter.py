@@ -0,0 +1,52 @@
+from typing import List
+
+from PySide2.QtCore import QObject, Signal
+
+import constants as const
+from interpreter.classes import Instruction
+from interpreter.interpreter import Interpreter
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+class QInterpreter(QObject, Interpreter):
+    '''Interpreter that forwards its events to Qt signals for the GUI.'''
+    step = Signal(int) # use to signal program counter increment
+    end = Signal(bool) # use to signal program termination
+    console_out = Signal(str) # use by out for printing to console
+    user_input = Signal(int) # use by input/set_input for user input syscalls
+
+    def __init__(self, code: List[Instruction], args: List[str]) -> None:
+        QObject.__init__(self)
+        Interpreter.__init__(self, code, args)
+
+    def on_step(self, pc: int) -> None:
+        self.step.emit(pc)
+
+    def on_end(self, running: bool) -> None:
+        self.end.emit(running)
+
+    def out(self, s: str, end='') -> None:
+        '''Prints to the console in the GUI'''
+        self.console_out.emit(f'{s}{end}')
+
+    def get_input(self, input_type: str) -> str:
+        '''Prompts the user for an input value through the GUI.'''
+        self.input_lock.clear()
+        self.user_input.emit(const.USER_INPUT_TYPE.index(input_type))
+        self.input_lock.wait()
+        return self.input_str
@@ -165,35 +165,3 @@ class PseudoInstr(Instruction):
     def __init__(self, op: str, instrs: List):
         super().__init__(op)
         self.instrs = instrs
-
-# Change classes for putting instructions on the stack
-class Change:
-    def __init__(self, pc: int):
-        self.pc = pc
-
-class FlagChange:
-    def __init__(self, flag: int, value: bool, pc: int):
-        self.flag = flag
-        self.value = value
-        self.pc = pc
-
-class MChange:
-    def __init__(self, hi: int, lo: int, pc: int):
-        self.pc = pc
-        self.hi = hi
-        self.lo = lo
-
-# type can be 'w', 'h', or 'b' to indicate word, halfword, and byte respectively
-class MemChange:
-    def __init__(self, addr: int, val: int, pc: int, type: str):
-        self.addr = addr
-        self.val = val
-        self.pc = pc
-        self.type = type
-
-class RegChange:
-    def __init__(self, reg: str, val: int, pc: int, is_double: bool = False):
-        self.reg = reg
-        self.val = val
-        self.pc = pc
-        self.is_double = is_double
\ No newline at end of file
@@ -1,9 +1,13 @@
+import operator
 import re
+from typing import Callable, Set, Union
 
 import constants as const
 from interpreter.classes import *
 from interpreter.exceptions import InvalidRegister
-from settings import settings
+from interpreter.timetravel import TimeTravel
+from interpreter.undo import UndoLog
+from settings import RunConfig
 
 '''
 https://github.com/sbustars/STARS
@@ -24,16 +28,22 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLI
 
 def print_usage_text() -> None:
     print("USAGE:  [b]reak <filename> <line_no>\n\
-[d]elete: Clear all breakpoints\n\
+[b]reak <filename> <line_no> if <reg|value> <op> <reg|value>: Only break when the condition holds\n\
+[w]atch <label|address> [length]: Break after an instruction writes to the memory range\n\
+[d]elete: Clear all breakpoints and watchpoints\n\
 [n]ext: Step to the next instruction\n\
 [c]ontinue: Run until the next breakpoint\n\
-[i]nfo b: Print information about the breakpoints\n\
+[o]ver: Step to the next instruction, running a called function to its return\n\
+[f]inish: Run until the current function returns\n\
+[u]ntil <label|address>: Run until the instruction at <label|address>\n\
+[i]nfo b: Print information about the breakpoints and watchpoints\n\
 [p]rint <flag>\
 [p]rint <reg> <format>\n\
 [p]rint <label> <data_type> <length> <format>\n\
 [q]uit: Terminate the program\n\
 [h]elp: Print this usage text\n\
-[r]everse: Step back to the previous instruction\n")
+[r]everse: Step back to the previous instruction\n\
+[g]oto <count>: Go back (or forward again) to instruction number <count>\n")
 
 
 def _print(cmd, interp):  # cmd = ['p', value, opts...]
@@ -241,6 +251,60 @@ def _print(cmd, interp):  # cmd = ['p', value, opts...]
     return True
 
 
+def find_line(interp, filename: str, line_no: int) -> Set[int]:
+    # Addresses of the instructions assembled from a source line. File names are stored quoted in the FileTags.
+    name = f'"{filename}"'
+    return {int(addr) for addr, instr in interp.mem.text.items()
+            if type(instr) is not str and instr.filetag.file_name == name and instr.filetag.line_no == line_no}
+
+
+CONDITION = re.compile(r'(\S+?)\s*(==|!=|<=|>=|<|>)\s*(\S+)')
+COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+               '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def compile_condition(text: str, interp) -> Callable:
+    # Turn '$t0 == 10' into a function of the interpreter, so the text is parsed only once
+    match = CONDITION.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f'Invalid condition: {text}')
+
+    def operand(token: str) -> Callable:
+        if token in interp.reg:
+            return lambda interp: interp.reg[token]
+
+        address = interp.mem.getLabel(token)
+        if address is None:
+            try:
+                address = int(token, 0)
+            except ValueError:
+                raise ValueError(f'{token} is not a register, label or number')
+        return lambda interp: address
+
+    left, compare, right = operand(match.group(1)), COMPARISONS[match.group(2)], operand(match.group(3))
+    return lambda interp: compare(left(interp), right(interp))
+
+
+def parse_address(token: str, interp) -> Union[int, None]:
+    address = interp.mem.getLabel(token)
+    if address is not None:
+        return address
+    try:
+        return int(token, 0)
+    except ValueError:
+        return None
+
+
+def is_call(instr) -> bool:
+    # jal, jalr and the branch and link instructions (bgezal, bltzal), which only call when taken
+    return (type(instr) is JType and instr.operation in {'jal', 'jalr'}
+            or type(instr) is Branch and instr.operation[-2:] == 'al')
+
+
+def is_return(instr) -> bool:
+    return type(instr) is JType and instr.operation == 'jr' and instr.target == '$ra'
+
+
 def quit(cmd, interp) -> None:
     for i in range(3, len(interp.mem.fileTable)):
         interp.mem.fileTable[i].close()
@@ -252,10 +316,19 @@ def next(cmd, interp) -> bool:
 
 
 class Debug:
-    def __init__(self):
-        self.stack = []
+    def __init__(self, config: RunConfig = None):
+        self.config = config if config is not None else RunConfig()
+        self.undo = UndoLog(self.config.undo_depth)
+        # Checkpoints for jumping to earlier instructions, only kept in debugging mode
+        if self.config.checkpoint_interval and (self.config.gui or self.config.debug):
+            self.travel = TimeTravel(self.config.checkpoint_interval, self.config.max_checkpoints)
+        else:
+            self.travel = None
         self.continueFlag = False
-        self.breakpoints = set()
+        self.breakpoints = {}  # (filename, lineno) -> condition text of the breakpoint, '' if it has none
+        self.break_pcs = set()  # Addresses checked by the interpret loop
+        self.conditions = {}  # Address -> compiled condition of a conditional breakpoint
+        self.stop_at = None  # Temporary stop condition of over, finish and until: f(pc, interp) -> bool
         self.handle = {'b': self.addBreakpoint,
                        'break': self.addBreakpoint,
                        'n': next,
@@ -271,7 +344,17 @@ class Debug:
                        'q': quit,
                        'quit': quit,
                        'r': self.reverse,
-                       'reverse': self.reverse}
+                       'reverse': self.reverse,
+                       'g': self.goto,
+                       'goto': self.goto,
+                       'w': self.addWatchpoint,
+                       'watch': self.addWatchpoint,
+                       'o': self.over,
+                       'over': self.over,
+                       'f': self.finish,
+                       'finish': self.finish,
+                       'u': self.until,
+                       'until': self.until}
 
     def listen(self, interp):
         def strip_marker(instr):
@@ -284,7 +367,7 @@ class Debug:
 
         loop = True
 
-        while loop and not settings['gui']:
+        while loop and not interp.config.gui:
             if type(interp.instr) is not str:
                 if interp.instr.is_from_pseudoinstr:
                     instr_text = interp.instr.original_text.strip()
@@ -307,26 +390,51 @@ class Debug:
             else:
                 print_usage_text()
 
-        if settings['gui']:
+        if interp.config.gui:
             interp.pause_lock.wait()
             if not self.continueFlag:
                 interp.pause_lock.clear()
 
-        self.push(interp)
+        self.record(interp)
 
-    def debug(self, instr) -> bool:
+    def debug(self, pc: int, interp) -> bool:
         # Returns whether to break execution and ask for input to debugger.
-        # If continueFlag is true, then don't break execution.
-        current = instr.filetag.file_name, str(instr.filetag.line_no)
-        
-        if settings['debug'] and current in self.breakpoints:
-            self.continueFlag = False
-            return True
+        # If continueFlag is true, then only break at a breakpoint, watchpoint or temporary stop.
+        hit = interp.mem.watch_hit
+        if hit is not None:
+            interp.mem.watch_hit = None
+            address, width, old, new = hit
+            digits = 2 * width + 2  # Hex digits of the stored value, with 0x
+            print(f'Watchpoint: {width} byte store to {address:#010x} changed {old:#0{digits}x} to {new:#0{digits}x}')
+            return self.stop()
 
         if not self.continueFlag:
-            return settings['debug']
+            return True
+
+        if self.stop_at is not None and self.stop_at(pc, interp):
+            return self.stop()
+
+        if pc in self.break_pcs:
+            condition = self.conditions.get(pc)
+            if condition is None or condition(interp):
+                return self.stop()
+
+        return False
+
+    def stop(self) -> bool:
+        self.continueFlag = False
+        self.stop_at = None
+        return True
+
+    def record(self, interp) -> None:
+        # Called before each instruction executes in debugging mode
+        if self.config.reverse_stepping:
+            self.push(interp)
+        elif len(self.undo):
+            self.undo.clear()  # The history has a gap, so it can't be used anymore
 
     def push(self, interp) -> None:
+        # Record what the instruction about to execute will overwrite
         def is_float_single(x):
             return '.s' in x
 
@@ -334,152 +442,127 @@ class Debug:
             return '.d' in x
 
         instr = interp.instr
-        prev = None
-
-        prev_pc = interp.reg['pc'] - 4
+        undo = self.undo
+        reg = interp.reg
+        prev_pc = reg['pc'] - 4
 
         if type(instr) in {RType, IType}:
             op = instr.operation
 
             if op in {'mult', 'multu', 'madd', 'maddu', 'msub', 'msubu', 'div', 'divu'}:
-                prev = MChange(interp.reg['hi'], interp.reg['lo'], prev_pc)
+                undo.reg(prev_pc, 'hi', reg['hi'])
+                undo.reg(prev_pc, 'lo', reg['lo'], linked=True)
 
             else:
                 dest_reg = instr.rd if type(instr) is RType else instr.rt
 
-                if is_float_single(op):
-                    prev = RegChange(dest_reg, interp.reg[dest_reg], prev_pc)
-                elif is_float_double(op):
-                    prev = RegChange(dest_reg, interp.reg[dest_reg], prev_pc, is_double=True)
+                if is_float_double(op):
+                    undo.reg_double(prev_pc, dest_reg, reg)
                 else:
-                    prev = RegChange(dest_reg, interp.reg[dest_reg], prev_pc)
+                    undo.reg(prev_pc, dest_reg, reg[dest_reg])
 
         elif type(instr) is Move:
-            reg = instr.rd if 'f' in instr.operation else instr.rs
-            prev = RegChange(reg, interp.reg[reg], prev_pc)
+            dest_reg = instr.rd if 'f' in instr.operation else instr.rs
+            undo.reg(prev_pc, dest_reg, reg[dest_reg])
 
         elif type(instr) is LoadImm:
-            prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc)
+            undo.reg(prev_pc, instr.rt, reg[instr.rt])
 
         elif type(instr) is JType:
             op = instr.operation
 
             # jal, jalr
             if 'l' in op:
-                if type(instr.target) is Label:
-                    prev = RegChange('$ra', interp.reg['$ra'], prev_pc)
-                else:
-                    prev = RegChange(instr.target, interp.reg[instr.target], prev_pc)
+                dest_reg = '$ra' if type(instr.target) is Label else instr.target
+                undo.reg(prev_pc, dest_reg, reg[dest_reg])
+            else:
+                undo.step(prev_pc)
 
         elif type(instr) is LoadMem:
             op = instr.operation
 
             # Loads
             if op[0] == 'l':
-                if is_float_single(op):
-                    prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc)
-                elif is_float_double(op):
-                    prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc, is_double=True)
+                if is_float_double(op):
+                    undo.reg_double(prev_pc, instr.rt, reg)
                 else:
-                    prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc)
+                    undo.reg(prev_pc, instr.rt, reg[instr.rt])
 
-            # Stores
+            # Stores: the old bytes are read directly, so uninitialized memory stays uninitialized when undone
             else:
-                addr = interp.reg[instr.rs] + instr.imm
+                addr = reg[instr.rs] + instr.imm
 
                 if is_float_single(op):
-                    prev = MemChange(addr, interp.mem.getFloat(addr), prev_pc, 'f')
+                    undo.mem(prev_pc, addr, 4, interp.mem.data)
                 elif is_float_double(op):
-                    prev = MemChange(addr, interp.mem.getDouble(addr), prev_pc, 'd')
+                    undo.mem(prev_pc, addr, 8, interp.mem.data)
                 elif op[1] == 'w':
-                    prev = MemChange(addr, interp.mem.getWord(addr), prev_pc, 'w')
+                    undo.mem(prev_pc, addr & ~3, 4, interp.mem.data)  # swl, swr write inside the aligned word
                 elif op[1] == 'h':
-                    prev = MemChange(addr, interp.mem.getHWord(addr), prev_pc, 'h')
+                    undo.mem(prev_pc, addr, 2, interp.mem.data)
                 else:
-                    prev = MemChange(addr, interp.mem.getByte(addr), prev_pc, 'b')
+                    undo.mem(prev_pc, addr, 1, interp.mem.data)
 
         elif type(instr) is Compare:
-            flag = instr.imm
-            prev = FlagChange(flag, interp.condition_flags[flag], prev_pc)
+            undo.flag(prev_pc, instr.imm, interp.condition_flags[instr.imm])
 
         elif type(instr) is Convert:
-            dest_reg = instr.rs
-
             if instr.format_to == 'd':
-                prev = RegChange(dest_reg, interp.reg[dest_reg], prev_pc, is_double=True)
+                undo.reg_double(prev_pc, instr.rt, reg)
             else:
-                prev = RegChange(dest_reg, interp.reg[dest_reg], prev_pc)
+                undo.reg(prev_pc, instr.rt, reg[instr.rt])
 
         elif type(instr) is MoveFloat:
             op = instr.operation
             if op == 'mtc1':
-                prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc)
+                undo.reg(prev_pc, instr.rt, reg[instr.rt])
             elif op == 'mfc1':
-                prev = RegChange(instr.rs, interp.reg[instr.rs], prev_pc)
+                undo.reg(prev_pc, instr.rs, reg[instr.rs])
             elif is_float_single(op):
-                prev = RegChange(instr.rd, interp.reg[instr.rd], prev_pc)
+                undo.reg(prev_pc, instr.rd, reg[instr.rd])
             else:
-                prev = RegChange(instr.rd, interp.reg[instr.rd], prev_pc, is_double=True)
+                undo.reg_double(prev_pc, instr.rd, reg)
 
         elif type(instr) is MoveCond:
-            if is_float_single(op):
-                prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc)
-            elif is_float_double(op):
-                prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc, is_double=True)
+            if is_float_double(instr.operation):
+                undo.reg_double(prev_pc, instr.rt, reg)
             else:
-                prev = RegChange(instr.rt, interp.reg[instr.rt], prev_pc)
+                undo.reg(prev_pc, instr.rt, reg[instr.rt])
 
-        else:  # branches, nops, jr, j
-            prev = Change(prev_pc)
+        # bgezal, bltzal: $ra is only written when taken, but restoring it either way is harmless
+        elif type(instr) is Branch and instr.operation[-2:] == 'al':
+            undo.reg(prev_pc, '$ra', reg['$ra'])
 
-        self.stack.append(prev)
+        else:  # branches, nops, jr, j
+            undo.step(prev_pc)
 
     def reverse(self, cmd, interp) -> bool:
-        def is_float_reg(reg):
-            return reg in const.F_REGS
-
-        prev = None
-        if len(self.stack) > 0:
-            prev = self.stack.pop()
+        prev_pc = self.undo.pop(interp)
 
-            if type(prev) is RegChange:
-                if is_float_reg(prev.reg):
-                    if prev.is_double:
-                        interp.set_reg_double(prev.reg, prev.val)
-                    else:
-                        interp.set_register(prev.reg, prev.val)
+        if prev_pc is not None:
+            interp.reg['pc'] = prev_pc + 4
+            interp.instr = interp.mem.text[str(prev_pc)]
 
-                else:
-                    interp.reg[prev.reg] = prev.val
-
-            elif type(prev) is MemChange:
-                if prev.type == 'f':
-                    interp.mem.addFloat(prev.val, prev.addr)
-                elif prev.type == 'd':
-                    interp.mem.addDouble(prev.val, prev.addr)
-                elif prev.type == 'w':
-                    interp.mem.addWord(prev.val, prev.addr)
-                elif prev.type == 'h':
-                    interp.mem.addHWord(prev.val, prev.addr)
-                else:
-                    interp.mem.addByte(prev.val, prev.addr)
+        if interp.config.gui:
+            print(interp.reg['pc'])
+            if prev_pc is not None:
+                interp.on_step(prev_pc)
+            else:
+                interp.on_step(interp.config.initial_pc)
 
-            elif type(prev) is MChange:
-                interp.reg['hi'] = prev.hi
-                interp.reg['lo'] = prev.lo
+        return True
 
-            elif type(prev) is FlagChange:
-                interp.condition_flags[prev.flag] = prev.value
+    def goto(self, cmd, interp) -> bool:  # cmd = ['g', count]
+        if len(cmd) != 2 or not cmd[1].isdecimal():
+            print_usage_text()
+            return True
 
-            interp.reg['pc'] = prev.pc + 4
-            interp.instr = interp.mem.text[str(prev.pc)]
+        if self.travel is None or not self.travel.goto(interp, int(cmd[1])):
+            print(f'Cannot go to instruction {cmd[1]}')
+            return True
 
-        if settings['gui']:
-            print(interp.reg['pc'])
-            if prev != None:
-                interp.step.emit(prev.pc)
-            else:
-                interp.step.emit(settings['initial_pc'])
+        if interp.config.gui:
+            interp.on_step(interp.reg['pc'] - 4)
 
         return True
 
@@ -487,27 +570,118 @@ class Debug:
         self.continueFlag = True
         return False
 
+    def over(self, cmd, interp) -> bool:
+        # Only a call needs to run on; anything else is a single step
+        if not is_call(interp.instr):
+            return False
+
+        return_pc, sp = interp.reg['pc'], interp.reg['$sp']
+        # $sp tells a return to this frame apart from a recursive call returning to the same address
+        self.stop_at = lambda pc, interp: pc == return_pc and interp.reg['$sp'] >= sp
+        return self.cont(cmd, interp)
+
+    def finish(self, cmd, interp) -> bool:
+        depth = 0
+        returned = False
+        branch_return = None  # Return address of a branch and link, which may not be taken
+
+        def returns(pc, interp) -> bool:
+            # Follow the call depth through the instructions as they are about to execute
+            nonlocal depth, returned, branch_return
+            if returned:
+                return True
+
+            if branch_return is not None:
+                if pc == branch_return:
+                    depth -= 1  # Not taken: it wasn't a call after all
+                branch_return = None
+
+            if is_call(interp.instr):
+                depth += 1
+                if type(interp.instr) is Branch:
+                    branch_return = pc + 4
+            elif is_return(interp.instr):
+                if depth == 0:
+                    returned = True
+                depth -= 1
+            return False
+
+        returns(interp.reg['pc'] - 4, interp)  # The instruction the program stopped at
+        self.stop_at = returns
+        return self.cont(cmd, interp)
+
+    def until(self, cmd, interp) -> bool:  # cmd = ['u', label or address]
+        target = parse_address(cmd[1], interp) if len(cmd) == 2 else None
+
+        if target is None or str(target) not in interp.mem.text:
+            print_usage_text()
+            return True
+
+        self.stop_at = lambda pc, interp: pc == target
+        return self.cont(cmd, interp)
+
     def printBreakpoints(self, cmd, interp) -> bool:
         count = 1
-        for b in self.breakpoints:
-            print(f'{count} {b[0]} {b[1]}')
+        for b, condition in self.breakpoints.items():
+            print(f'{count} {b[0]} {b[1]}{f" if {condition}" if condition else ""}')
+            count += 1
+        for start, end in interp.mem.watches:
+            print(f'{count} watch {start:#010x} {end - start}')
             count += 1
         return True
 
-    def addBreakpoint(self, cmd: List[str], interp) -> bool:  # cmd = ['b', filename, lineno]
-        if len(cmd) == 3 and str(cmd[2]).isdecimal():
-            self.breakpoints.add((f'"{cmd[1]}"', cmd[2]))  # filename, lineno
+    def addBreakpoint(self, cmd: List[str], interp) -> bool:  # cmd = ['b', filename, lineno, 'if', condition...]
+        if (len(cmd) == 3 or (len(cmd) > 4 and cmd[3] == 'if')) and str(cmd[2]).isdecimal():
+            pcs = find_line(interp, cmd[1], int(cmd[2]))
+
+            if not pcs:
+                print(f'No instructions at {cmd[1]} line {cmd[2]}')
+                return True
+
+            condition = ' '.join(cmd[4:])
+            if condition:
+                try:
+                    compiled = compile_condition(condition, interp)
+                except ValueError as e:
+                    print(e)
+                    return True
+
+            self.removeBreakpoint(cmd[1:3], interp)
+            self.breakpoints[(cmd[1], cmd[2])] = condition
+            self.break_pcs.update(pcs)
+            if condition:
+                self.conditions.update({pc: compiled for pc in pcs})
             return True
 
         print_usage_text()
         return True
 
+    def addWatchpoint(self, cmd: List[str], interp) -> bool:  # cmd = ['w', label or address, length]
+        if len(cmd) in (2, 3):
+            start = parse_address(cmd[1], interp)
+            length = cmd[2] if len(cmd) == 3 else '4'
+
+            if start is not None and length.isdecimal() and int(length) > 0:
+                interp.mem.add_watch(start, int(length))
+                return True
+
+        print_usage_text()
+        return True
+
     def clearBreakpoints(self, cmd: List[str], interp) -> bool:
         if len(cmd) == 1:
-            self.breakpoints = []
+            self.breakpoints = {}
+            self.break_pcs = set()
+            self.conditions = {}
+            interp.mem.clear_watches()
         else:
             print_usage_text()
         return True
 
-    def removeBreakpoint(self, cmd: List[str], interp) -> None:
-        self.breakpoints.remove((cmd[0], cmd[1]))
+    def removeBreakpoint(self, cmd: List[str], interp) -> None:  # cmd = [filename, lineno]
+        if self.breakpoints.pop((cmd[0], str(cmd[1])), None) is None:
+            return
+
+        for pc in find_line(interp, cmd[0], int(cmd[1])):
+            self.break_pcs.discard(pc)
+            self.conditions.pop(pc, None)
@@ -45,6 +45,8 @@ class InvalidInput(MessageException):
     pass
 class InstrCountExceed(MessageException):
     pass
+class TimeLimitExceed(MessageException):
+    pass
 class BreakpointException(MessageException):
     pass
 class FileAlreadyIncluded(MessageException):
@@ -54,4 +56,10 @@ class InvalidEQV(MessageException):
 class InvalidArgument(MessageException):
     pass
 class NoMainLabel(MessageException):
-    pass
\ No newline at end of file
+    pass
+class OutputMismatch(MessageException):
+    pass
+class ProgramExit(Exception):
+    '''Raised by the exit syscalls to stop the program. Not an error.'''
+    def __init__(self, code: int = 0):
+        self.code = code
@@ -580,6 +580,8 @@ table = {'abs': _abs,
          'bltz': bltz,
          'bgtz': bgtz,
          'bgez': bgez,
+         'bltzal': bltz,  # The branch and link instructions also set $ra when taken
+         'bgezal': bgez,
          'bne': bne,
          'jal': jal,
          'jalr': jalr,
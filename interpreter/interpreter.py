@@ -1,13 +1,12 @@
-import os
 import random
 import re
 import struct
 import sys
+import time
 from collections import OrderedDict
 from threading import Event, Lock
+from typing import Optional, TextIO
 
-from PySide2.QtCore import Signal
-from PySide2.QtWidgets import QWidget
 from numpy import float32
 
 import constants as const
@@ -15,8 +14,11 @@ from interpreter import exceptions as ex, instructions as instrs
 from interpreter.classes import *
 from interpreter.debugger import Debug
 from interpreter.memory import Memory
+from interpreter.snapshot import Snapshot, restore_snapshot, take_snapshot
+from interpreter.stats import Stats, phase
+from interpreter.tracer import ACCESS_WIDTH, Tracer
 from interpreter.syscalls import syscalls
-from settings import settings
+from settings import RunConfig
 
 '''
 https://github.com/sbustars/STARS
@@ -35,15 +37,15 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLI
 '''
 
 
-class Interpreter(QWidget):
-    step = Signal(int) # use to signal program counter increment
-    end = Signal(bool) # use to signal program termination
-    console_out = Signal(str) # use by out for printing to console
-    user_input = Signal(int) # use by input/set_input for user input syscalls
+class Interpreter:
+    '''The core MIPS engine. It has no dependency on Qt; front ends observe
+    execution by overriding the on_* hooks, out and get_input (see gui/qinterpreter.py).'''
 
-    def __init__(self, code: List[Instruction], args: List[str]) -> None:
-        if settings['gui']:
-            super().__init__()
+    def __init__(self, code: List[Instruction], args: List[str], config: RunConfig = None,
+                 stdin: TextIO = None, stdout: TextIO = None, stats: Optional[Stats] = None) -> None:
+        # Per-run settings and random number generator
+        self.config = config if config is not None else RunConfig()
+        self.rng = random.Random(self.config.seed)
         # For user input syscalls
         self.pause_lock = Event()
         self.input_lock = Event()
@@ -53,16 +55,29 @@ class Interpreter(QWidget):
         self.reg_initialized = set()
         self.reg = OrderedDict()
         self.condition_flags = [False] * 8
-        self.init_registers(settings['garbage_registers'])
+        self.init_registers(self.config.garbage_registers)
         # Memory and program arguments
-        self.mem = Memory(settings['garbage_memory'])
-        self.handleArgs(args)
-        self.initialize_memory(code)
+        self.stats = stats  # Measures the phases and syscalls of the run if set
+        with phase(stats, 'initialize'):
+            self.mem = Memory(self.config.garbage_memory, self.config, self.rng)
+            self.set_streams(stdin, stdout)
+            self.handleArgs(args)
+            self.initialize_memory(code)
         # For error messages
         self.line_info = ''
-        self.debug = Debug()
+        self.debug = Debug(self.config)
         self.instruction_count = 0
+        self.deadline = None  # Time (time.monotonic) the run must end by, set by start_clock
         self.instr = None
+        self.exit_code = 0
+        self.tracers = []
+
+    def set_streams(self, stdin: TextIO = None, stdout: TextIO = None) -> None:
+        '''Set the streams used by the I/O syscalls (None for the terminal).'''
+        self.stdin = stdin
+        self.stdout = stdout
+        self.mem.fileTable[0] = stdin if stdin is not None else sys.stdin
+        self.mem.fileTable[1] = stdout if stdout is not None else sys.stdout
 
     def initialize_memory(self, code: List[Instruction]) -> None:
         '''Initialize memory by adding instructions to the data/text section 
@@ -99,8 +114,8 @@ class Interpreter(QWidget):
     def handleArgs(self, args: List[str]) -> None:
         '''Add program arguments to the run time stack.'''
         if len(args) > 0:
-            saveAddr = settings['data_max'] - 3
-            temp = settings['initial_$sp'] - 4 - (4 * len(args))
+            saveAddr = self.config.data_max - 3
+            temp = self.config.initial_sp - 4 - (4 * len(args))
             # args.reverse()
             stack = temp
             self.mem.addWord(len(args), stack)
@@ -116,24 +131,25 @@ class Interpreter(QWidget):
             self.reg['$a1'] = temp + 4
 
     def init_registers(self, randomize: bool) -> None:
+        initial = self.config.initial_registers
         for r in const.REGS:
-            if f'initial_{r}' in settings.keys():
-                self.reg[r] = settings[f'initial_{r}']
+            if r in initial:
+                self.reg[r] = initial[r]
             elif randomize and r not in const.CONST_REGS:
-                self.reg[r] = random.randint(0, 2 ** 32 - 1)
+                self.reg[r] = self.rng.randint(0, 2 ** 32 - 1)
             else:
                 self.reg[r] = 0
 
         for r in const.F_REGS:
             if randomize:
-                random_bytes = os.urandom(4)
+                random_bytes = self.rng.getrandbits(32).to_bytes(4, 'big')
                 self.reg[r] = float32(struct.unpack('>f', random_bytes)[0])
             else:
                 self.reg[r] = float32(0.0)
 
     def get_register(self, reg: str) -> Union[int, float32]:
         key = reg if reg != '$0' else '$zero'
-        if settings['warnings'] and key[1] in {'s', 't', 'a', 'v'} and key not in {'$at', '$sp'} and key not in self.reg_initialized:
+        if self.config.warnings and key[1] in {'s', 't', 'a', 'v'} and key not in {'$at', '$sp'} and key not in self.reg_initialized:
             print(f'Reading from uninitialized register {key}!', file=sys.stderr)
         if key[1] == 'f':
             return self.reg[key]
@@ -161,7 +177,7 @@ class Interpreter(QWidget):
         if data_type == 'float':
             data = [utility.create_float32(d) for d in data]
         elif data_type == 'space':
-            data = [random.randint(0, 0xFF) if settings['garbage_memory'] else 0
+            data = [self.rng.randint(0, 0xFF) if self.config.garbage_memory else 0
                     for i in range(data)]
         # If a label is specified, add the label to memory
         if line.name:
@@ -314,6 +330,9 @@ class Interpreter(QWidget):
         # Load or store from memory
         elif type(instr) is LoadMem:
             addr = self.get_register(instr.rs) + instr.imm
+            if self.tracers:
+                for tracer in self.tracers:
+                    tracer.memory(self, addr, ACCESS_WIDTH[op], op[0] == 's')
             if op in {'lwr', 'lwl'}:
                 result = instrs.table[op](addr, self.mem, self.get_register(instr.rt))
                 self.set_register(instr.rt, result)
@@ -364,8 +383,11 @@ class Interpreter(QWidget):
         # syscall
         elif type(instr) is Syscall:
             code = self.get_register('$v0')
-            if code in syscalls and code in settings['enabled_syscalls']:
-                syscalls[code](self)
+            if code in syscalls and code in self.config.enabled_syscalls:
+                if self.stats is None:
+                    syscalls[code](self)
+                else:
+                    self.stats.syscall(code, syscalls[code], self)
             else:
                 raise ex.InvalidSyscall('Not a valid syscall code:')
 
@@ -438,53 +460,109 @@ class Interpreter(QWidget):
         '''Goes through the text segment and executes each instruction.'''
         first = True
         debug = self.debug
+        config = self.config
+        self.start_clock()
+        check_limits = self.check_limits
+        travel = debug.travel
+        tracers = self.tracers
         try:
             while True: # Get the next instruction and increment pc
+                if travel is not None and self.instruction_count >= travel.next_checkpoint:
+                    travel.checkpoint(self)
                 pc = self.reg['pc']
                 if str(pc) not in self.mem.text:
                     raise ex.MemoryOutOfBounds(f'{pc} is not a valid address')
-                if self.instruction_count > settings['max_instructions']:
-                    raise ex.InstrCountExceed(f'Exceeded maximum instruction count: {settings["max_instructions"]}')
+                check_limits()
 
                 self.instr = self.mem.text[str(pc)]
                 if self.instr == 'TERMINATE_EXECUTION':
-                    if settings['debug']:
+                    if config.debug:
                         print()
                         debug.listen(self)
-                    if settings['gui']:
-                        self.end.emit(False)
+                    if config.gui:
+                        self.on_end(False)
                     break
                 self.reg['pc'] += 4
                 self.instruction_count += 1
                 self.line_info = str(self.instr.filetag)
-                if settings['gui']:
-                    self.step.emit(pc)
+                if config.gui:
+                    self.on_step(pc)
 
-                if debug.debug(self.instr):
+                if config.debug and debug.debug(pc, self):
                     if not debug.continueFlag:
                         self.pause_lock.clear()
-                    if settings['gui']:
+                    if config.gui:
                         debug.listen(self)
-                    elif not settings['gui'] and settings['debug']:
+                    elif not config.gui and config.debug:
                         debug.listen(self)
                     else:
                         first = False
-                elif settings['gui'] and type(self.instr) is Syscall and self.reg['$v0'] in [10, 17]:
-                    if settings['disp_instr_count']:
+                elif config.gui and type(self.instr) is Syscall and self.reg['$v0'] in [10, 17]:
+                    if config.disp_instr_count:
                         self.out(f'\nInstruction count: {self.instruction_count}')
-                    self.end.emit(False)
+                    self.on_end(False)
                     break
-
-                if settings['gui']:
-                    debug.push(self)
+                elif config.gui:
+                    debug.record(self)  # listen records the instruction itself when it pauses
                 self.execute_instr(self.instr) # execute
+                if tracers:
+                    for tracer in tracers:
+                        tracer.step(self, pc, self.instr)
+        except ex.ProgramExit as e:
+            self.exit_code = e.code
+            for tracer in tracers:
+                tracer.step(self, pc, self.instr)  # The exit syscall
+            if config.gui:
+                self.on_end(False)
         except Exception as e:
             if hasattr(e, 'message'):
                 e.message += f' {self.line_info}' 
-                if settings['gui']:
-                    self.end.emit(False)
+                if config.gui:
+                    self.on_end(False)
             raise e
 
+    def start_clock(self) -> None:
+        '''Start the time limit of the run (config.time_limit) from now.'''
+        self.deadline = time.monotonic() + self.config.time_limit if self.config.time_limit else None
+
+    def check_limits(self) -> None:
+        '''Raise InstrCountExceed or TimeLimitExceed if the run has gone past its limits.
+
+        Called before each instruction by interpret and step. The time limit only
+        applies once start_clock was called.'''
+        if self.instruction_count > self.config.max_instructions:
+            raise ex.InstrCountExceed(f'Exceeded maximum instruction count: {self.config.max_instructions}')
+        # The clock is only checked every 1024 instructions to keep the loop cheap
+        if self.deadline is not None and not self.instruction_count & 0x3FF and time.monotonic() > self.deadline:
+            raise ex.TimeLimitExceed(f'Exceeded time limit: {self.config.time_limit} seconds')
+
+    def add_tracer(self, tracer: Tracer) -> None:
+        '''Have tracer observe every instruction this interpreter executes.'''
+        tracer.attach(self)
+        self.tracers.append(tracer)
+
+    def step(self) -> bool:
+        '''Execute the next instruction without any of the debugging or GUI hooks.
+
+        Returns False, without executing anything, once the program has reached its end.
+        The exit syscalls raise ProgramExit and the limits are checked as in interpret.'''
+        pc = self.reg['pc']
+        if str(pc) not in self.mem.text:
+            raise ex.MemoryOutOfBounds(f'{pc} is not a valid address')
+        self.check_limits()
+
+        self.instr = self.mem.text[str(pc)]
+        if self.instr == 'TERMINATE_EXECUTION':
+            return False
+
+        self.reg['pc'] += 4
+        self.instruction_count += 1
+        self.line_info = str(self.instr.filetag)
+        self.execute_instr(self.instr)
+        for tracer in self.tracers:
+            tracer.step(self, pc, self.instr)
+        return True
+
     def dump(self) -> None:
         '''Dump the contents in registers and memory.'''
         print('Registers:')
@@ -495,22 +573,32 @@ class Interpreter(QWidget):
         print('Memory:')
         self.mem.dump()
 
+    def snapshot(self) -> Snapshot:
+        '''Capture the machine state so it can be restored later (see interpreter/snapshot.py).'''
+        return take_snapshot(self)
+
+    def restore(self, snap: Snapshot) -> None:
+        '''Return to the machine state captured by snapshot.'''
+        restore_snapshot(self, snap)
+
     def out(self, s: str, end='') -> None:
-        '''Prints to terminal or the console in the GUI'''
-        if settings['gui']:
-            self.console_out.emit(f'{s}{end}')
-        else:
-            print(s, end=end)
+        '''Prints to terminal (or self.stdout). Front ends override this to redirect the output.'''
+        print(s, end=end, file=self.stdout)
 
     def get_input(self, input_type: str) -> str:
         '''Prompts the user for an input value.'''
-        if settings['gui']:
-            self.input_lock.clear()
-            self.user_input.emit(const.USER_INPUT_TYPE.index(input_type))
-            self.input_lock.wait()
-            return self.input_str
-        else:
+        if self.stdin is None:
             return input()
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError('No more input')
+        return line.rstrip('\n')
+
+    def read_input(self, input_type: str) -> str:
+        '''Input for the input syscalls. It is logged while debugging so time travel can replay it.'''
+        if self.debug.travel is None:
+            return self.get_input(input_type)
+        return self.debug.travel.input(self, input_type)
 
     def set_input(self, string: str) -> None:
         '''Set input string to the provided string'''
@@ -519,3 +607,11 @@ class Interpreter(QWidget):
             self.input_str = string
             self.input_lock.set()
         self.lock_input.release()
+
+    def on_step(self, pc: int) -> None:
+        '''Called with the address of the instruction about to execute (GUI mode only).'''
+        pass
+
+    def on_end(self, running: bool) -> None:
+        '''Called when the program terminates (GUI mode only).'''
+        pass
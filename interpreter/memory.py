@@ -10,7 +10,7 @@ from constants import WORD_MASK
 from interpreter import exceptions as ex
 from interpreter import utility
 from interpreter.instructions import overflow_detect
-from settings import settings
+from settings import RunConfig
 
 '''
 https://github.com/sbustars/STARS
@@ -29,22 +29,28 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLI
 '''
 
 
+PAGE_BITS = 12  # Watchpoints and snapshots are tracked per 4 KiB page
+
+
 # Check for out of bounds
-def check_bounds(addr: int) -> None:
+def check_bounds(addr: int, data_min: int) -> None:
     if addr < 0:
         return
-    if addr < settings['data_min']:
+    if addr < data_min:
         raise ex.MemoryOutOfBounds(f"{utility.format_hex(addr)} is not within the data section or heap/stack.")
 
 
 class Memory:
-    def __init__(self, toggle_garbage: bool = False):
+    def __init__(self, toggle_garbage: bool = False, config: RunConfig = None, rng: random.Random = None):
+        self.config = config if config is not None else RunConfig()
+        self.rng = rng if rng is not None else random.Random(self.config.seed)
+
         self.text = OrderedDict()  # Instructions
         self.data = OrderedDict()  # Main memory
         self.stack = OrderedDict()
 
-        self.textPtr = settings['initial_pc']
-        self.dataPtr = settings['data_min']
+        self.textPtr = self.config.initial_pc
+        self.dataPtr = self.config.data_min
         self.labels = {}  # Dictionary to store the labels and their addresses
 
         self.toggle_garbage = toggle_garbage
@@ -53,6 +59,16 @@ class Memory:
                                       (2, sys.stderr)])
         self.heapPtr = 0x10040000
 
+        # Watchpoints: writes are only checked against the ranges on pages that contain one
+        self.watches = []  # (start, end) address ranges
+        self.watched_pages = set()
+        self.watch_hit = None  # (address, width, old value, new value) of the last store to a watched range
+
+        # Snapshots share the pages that didn't change with the one before (see snapshot.py), so once one is
+        # taken, every write to data must go through setByte or be passed to written
+        self.pages = None  # Pages of the last snapshot taken or restored
+        self.dirty = None  # Keys of data written since then
+
     # Add an instruction to memory
     def addText(self, instr) -> None:
         self.text[str(self.textPtr)] = instr
@@ -64,28 +80,70 @@ class Memory:
         if addr < 0:
             addr += 2 ** 32
         if not admin:
-            check_bounds(addr)
-        self.data[str(addr)] = data
+            check_bounds(addr, self.config.data_min)
+        key = str(addr)
+        self.data[key] = data
+        if self.dirty is not None:
+            self.dirty.add(key)
+
+    def written(self, keys) -> None:
+        # Note keys of data changed without setByte for the next snapshot
+        if self.dirty is not None:
+            self.dirty.update(keys)
+
+    def store(self, addr: int, width: int, data: int, admin=False) -> None:
+        # Store the width least significant bytes of data, starting from the LSB (little endian)
+        if self.watched_pages:
+            self.check_watch(addr, width, data)
+        for i in range(width):
+            self.setByte(addr + i, (data >> (8 * i)) & 0xFF, admin)
+
+    def add_watch(self, start: int, length: int) -> None:
+        start &= WORD_MASK
+        self.watches.append((start, start + length))
+        self.watched_pages.update(range(start >> PAGE_BITS, ((start + length - 1) >> PAGE_BITS) + 1))
+
+    def remove_watch(self, start: int, length: int) -> None:
+        watches = [w for w in self.watches if w != (start & WORD_MASK, (start & WORD_MASK) + length)]
+        self.clear_watches()
+        for watch_start, watch_end in watches:
+            self.add_watch(watch_start, watch_end - watch_start)
+
+    def clear_watches(self) -> None:
+        self.watches = []
+        self.watched_pages = set()
+        self.watch_hit = None
+
+    def check_watch(self, addr: int, width: int, data: int) -> None:
+        # Note the store as a hit if it overlaps a watched range, with the values of all its bytes
+        addr &= WORD_MASK
+        pages = range(addr >> PAGE_BITS, ((addr + width - 1) >> PAGE_BITS) + 1)
+        if not any(page in self.watched_pages for page in pages):
+            return
+
+        for start, end in self.watches:
+            if start < addr + width and addr < end:
+                old = sum(self.data.get(str(addr + i), 0) << (8 * i) for i in range(width))  # Unwritten bytes read as 0
+                self.watch_hit = (addr, width, old, data & ((1 << 8 * width) - 1))
+                return
 
     # Add a word (4 bytes) to memory
     def addWord(self, data: int, addr: int) -> None:
         if addr % 4 != 0:
             raise ex.MemoryAlignmentError(f"{utility.format_hex(addr)} is not word aligned.")
 
-        for i in range(4):  # Set byte by byte starting from LSB
-            self.setByte(addr + i, (data >> (8 * i)) & 0xFF)
+        self.store(addr, 4, data)
 
     # Add a half word (2 bytes) to memory. Only looks at the least significant half-word of data.
     def addHWord(self, data: int, addr: int) -> None:
         if addr % 2 != 0:
             raise ex.MemoryAlignmentError(f"{utility.format_hex(addr)} is not half-word aligned.")
 
-        for i in range(2):  # Set byte by byte starting from LSB
-            self.setByte(addr + i, (data >> (8 * i)) & 0xFF)
+        self.store(addr, 2, data)
 
     def addByte(self, data: int, addr: int, admin=False) -> None:
         # Add a byte to memory. Only looks at the LSB of data.
-        self.setByte(addr, data & 0xFF, admin)
+        self.store(addr, 1, data, admin)
 
     # Add a single precision floating point to memory
     def addFloat(self, data: float32, addr: int) -> None:
@@ -99,11 +157,14 @@ class Memory:
 
         data_int = int.from_bytes(struct.pack('>d', data), 'big', signed=True)
 
-        self.addWord(data_int & WORD_MASK, addr)  # Lower 32 bits
-        self.addWord(data_int >> 32, addr + 4)  # Upper 32 bits
+        self.store(addr, 8, data_int)  # Lower 32 bits, then upper 32 bits
 
     # Add a string to memory
     def addAscii(self, s: str, addr: int, null_terminate: bool = False) -> None:
+        if self.watched_pages and (s or null_terminate):
+            data = sum((ord(c) & 0xFF) << (8 * i) for i, c in enumerate(s))
+            self.check_watch(addr, len(s) + null_terminate, data)
+
         for c in s:
             self.setByte(addr, ord(c))
             addr += 1
@@ -127,7 +188,7 @@ class Memory:
         # Returns an decimal integer representation of the byte (-128 ~ 127) if signed
         # Returns (0 ~ 255) if unsigned
         if not admin:
-            check_bounds(int(addr))
+            check_bounds(int(addr), self.config.data_min)
         if type(addr) is str:
             addr = int(addr)
         if addr < 0:
@@ -144,13 +205,14 @@ class Memory:
 
         else:
             # Randomly generate a byte
-            if settings['warnings']:
+            if self.config.warnings:
                 print(f'Warning: Reading from uninitialized byte {utility.format_hex(int(addr))}!', file=sys.stderr)
 
+            # Filled in with setByte, so the read isn't taken for a store by the watchpoints
             if self.toggle_garbage:
-                self.addByte(random.randint(0, 0xFF), addr, admin=admin)
+                self.setByte(addr, self.rng.randint(0, 0xFF), admin=admin)
             else:
-                self.addByte(0, addr, admin=admin)
+                self.setByte(addr, 0, admin=admin)
 
             return self.getByte(addr, signed=signed, admin=admin)
 
@@ -163,7 +225,7 @@ class Memory:
         acc = 0  # Result
 
         for i in reversed(range(4)):  # Little Endian: Go from MSB to LSB
-            check_bounds(addr + i)
+            check_bounds(addr + i, self.config.data_min)
 
             # Get the ith byte of the word
             byte = self.getByte(addr + i, signed=False)
@@ -181,7 +243,7 @@ class Memory:
         acc = 0  # Result
 
         for i in reversed(range(2)):  # Little Endian: Go from MSB to LSB
-            check_bounds(addr + i)
+            check_bounds(addr + i, self.config.data_min)
 
             # Get the ith byte of the word
             byte = self.getByte(addr + i, signed=False)
@@ -0,0 +1,227 @@
+import json
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from numpy import float32
+
+import constants as const
+from interpreter.memory import PAGE_BITS
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+MAGIC = b'STARSNAP'
+VERSION = 1
+
+
+class Snapshot:
+    '''The machine state of an Interpreter at one point of its run.
+
+    The text segment is not part of the snapshot: it never changes after the
+    program is loaded, so a snapshot can only be restored into an Interpreter
+    built from the same program (text_end is checked).
+
+    Memory is kept in pages, which are never changed once they are in a
+    snapshot, so the pages that weren't written between two snapshots are
+    shared by them instead of copied.'''
+
+    def __init__(self, reg: Dict, condition_flags: List[bool], reg_initialized: set, pages: Dict[int, Dict],
+                 heap_ptr: int, files: List[Tuple], instruction_count: int, rng_state: Tuple, text_end: int) -> None:
+        self.reg = reg
+        self.condition_flags = condition_flags
+        self.reg_initialized = reg_initialized
+        self.pages = pages  # Page number -> the memory contents on that page, same layout as Memory.data
+        self.heap_ptr = heap_ptr
+        self.files = files  # (fd, name, mode, position, file object or None) of the files the program opened
+        self.instruction_count = instruction_count
+        self.rng_state = rng_state
+        self.text_end = text_end
+
+    @property
+    def data(self) -> Dict:
+        '''All the memory contents, in a new dict laid out like Memory.data.'''
+        data = OrderedDict()
+        for page in self.pages.values():
+            data.update(page)
+        return data
+
+
+def split_pages(data: Dict) -> Dict[int, Dict]:
+    pages = {}
+    for key, value in data.items():
+        pages.setdefault(int(key) >> PAGE_BITS, {})[key] = value
+    return pages
+
+
+def take_snapshot(inter) -> Snapshot:
+    '''Capture the state of inter. The containers are copied, so the snapshot is unaffected by the run.
+
+    Only the pages written since the last snapshot taken or restored are copied.'''
+    mem = inter.mem
+    files = []
+    for fd, f in mem.fileTable.items():
+        if fd >= 3:
+            files.append((fd, f.name, f.mode, f.tell(), f))
+
+    if mem.pages is None:
+        pages = split_pages(mem.data)
+    else:
+        pages = dict(mem.pages)
+        copied = set()
+        for key in mem.dirty:
+            page = int(key) >> PAGE_BITS
+            if page not in copied:
+                pages[page] = dict(pages.get(page, ()))
+                copied.add(page)
+            if key in mem.data:
+                pages[page][key] = mem.data[key]
+            else:
+                pages[page].pop(key, None)  # Undone
+    mem.pages, mem.dirty = pages, set()
+
+    return Snapshot(inter.reg.copy(), list(inter.condition_flags), set(inter.reg_initialized), pages,
+                    mem.heapPtr, files, inter.instruction_count, inter.rng.getstate(), mem.textPtr)
+
+
+def restore_snapshot(inter, snap: Snapshot) -> None:
+    '''Put inter back into the state captured by snap.'''
+    mem = inter.mem
+    if snap.text_end != mem.textPtr:
+        raise ValueError('Snapshot was taken from a different program')
+
+    inter.reg = snap.reg.copy()
+    inter.condition_flags = list(snap.condition_flags)
+    inter.reg_initialized = set(snap.reg_initialized)
+    mem.data = snap.data
+    mem.pages, mem.dirty = snap.pages, set()
+    mem.heapPtr = snap.heap_ptr
+    inter.instruction_count = snap.instruction_count
+    inter.rng.setstate(snap.rng_state)
+    inter.instr = None
+    inter.line_info = ''
+
+    # Reopen or rewind the files the program had open
+    kept = {}
+    for fd, name, mode, pos, f in snap.files:
+        if f is None or f.closed or mem.fileTable.get(fd) is not f:
+            # Don't truncate a file that was opened for writing
+            f = open(name, 'r+' if mode == 'w' else mode)
+        f.seek(pos)
+        kept[fd] = f
+
+    for fd in [fd for fd in mem.fileTable if fd >= 3]:
+        f = mem.fileTable.pop(fd)
+        if f not in kept.values():
+            f.close()
+    mem.fileTable.update(kept)
+
+    # The undo history doesn't apply to the restored state
+    inter.debug.undo.clear()
+
+
+def _pack_registers(reg: Dict) -> Dict:
+    packed = {}
+    for name, value in reg.items():
+        if name in const.F_REGS:
+            value = struct.unpack('>I', struct.pack('>f', value))[0]
+        packed[name] = value
+    return packed
+
+
+def _unpack_registers(packed: Dict) -> Dict:
+    reg = OrderedDict()
+    for name in const.REGS + const.F_REGS:
+        value = packed[name]
+        if name in const.F_REGS:
+            value = float32(struct.unpack('>f', struct.pack('>I', value))[0])
+        reg[name] = value
+    return reg
+
+
+def _pack_memory(data: Dict) -> bytes:
+    # Memory is stored as runs of consecutive bytes: start (4 bytes), length (4 bytes), contents
+    out = bytearray()
+    addrs = sorted(int(a) for a in data)
+    i = 0
+    while i < len(addrs):
+        j = i
+        while j + 1 < len(addrs) and addrs[j + 1] == addrs[j] + 1:
+            j += 1
+        out += struct.pack('<II', addrs[i], j - i + 1)
+        out += bytes(data[str(a)] for a in addrs[i:j + 1])
+        i = j + 1
+    return bytes(out)
+
+
+def _unpack_memory(raw: bytes) -> Dict:
+    data = OrderedDict()
+    i = 0
+    while i < len(raw):
+        start, length = struct.unpack_from('<II', raw, i)
+        i += 8
+        for offset, byte in enumerate(raw[i:i + length]):
+            data[str(start + offset)] = byte
+        i += length
+    return data
+
+
+def dumps(snap: Snapshot) -> bytes:
+    '''Serialize a snapshot: a JSON header with the CPU state followed by the memory runs, compressed with zlib.'''
+    rng_version, rng_internal, rng_gauss = snap.rng_state
+    header = json.dumps({
+        'version': VERSION,
+        'reg': _pack_registers(snap.reg),
+        'condition_flags': snap.condition_flags,
+        'reg_initialized': sorted(snap.reg_initialized),
+        'heap_ptr': snap.heap_ptr,
+        'files': [(fd, name, mode, pos) for fd, name, mode, pos, _ in snap.files],
+        'instruction_count': snap.instruction_count,
+        'rng_state': [rng_version, list(rng_internal), rng_gauss],
+        'text_end': snap.text_end,
+    }).encode()
+
+    body = struct.pack('<I', len(header)) + header + _pack_memory(snap.data)
+    return MAGIC + zlib.compress(body)
+
+
+def loads(raw: bytes) -> Snapshot:
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a STARS snapshot')
+
+    body = zlib.decompress(raw[len(MAGIC):])
+    length = struct.unpack_from('<I', body)[0]
+    header = json.loads(body[4:4 + length].decode())
+    if header['version'] != VERSION:
+        raise ValueError(f'Unsupported snapshot version {header["version"]}')
+
+    rng_version, rng_internal, rng_gauss = header['rng_state']
+    files = [(fd, name, mode, pos, None) for fd, name, mode, pos in header['files']]
+
+    return Snapshot(_unpack_registers(header['reg']), header['condition_flags'], set(header['reg_initialized']),
+                    split_pages(_unpack_memory(body[4 + length:])), header['heap_ptr'], files, header['instruction_count'],
+                    (rng_version, tuple(rng_internal), rng_gauss), header['text_end'])
+
+
+def save(snap: Snapshot, filename: str) -> None:
+    with open(filename, 'wb') as f:
+        f.write(dumps(snap))
+
+
+def load(filename: str) -> Snapshot:
+    with open(filename, 'rb') as f:
+        return loads(f.read())
@@ -0,0 +1,137 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, TextIO
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Phases of a run, in order: assembly (sbumips.assemble), memory initialization (Interpreter.__init__) and execution
+PHASES = ['walk', 'preprocess', 'lex', 'parse', 'link', 'initialize', 'execute']
+
+
+def peak_rss() -> Optional[int]:
+    '''Peak resident set size of the process so far in bytes, None where it can't be read.'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Kilobytes except on macOS
+
+
+class Stats:
+    '''Wall time and peak RSS of each phase of assembling and running a program, and the time spent in each syscall.
+
+    Code that can be measured takes an optional Stats and does nothing extra
+    when it is None. Peak RSS is the high-water mark of the process at the end
+    of a phase, so in a process that ran other jobs before it reflects them
+    too. RSS growth is how much the phase itself raised that mark.'''
+
+    def __init__(self) -> None:
+        self.phases = OrderedDict()  # type: Dict[str, Dict]
+        self.syscalls = {}  # type: Dict[int, Dict]
+
+    def phase(self, name: str) -> 'Phase':
+        '''Context manager measuring the block as the phase name. Subclasses can measure something else.'''
+        return Phase(self, name)
+
+    def add(self, name: str, seconds: float, rss_before: Optional[int] = None) -> None:
+        '''Add seconds to a phase. rss_before is the peak RSS when the phase started.'''
+        phase = self.phases.setdefault(name, {'seconds': 0.0, 'peak_rss': None, 'rss_growth': None})
+        phase['seconds'] += seconds
+        phase['peak_rss'] = peak_rss()
+        if phase['peak_rss'] is not None and rss_before is not None:
+            phase['rss_growth'] = (phase['rss_growth'] or 0) + phase['peak_rss'] - rss_before
+
+    def split(self, name: str, part: str, seconds: float) -> None:
+        '''Move seconds measured as part of the phase name to the phase part, for work interleaved with it.'''
+        self.phases[name]['seconds'] -= seconds
+        phase = self.phases.setdefault(part, {'seconds': 0.0, 'peak_rss': None, 'rss_growth': None})
+        phase['seconds'] += seconds
+        phase['peak_rss'] = self.phases[name]['peak_rss']
+
+    def syscall(self, code: int, fn: Callable, inter) -> None:
+        '''Run a syscall and add its time to its code. The exit syscalls count although they raise.'''
+        start = time.perf_counter()
+        try:
+            fn(inter)
+        finally:
+            entry = self.syscalls.setdefault(code, {'name': fn.__name__, 'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += time.perf_counter() - start
+
+    def to_dict(self) -> Dict:
+        '''The measurements as plain data, e.g. for the results of a batch run.'''
+        phases = OrderedDict((name, dict(self.phases[name])) for name in PHASES if name in self.phases)
+        return {
+            'phases': phases,
+            'syscalls': {str(code): dict(entry) for code, entry in sorted(self.syscalls.items())},
+            'seconds': sum(phase['seconds'] for phase in phases.values()),
+            'peak_rss': peak_rss(),
+        }
+
+    def report(self, out: TextIO = sys.stderr) -> None:
+        stats = self.to_dict()
+        out.write(f'{"phase":<12} {"seconds":>10} {"peak RSS MB":>12} {"growth MB":>10}\n')
+        for name, phase in stats['phases'].items():
+            out.write(f'{name:<12} {phase["seconds"]:10.4f} {megabytes(phase["peak_rss"]):>12}'
+                      f' {megabytes(phase["rss_growth"]):>10}\n')
+        out.write(f'{"total":<12} {stats["seconds"]:10.4f} {megabytes(stats["peak_rss"]):>12}\n')
+
+        if stats['syscalls']:
+            out.write(f'\n{"syscall":<20} {"count":>10} {"seconds":>10}\n')
+            for code, entry in stats['syscalls'].items():
+                out.write(f'{code + " " + entry["name"]:<20} {entry["count"]:10d} {entry["seconds"]:10.4f}\n')
+
+
+def megabytes(size: Optional[int]) -> str:
+    return '-' if size is None else f'{size / 2 ** 20:.1f}'
+
+
+class Phase:
+    '''Context manager adding the time spent in it to a phase.'''
+
+    def __init__(self, stats: Stats, name: str) -> None:
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.rss = peak_rss()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> bool:
+        self.stats.add(self.name, time.perf_counter() - self.start, self.rss)
+        return False
+
+
+class NoPhase:
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+NO_PHASE = NoPhase()
+
+
+def phase(stats: Optional[Stats], name: str):
+    '''with phase(stats, name): measures the block as the phase name, or does nothing if stats is None.'''
+    return NO_PHASE if stats is None else stats.phase(name)
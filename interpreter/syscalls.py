@@ -1,7 +1,5 @@
-import random
 from typing import Dict, Union
 
-from settings import settings
 from constants import WORD_SIZE, WORD_MASK
 from interpreter import exceptions as ex
 from interpreter import utility
@@ -132,7 +130,7 @@ def atoi(inter) -> None:
 
 
 def readInteger(inter) -> None:
-    read = inter.get_input("int")
+    read = inter.read_input("int")
 
     try:
         inter.set_register('$v0', int(read))
@@ -142,7 +140,7 @@ def readInteger(inter) -> None:
 
 
 def readString(inter) -> None:
-    s = inter.get_input("str")
+    s = inter.read_input("str")
 
     s = utility.handle_escapes(s)
     s = s[:inter.get_register('$a1')]
@@ -151,8 +149,8 @@ def readString(inter) -> None:
 
 
 def sbrk(inter) -> None:
-    if inter.mem.heapPtr > settings['initial_$sp']:
-        raise ex.MemoryOutOfBounds('Heap has exceeded the upper limit of ' + str(settings['initial_$sp']))
+    if inter.mem.heapPtr > inter.config.initial_sp:
+        raise ex.MemoryOutOfBounds('Heap has exceeded the upper limit of ' + str(inter.config.initial_sp))
 
     size = inter.get_register('$a0')
 
@@ -167,12 +165,7 @@ def sbrk(inter) -> None:
 
 
 def _exit(inter) -> None:
-    if settings['disp_instr_count']:
-        inter.out(f'\nInstruction count: {inter.instruction_count}')
-    if settings['gui']:
-        inter.end.emit(False)
-    else:
-        exit()
+    raise ex.ProgramExit(0)
 
 
 def printChar(inter) -> None:
@@ -343,17 +336,13 @@ def dumpFiles(inter) -> None:
 
 
 def _exit2(inter) -> None:
-    if settings['gui']:
-        inter.end.emit(False)
-    if settings['disp_instr_count']:
-        inter.out(f'\nInstruction count: {inter.instruction_count}')
-    exit(inter.get_register('$a0'))
+    raise ex.ProgramExit(inter.get_register('$a0'))
 
 
 # For random integer generation
 def setSeed(inter) -> None:
     # a0: seed
-    random.seed(inter.get_register('$a0'))
+    inter.rng.seed(inter.get_register('$a0'))
 
 
 def randInt(inter) -> None:
@@ -364,7 +353,7 @@ def randInt(inter) -> None:
     if upper < 0:
         raise ex.InvalidArgument('Upper value for randInt must be nonnegative')
 
-    inter.set_register('$v0', random.randint(0, upper))
+    inter.set_register('$v0', inter.rng.randint(0, upper))
 
 
 syscalls = {1: printInt,
@@ -390,3 +379,6 @@ syscalls = {1: printInt,
             36: printUnsignedInt,
             40: setSeed,
             41: randInt}
+
+# Syscalls that return a value in $v0
+RETURNS_V0 = {5, 6, 9, 13, 14, 15, 41}
@@ -0,0 +1,110 @@
+import io
+from bisect import bisect_right
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+
+class _NullStream(io.TextIOBase):
+    def write(self, s: str) -> int:
+        return len(s)
+
+
+def _discard(s: str, end: str = '') -> None:
+    pass
+
+
+class TimeTravel:
+    '''Lets the debugger jump back to any earlier instruction count.
+
+    A snapshot of the machine is taken every interval instructions and the
+    input read by syscalls is logged, so any earlier point can be reached by
+    restoring the nearest checkpoint before it and replaying forward. The RNG
+    and open files are part of the snapshots, so the replay is deterministic.
+    At most max_checkpoints are kept: when there are more, every other one is
+    dropped and the interval doubles.'''
+
+    def __init__(self, interval: int, max_checkpoints: int) -> None:
+        self.interval = interval
+        self.max_checkpoints = max(max_checkpoints, 2)
+        self.checkpoints = []  # Snapshots, in order of instruction count
+        self.counts = []  # Instruction count of each checkpoint
+        self.next_checkpoint = 0
+        self.furthest = 0  # Largest instruction count reached before the last jump
+        self.inputs = {}  # Instruction count of an input syscall -> the input it read
+
+    def checkpoint(self, inter) -> None:
+        # Called by the interpret loop once instruction_count reaches next_checkpoint
+        self.checkpoints.append(inter.snapshot())
+        self.counts.append(inter.instruction_count)
+
+        if len(self.checkpoints) > self.max_checkpoints:
+            self.checkpoints = self.checkpoints[::2]
+            self.counts = self.counts[::2]
+            self.interval *= 2
+
+        self.next_checkpoint = inter.instruction_count + self.interval
+
+    def input(self, inter, input_type: str) -> str:
+        '''Input for the syscall executing now: the logged input if this point was reached before.'''
+        count = inter.instruction_count
+        if count not in self.inputs:
+            self.inputs[count] = inter.get_input(input_type)
+        return self.inputs[count]
+
+    def goto(self, inter, count: int) -> bool:
+        '''Put inter in the state it had when the loop was about to execute instruction number count.
+
+        Returns False if that point was never reached.'''
+        self.furthest = max(self.furthest, inter.instruction_count)
+        if not 0 < count <= self.furthest or not self.counts:
+            return False
+
+        i = bisect_right(self.counts, count - 1) - 1
+        inter.restore(self.checkpoints[i])
+
+        # Replay up to the instruction before, without repeating the output: the print syscalls
+        # go through out (which front ends override) and writes to fd 1 through the file table
+        stdout, file_out = inter.stdout, inter.mem.fileTable[1]
+        own_out = vars(inter).get('out')
+        inter.stdout = inter.mem.fileTable[1] = _NullStream()
+        inter.out = _discard
+        try:
+            while inter.instruction_count < count - 1:
+                self._step(inter)
+                inter.debug.record(inter)
+                inter.execute_instr(inter.instr)
+        finally:
+            inter.stdout = stdout
+            inter.mem.fileTable[1] = file_out
+            if own_out is None:
+                del inter.out
+            else:
+                inter.out = own_out
+
+        inter.mem.watch_hit = None  # Writes during the replay already happened before
+        # Not recorded: the debugger records it like any instruction it stopped at once it runs on
+        self._step(inter)
+        return True
+
+    @staticmethod
+    def _step(inter) -> None:
+        # Fetch the next instruction like the interpret loop does
+        pc = inter.reg['pc']
+        inter.instr = inter.mem.text[str(pc)]
+        inter.reg['pc'] += 4
+        inter.instruction_count += 1
+        inter.line_info = str(inter.instr.filetag)
@@ -0,0 +1,44 @@
+from interpreter.classes import Instruction
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Bytes accessed by each load and store
+ACCESS_WIDTH = {
+    'lb': 1, 'lbu': 1, 'sb': 1,
+    'lh': 2, 'lhu': 2, 'sh': 2,
+    'lw': 4, 'sw': 4, 'lwl': 4, 'lwr': 4, 'swl': 4, 'swr': 4, 'l.s': 4, 's.s': 4,
+    'l.d': 8, 's.d': 8,
+}
+
+
+class Tracer:
+    '''Observes a run one instruction at a time. Attach with Interpreter.add_tracer.
+
+    The interpret loop only calls into tracers when at least one is attached,
+    so runs without them don't pay for tracing.'''
+
+    def attach(self, inter) -> None:
+        '''Called once by add_tracer, after the program is loaded.'''
+        pass
+
+    def step(self, inter, pc: int, instr: Instruction) -> None:
+        '''Called after the instruction at pc executes. inter.reg['pc'] is the address of the next one.'''
+        pass
+
+    def memory(self, inter, addr: int, size: int, store: bool) -> None:
+        '''Called by loads and stores before they access memory, with the address and the number of bytes.'''
+        pass
@@ -0,0 +1,161 @@
+import struct
+from array import array
+
+from numpy import float32
+
+import constants as const
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Kinds of undo log entries
+STEP = 0  # Nothing to restore besides pc
+REG = 1  # target: register index, value: old contents
+FREG = 2  # target: register index, value: bit pattern of the old float
+MEM = 3  # target: address, value: old bytes (little endian)
+FLAG = 4  # target: condition flag, value: old flag
+KIND_MASK = 0xF
+LINKED = 0x10  # Entry belongs to the same instruction as the entry before it
+# MEM entries keep log2 of the width in bits 5-6 and which bytes were initialized in bits 8-15
+
+REG_NAMES = const.REGS + const.F_REGS
+REG_INDEX = {name: i for i, name in enumerate(REG_NAMES)}
+F_REGS = set(const.F_REGS)
+
+MASK64 = 2 ** 64 - 1
+
+
+class UndoLog:
+    '''Bounded history of the state overwritten by each executed instruction, used for reverse stepping.
+
+    Entries are kept in parallel arrays used as a ring buffer, so the oldest
+    entries are dropped once depth entries are recorded. The arrays grow on
+    demand, so an unused log takes no memory.'''
+
+    def __init__(self, depth: int) -> None:
+        self.depth = max(depth, 2) if depth > 0 else 0
+        self.kind = array('H')
+        self.pc = array('I')
+        self.target = array('I')
+        self.value = array('Q')
+        self.start = 0  # Index of the oldest entry
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self) -> None:
+        self.start = 0
+        self.count = 0
+
+    def _add(self, kind: int, pc: int, target: int, value: int) -> None:
+        if self.count == self.depth:
+            if not self.depth:
+                return
+            self._drop_oldest()
+
+        i = self.start + self.count
+        if i >= self.depth:
+            i -= self.depth
+
+        if i == len(self.kind):
+            self.kind.append(kind)
+            self.pc.append(pc)
+            self.target.append(target)
+            self.value.append(value)
+        else:
+            self.kind[i] = kind
+            self.pc[i] = pc
+            self.target[i] = target
+            self.value[i] = value
+        self.count += 1
+
+    def _drop_oldest(self) -> None:
+        # Drop the oldest instruction along with the rest of its entries
+        while True:
+            self.start = (self.start + 1) % self.depth
+            self.count -= 1
+            if not self.count or not self.kind[self.start] & LINKED:
+                break
+
+    def step(self, pc: int) -> None:
+        self._add(STEP, pc, 0, 0)
+
+    def reg(self, pc: int, reg: str, value, linked: bool = False) -> None:
+        link = LINKED if linked else 0
+        if reg not in F_REGS:
+            self._add(REG | link, pc, REG_INDEX[reg], value & MASK64)
+        else:
+            bits = struct.unpack('>I', struct.pack('>f', value))[0]
+            self._add(FREG | link, pc, REG_INDEX[reg], bits)
+
+    def reg_double(self, pc: int, reg: str, reg_values) -> None:
+        # A double occupies an even/odd pair of float registers
+        self.reg(pc, reg, reg_values[reg])
+        n = int(reg[2:]) + 1
+        if n < len(const.F_REGS):
+            self.reg(pc, f'$f{n}', reg_values[f'$f{n}'], linked=True)
+
+    def mem(self, pc: int, addr: int, width: int, data) -> None:
+        addr &= 0xFFFFFFFF
+        value = 0
+        initialized = 0
+        for i in range(width):
+            byte = data.get(str(addr + i))
+            if byte is not None:
+                value |= byte << (8 * i)
+                initialized |= 1 << i
+
+        kind = MEM | (width.bit_length() - 1) << 5 | initialized << 8
+        self._add(kind, pc, addr, value)
+
+    def flag(self, pc: int, flag: int, value: bool) -> None:
+        self._add(FLAG, pc, flag, int(value))
+
+    def pop(self, interp) -> int:
+        '''Undo the most recent instruction on interp. Returns its pc, or None if the log is empty.'''
+        while self.count:
+            self.count -= 1
+            i = (self.start + self.count) % self.depth
+            kind = self.kind[i]
+            self._undo(interp, kind & KIND_MASK, kind, self.target[i], self.value[i])
+
+            if not kind & LINKED or not self.count:
+                return self.pc[i]
+
+        return None
+
+    @staticmethod
+    def _undo(interp, kind: int, flags: int, target: int, value: int) -> None:
+        if kind == REG:
+            interp.reg[REG_NAMES[target]] = value if value < 2 ** 63 else value - 2 ** 64
+
+        elif kind == FREG:
+            interp.reg[REG_NAMES[target]] = float32(struct.unpack('>f', struct.pack('>I', value))[0])
+
+        elif kind == MEM:
+            data = interp.mem.data
+            initialized = flags >> 8
+            width = 1 << ((flags >> 5) & 3)
+            for i in range(width):
+                if initialized & (1 << i):
+                    data[str(target + i)] = (value >> (8 * i)) & 0xFF
+                else:
+                    data.pop(str(target + i), None)
+            interp.mem.written(str(target + i) for i in range(width))
+
+        elif kind == FLAG:
+            interp.condition_flags[target] = bool(value)
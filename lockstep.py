@@ -0,0 +1,212 @@
+import hashlib
+import io
+import json
+from typing import Dict, Iterator, List, Optional, Union
+
+import constants as const
+from interpreter import exceptions as ex
+from interpreter.classes import Syscall
+from interpreter.interpreter import Interpreter
+from runner import Program, load_program, make_config
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Lockstep comparison: a run is reduced to a stream of events, one per syscall
+# and one for the end of the run, and two streams are compared event by event.
+#
+# An event is a dict with
+#     syscall       the service number in $v0, and
+#     output        the text the syscall printed
+#     registers     {name: value} of the compared registers before the syscall (optional)
+#     memory        digest of the data segment and heap before the syscall (optional)
+# or, for the last event, one of
+#     exit          the exit code
+#     error         the exception that stopped the run, with its message
+# and, not compared, the source line and instruction count of the syscall.
+
+COMPARED = ['syscall', 'output', 'registers', 'memory', 'exit', 'error']
+
+
+def parse_registers(spec: str) -> List[str]:
+    '''Register names from a comma separated list, e.g. "v0,a0,$f0". The $ is optional.'''
+    names = []
+    for name in filter(None, spec.split(',')):
+        if name not in const.REGS and '$' + name in const.REGS + const.F_REGS:
+            name = '$' + name
+        if name not in const.REGS + const.F_REGS:
+            raise ValueError(f'{name} is not a register')
+        names.append(name)
+    return names
+
+
+def memory_digest(inter: Interpreter) -> str:
+    '''Digest of the data segment and the heap, where the contents don't depend on the code layout.'''
+    data = inter.mem.data
+    start, end = inter.config.data_min, inter.mem.heapPtr
+    h = hashlib.sha1()
+    for addr in sorted(int(a) for a in data):
+        if start <= addr < end:
+            h.update(addr.to_bytes(4, 'little') + bytes([data[str(addr)] & 0xFF]))
+    return h.hexdigest()
+
+
+def events(inter: Interpreter, registers: Optional[List[str]] = None, memory: bool = False) -> Iterator[Dict]:
+    '''Run inter one instruction at a time, yielding an event at each syscall and at the end.
+
+    The output syscalls must write to a StringIO set with set_streams; it is
+    emptied at each event. Stopping the iteration stops the run.'''
+    out = inter.stdout
+    inter.start_clock()
+
+    def output() -> str:
+        text = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return text
+
+    event = None
+    try:
+        while True:
+            instr = inter.mem.text.get(str(inter.reg['pc']))
+            if type(instr) is Syscall:
+                event = {'syscall': inter.reg['$v0']}
+                if registers:
+                    event['registers'] = {name: value if type(value) is int else float(value)
+                                          for name, value in ((name, inter.get_register(name)) for name in registers)}
+                if memory:
+                    event['memory'] = memory_digest(inter)
+
+            if not inter.step():
+                yield {'exit': 0, 'output': output(), 'line': inter.line_info, 'instruction_count': inter.instruction_count}
+                return
+
+            if event is not None:
+                event.update({'output': output(), 'line': inter.line_info, 'instruction_count': inter.instruction_count})
+                yield event
+                event = None
+
+    except ex.ProgramExit as e:
+        yield {'exit': e.code, 'output': output(), 'line': inter.line_info, 'instruction_count': inter.instruction_count}
+
+    except Exception as e:
+        yield {'error': f'{type(e).__name__}: {str(e).strip()}', 'output': output(), 'line': inter.line_info,
+               'instruction_count': inter.instruction_count}
+
+    finally:
+        for fd in [fd for fd in inter.mem.fileTable if fd >= 3]:
+            inter.mem.fileTable.pop(fd).close()
+
+
+def start(program: Program, stdin: str = '', args: Optional[List[str]] = None, limits: Optional[Dict] = None,
+          registers: Optional[List[str]] = None, memory: bool = False) -> Iterator[Dict]:
+    '''The events of a run of program. A program that doesn't assemble has a single error event.'''
+    try:
+        inter = Interpreter(load_program(program), args or [], make_config(limits))
+    except Exception as e:
+        return iter([{'error': f'{type(e).__name__}: {str(e).strip()}', 'output': '', 'line': '', 'instruction_count': 0}])
+
+    inter.set_streams(io.StringIO(stdin), io.StringIO())
+    return events(inter, registers, memory)
+
+
+def record(program: Program, stdin: str = '', args: Optional[List[str]] = None, limits: Optional[Dict] = None,
+           registers: Optional[List[str]] = None, memory: bool = False) -> List[Dict]:
+    '''All the events of a run, e.g. of a reference solution to compare against later.'''
+    return list(start(program, stdin, args, limits, registers, memory))
+
+
+def save_events(events: List[Dict], filename: str) -> None:
+    with open(filename, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+
+
+def load_events(filename: str) -> List[Dict]:
+    with open(filename) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Divergence:
+    '''First difference between a run and its reference.'''
+
+    def __init__(self, index: int, field: str, expected: Dict, actual: Dict) -> None:
+        self.index = index  # Number of the event, from 0
+        self.field = field
+        self.expected = expected
+        self.actual = actual
+
+    @property
+    def line(self) -> str:
+        '''Source line of the run where it diverged.'''
+        return self.actual.get('line', '')
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__, line=self.line)
+
+    def __str__(self) -> str:
+        if self.field in ('syscall', 'exit', 'error'):
+            expected, actual = describe(self.expected), describe(self.actual)
+        else:
+            expected, actual = repr(self.expected.get(self.field)), repr(self.actual.get(self.field))
+        return f'Event {self.index} differs in {self.field} at {self.line}: expected {expected}, got {actual}'
+
+
+def describe(event: Dict) -> str:
+    if 'syscall' in event:
+        return f'syscall {event["syscall"]}'
+    if 'exit' in event:
+        return f'exit {event["exit"]}'
+    if 'error' in event:
+        return event['error']
+    return 'the end of the run'
+
+
+def diverge(index: int, expected: Dict, actual: Dict) -> Optional[Divergence]:
+    for field in COMPARED:
+        if expected.get(field) != actual.get(field):
+            return Divergence(index, field, expected, actual)
+    return None
+
+
+def compare(program: Program, reference: Union[Program, List[Dict]], stdin: str = '',
+            args: Optional[List[str]] = None, limits: Optional[Dict] = None,
+            registers: Optional[List[str]] = None, memory: bool = False) -> Optional[Divergence]:
+    '''Run program against reference, a program run in lockstep with it or the recorded events of one.
+
+    Both get the same input and arguments. The run stops at the first event
+    that differs, which is returned; None means the runs match.'''
+    if isinstance(reference, list) and all(isinstance(event, dict) for event in reference):
+        # Recorded events only have the registers and memory that were asked for when recording
+        for field, wanted in (('registers', registers), ('memory', memory)):
+            if wanted and any('syscall' in event and field not in event for event in reference):
+                raise ValueError(f'The recorded events have no {field}: record them comparing {field} too')
+        expected = iter(reference)
+    else:
+        expected = start(reference, stdin, args, limits, registers, memory)
+    actual = start(program, stdin, args, limits, registers, memory)
+
+    try:
+        for index, want in enumerate(expected):
+            divergence = diverge(index, want, next(actual, {}))
+            if divergence is not None:
+                return divergence
+        return None
+    finally:
+        # Stop both runs
+        for run in (expected, actual):
+            if hasattr(run, 'close'):
+                run.close()
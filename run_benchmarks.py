@@ -0,0 +1,58 @@
+import argparse
+import json
+import sys
+
+from benchmarks.assembler import SWEEPS, sweep
+from benchmarks.suite import compare, run_suite
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(description='Runs the performance benchmarks')
+    p.add_argument('names', nargs='*', help='Benchmarks to run, by name or prefix, e.g. execute/ (default: all)')
+    p.add_argument('-r', '--repeat', type=int, default=5, help='Timed repetitions of each benchmark (default: 5)')
+    p.add_argument('--assembler', nargs='?', const='all', choices=['all'] + list(SWEEPS), metavar='SWEEP',
+                   help='Times each assembler stage on generated programs growing in one setting: '
+                        f'{", ".join(SWEEPS)} (default: all of them), instead of running the suite')
+    p.add_argument('-o', '--output', type=str, help='File to save the results to as JSON')
+    p.add_argument('--compare', type=str, metavar='FILE', help='Compares the results with earlier results saved with -o')
+    p.add_argument('--threshold', type=float, default=0.1,
+                   help='Slowdown reported as a regression by --compare (default: 0.1, i.e. 10%%)')
+    args = p.parse_args()
+
+    if args.assembler:
+        names = list(SWEEPS) if args.assembler == 'all' else [args.assembler]
+        sweeps = []
+        for name in names:
+            sys.stderr.write(f'\n{name}\n')
+            sweeps.append(sweep(name, args.repeat))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'sweeps': sweeps}, f, indent=2)
+        sys.exit()
+
+    results = run_suite(args.names, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        sys.stderr.write('\n')
+        if compare(old, results, args.threshold):
+            sys.exit(1)
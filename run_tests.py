@@ -4,6 +4,11 @@ from tests.preprocess.test_preprocess import TestPreprocess
 from tests.instructions.test import TestSBUMips
 from tests.fileOps.test_fileOps import TestFileOps
 from tests.floatInstrs.test import FloatTest
+from tests.runner.test_runner import TestRunner
+from tests.snapshot.test_snapshot import TestSnapshot
+from tests.debugger.test_debugger import TestDebugger
+from tests.analysis.test_analysis import TestAnalysis
+from tests.lockstep.test_lockstep import TestLockstep
 import unittest
 from os import chdir
 
@@ -30,4 +35,24 @@ if __name__ == '__main__':
 
     chdir('../floatInstrs')
     suite = unittest.defaultTestLoader.loadTestsFromTestCase(testCaseClass=FloatTest)
-    unittest.TextTestRunner().run(suite)
\ No newline at end of file
+    unittest.TextTestRunner().run(suite)
+
+    chdir('../runner')
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(testCaseClass=TestRunner)
+    unittest.TextTestRunner().run(suite)
+
+    chdir('../snapshot')
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(testCaseClass=TestSnapshot)
+    unittest.TextTestRunner().run(suite)
+
+    chdir('../debugger')
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(testCaseClass=TestDebugger)
+    unittest.TextTestRunner().run(suite)
+
+    chdir('../analysis')
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(testCaseClass=TestAnalysis)
+    unittest.TextTestRunner().run(suite)
+
+    chdir('../lockstep')
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(testCaseClass=TestLockstep)
+    unittest.TextTestRunner().run(suite)
@@ -0,0 +1,208 @@
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Union
+
+from interpreter import exceptions as ex
+from interpreter.classes import Instruction
+from interpreter.interpreter import Interpreter
+from interpreter.stats import Stats, phase
+from sbumips import assemble
+from settings import RunConfig
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+Program = Union[str, Path, List[Instruction]]
+
+
+class RunResult:
+    '''Outcome of a single run of a MIPS program.'''
+
+    def __init__(self) -> None:
+        self.output = ''
+        self.exit_code = None  # None if the program did not finish
+        self.instruction_count = 0
+        self.exception = None  # Name of the exception type, None if the program finished normally
+        self.message = None
+        self.location = None  # 'file, line' of the instruction that was executing
+        self.registers = {}
+        self.mismatch = None  # Where the output first differed from the expected output, if it was given
+        self.stats = None  # Time and memory of each phase of the run, if asked for (see interpreter.stats)
+
+    @property
+    def ok(self) -> bool:
+        return self.exception is None
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+    @staticmethod
+    def from_dict(d: Dict) -> 'RunResult':
+        result = RunResult()
+        result.__dict__.update(d)
+        return result
+
+
+def load_program(program: Program, stats: Optional[Stats] = None) -> List[Instruction]:
+    '''Assemble a program given as a path, as source text or as already assembled code.
+
+    Raises FileNotFoundError for a path (a single line ending in .asm or without spaces) that doesn't exist.'''
+    if isinstance(program, list):
+        return program
+
+    if isinstance(program, Path) or ('\n' not in program and os.path.isfile(program)):
+        return assemble(str(program), stats)
+
+    # A single word, or a name ending in .asm, is a path rather than source text
+    if '\n' not in program and (program.endswith('.asm') or program.split() == [program]):
+        raise FileNotFoundError(f'No such file: {program}')
+
+    # Source text: assemble it from a temporary file so .include works the usual way
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, 'main.asm')
+        path.write_text(program)
+        return assemble(str(path), stats)
+
+
+def make_config(limits: Optional[Dict] = None, config: Optional[RunConfig] = None) -> RunConfig:
+    '''Return a RunConfig with the limits (any RunConfig setting, e.g. max_instructions) applied.'''
+    limits = limits or {}
+    if config is None:
+        return RunConfig(**limits)
+
+    for key, value in limits.items():
+        if not hasattr(config, key):
+            raise TypeError(f'{key} is not a valid run setting')
+        setattr(config, key, value)
+    return config
+
+
+class ExpectedOutput(io.StringIO):
+    '''Captures the output of a run and compares it with the expected output as it is written.
+
+    With stop set, the first character that differs raises OutputMismatch,
+    which ends the run.'''
+
+    def __init__(self, expected: str, stop: bool = True, inter: Optional[Interpreter] = None) -> None:
+        super().__init__()
+        self.expected = expected
+        self.stop = stop
+        self.inter = inter
+        self.position = 0  # Characters written
+        self.mismatch = None  # Character offset of the first difference
+        self.location = None  # Line that was executing then
+
+    def write(self, s: str) -> int:
+        if self.mismatch is None:
+            want = self.expected[self.position:self.position + len(s)]
+            if want != s:
+                i = 0
+                while i < len(want) and want[i] == s[i]:
+                    i += 1
+                self.mismatch = self.position + i
+                if self.inter is not None:
+                    self.location = self.inter.line_info
+                if self.stop:
+                    super().write(s[:i])
+                    raise ex.OutputMismatch(f'Output differs from the expected output at byte {self.byte_offset()}')
+            self.position += len(s)
+        return super().write(s)
+
+    def finish(self) -> None:
+        # Output that stops short of the expected output differs where it ends
+        if self.mismatch is None and self.position < len(self.expected):
+            self.mismatch = self.position
+
+    def byte_offset(self) -> int:
+        return len(self.expected[:self.mismatch].encode())
+
+    def report(self) -> Dict:
+        return {'offset': self.byte_offset(), 'output_line': self.expected.count('\n', 0, self.mismatch) + 1,
+                'location': self.location}
+
+
+def collect_result(inter: Interpreter, result: RunResult) -> RunResult:
+    '''Fill in the final machine state of inter.'''
+    result.instruction_count = inter.instruction_count
+    result.location = inter.line_info or None
+    result.registers = {name: value if type(value) is int else float(value) for name, value in inter.reg.items()}
+
+    # Close any files the program left open
+    for fd in [fd for fd in inter.mem.fileTable if fd >= 3]:
+        inter.mem.fileTable.pop(fd).close()
+
+    return result
+
+
+def run_interpreter(inter: Interpreter, stdin: Union[str, TextIO] = '', expected: Optional[str] = None,
+                    stop_on_mismatch: bool = True) -> RunResult:
+    '''Run an initialized Interpreter with the given input and capture its output.
+
+    expected: output the run should print. The result's mismatch tells where the output first
+    differs; with stop_on_mismatch the run ends there with an OutputMismatch exception.
+    If inter measures its run (inter.stats), the result has the measurements.'''
+    result = RunResult()
+    out = io.StringIO() if expected is None else ExpectedOutput(expected, stop_on_mismatch, inter)
+    if isinstance(stdin, str):
+        stdin = io.StringIO(stdin)
+    inter.set_streams(stdin, out)
+
+    try:
+        with phase(inter.stats, 'execute'):
+            inter.interpret()
+        result.exit_code = inter.exit_code
+
+    except Exception as e:
+        result.exception = type(e).__name__
+        result.message = str(e).strip()
+
+    result.output = out.getvalue()
+    if inter.stats is not None:
+        result.stats = inter.stats.to_dict()
+    if expected is not None:
+        out.finish()
+        if out.mismatch is not None:
+            result.mismatch = out.report()
+    return collect_result(inter, result)
+
+
+def run(program: Program, stdin: Union[str, TextIO] = '', args: Optional[List[str]] = None,
+        limits: Optional[Dict] = None, config: Optional[RunConfig] = None, expected: Optional[str] = None,
+        stop_on_mismatch: bool = True, stats: bool = False) -> RunResult:
+    '''Assemble and run a MIPS program without touching the terminal.
+
+    program: path to a .asm file, assembly source text, or the result of load_program
+    stdin: text (or a text stream) read by the input syscalls
+    args: program arguments
+    limits: RunConfig settings to override, e.g. {'max_instructions': 10000}
+    expected: output to compare with as the program prints (see run_interpreter)
+    stats: measure the time and memory of assembly, initialization, execution and syscalls'''
+    measured = Stats() if stats else None
+    try:
+        code = load_program(program, measured)
+        inter = Interpreter(code, args or [], make_config(limits, config), stats=measured)
+
+    except Exception as e:
+        result = RunResult()
+        result.exception = type(e).__name__
+        result.message = str(e).strip()
+        if measured is not None:
+            result.stats = measured.to_dict()
+        return result
+
+    return run_interpreter(inter, stdin, expected, stop_on_mismatch)
@@ -1,11 +1,14 @@
 import argparse
+import time
+from typing import Callable, Iterator, Optional
 from pathlib import Path
 
 from interpreter.interpreter import *
+from interpreter.stats import Stats, phase
 from lexer import MipsLexer
 from mipsParser import MipsParser
 from preprocess import walk, link, preprocess
-from settings import settings
+from settings import RunConfig, settings
 
 '''
 https://github.com/sbustars/STARS
@@ -26,7 +29,7 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLI
 
 def init_args() -> argparse.Namespace:
     p = argparse.ArgumentParser()
-    p.add_argument('filename', type=str, help='Input MIPS Assembly file.')
+    p.add_argument('filename', type=str, nargs='?', help='Input MIPS Assembly file.')
 
     p.add_argument('-a', '--assemble', help='Assemble code without running', action='store_true')
     p.add_argument('-d', '--debug', help='Enables debugging mode', action='store_true')
@@ -35,8 +38,164 @@ def init_args() -> argparse.Namespace:
     p.add_argument('-i', '--disp_instr_count', help='Displays the total instruction count', action='store_true')
     p.add_argument('-w', '--warnings', help='Enables warnings', action='store_true')
     p.add_argument('-pa', type=str, nargs='+', help='Program arguments for the MIPS program')
+    p.add_argument('-t', '--time_limit', help='Sets the wall-clock limit of a run in seconds', type=float)
+    p.add_argument('--batch', type=str, metavar='MANIFEST', help='Runs the jobs listed in a JSON manifest')
+    p.add_argument('-j', '--jobs', type=int, help='Number of worker processes for --batch (default: all cores)')
+    p.add_argument('--fork', help='Initialize each program once and fork a process per --batch job', action='store_true')
+    p.add_argument('-o', '--output', type=str, help='File for the JSON lines results of --batch (default: stdout)')
+    p.add_argument('--mix', nargs='?', const='table', choices=['table', 'json'],
+                   help='Prints the dynamic counts by opcode and class, branch outcomes and memory accesses by width')
+    p.add_argument('--cache', nargs='?', const='', metavar='SPEC',
+                   help='Simulates L1 instruction and data caches, e.g. size=4096,assoc=2,block=16,policy=lru,write=back')
+    p.add_argument('--branch', nargs='?', const='', metavar='PREDICTORS',
+                   help='Compares branch predictors on the run, e.g. not-taken,btfn,1bit:1024,2bit:1024,gshare:4096:12')
+    p.add_argument('--pipeline', nargs='?', const='', metavar='SPEC',
+                   help='Estimates cycles on a 5-stage pipeline, e.g. forwarding=off,branch=2')
+    p.add_argument('--trace', type=str, metavar='FILE',
+                   help='Writes a binary record per executed instruction to FILE (gzip compressed if it ends in .gz)')
+    p.add_argument('--coverage', type=str, metavar='FILE',
+                   help='Prints line and branch coverage and adds it to the lcov tracefile FILE, summed over runs')
+    p.add_argument('--coverage-name', type=str, metavar='NAME', default='',
+                   help='Test name to save the --coverage of this run under, e.g. the name of its input')
+    p.add_argument('--reference', type=str, metavar='FILE',
+                   help='Runs the program in lockstep with a reference program (.asm) or recorded events (.jsonl) '
+                        'and stops at the first syscall that differs; input is read from stdin')
+    p.add_argument('--record', type=str, metavar='FILE', help='Records the syscall events of the run to FILE for --reference')
+    p.add_argument('--compare-registers', type=str, metavar='REGS',
+                   help='Also compares (or records) these registers at each syscall with --reference, e.g. v0,a0,s0')
+    p.add_argument('--compare-memory', help='Also compares (or records) the data segment and heap at each syscall '
+                                            'with --reference', action='store_true')
+    p.add_argument('--gdb', type=str, metavar='[HOST]:PORT', help='Waits for gdb to connect and debug the program')
+    p.add_argument('--stats', help='Prints the time and peak memory of each phase of assembly and the run, '
+                                   'and the time spent in each syscall', action='store_true')
+    p.add_argument('--profile', help='Prints the execution count of every source line after the run', action='store_true')
+    p.add_argument('--callgraph', type=str, metavar='FILE', help='Prints per-function counts and writes the collapsed call stacks to FILE')
 
-    return p.parse_args()
+    args = p.parse_args()
+    if args.filename is None and args.batch is None:
+        p.error('the following arguments are required: filename')
+    return args
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    # Imported here since the batch runner imports this module
+    from batch import load_manifest, run_batch, write_results
+
+    # Command line settings apply to every job unless the manifest overrides them
+    defaults = {key: settings[key] for key in ['max_instructions', 'garbage_memory', 'garbage_registers', 'warnings']}
+    if args.time_limit:
+        defaults['time_limit'] = args.time_limit
+
+    jobs = load_manifest(args.batch)
+    results = run_batch(jobs, processes=args.jobs, defaults=defaults, fork=args.fork)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            failed = write_results(results, out)
+    else:
+        failed = write_results(results)
+
+    print(f'{len(jobs) - failed}/{len(jobs)} jobs finished without errors', file=sys.stderr)
+
+
+def run_gdb(inter: Interpreter, address: str) -> None:
+    from gdbstub import GdbServer
+
+    host, _, port = address.rpartition(':')
+    server = GdbServer(inter, host or '127.0.0.1', int(port))
+    print(f'Waiting for gdb on {":".join(map(str, server.address))}', file=sys.stderr)
+    server.serve()
+
+
+def run_lockstep(args: argparse.Namespace, program_args: List[str]) -> int:
+    import lockstep
+
+    stdin = sys.stdin.read()
+    limits = {'max_instructions': settings['max_instructions'], 'time_limit': args.time_limit}
+    memory = args.compare_memory
+
+    try:
+        registers = lockstep.parse_registers(args.compare_registers or '')
+
+        if args.record:
+            events = lockstep.record(args.filename, stdin, program_args, limits, registers, memory)
+            lockstep.save_events(events, args.record)
+            print(f'Recorded {len(events)} events', file=sys.stderr)
+            if not args.reference:
+                return 0
+
+        reference = lockstep.load_events(args.reference) if args.reference.endswith('.jsonl') else args.reference
+        divergence = lockstep.compare(args.filename, reference, stdin, program_args, limits, registers, memory)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if divergence is None:
+        print('Runs match', file=sys.stderr)
+        return 0
+
+    print(divergence, file=sys.stderr)
+    return 1
+
+
+def attach_tools(inter: Interpreter, args: argparse.Namespace) -> List[Callable[[], None]]:
+    '''Attach the analysis tools asked for on the command line. Returns the functions that print their reports.'''
+    reports = []
+    if args.profile:
+        from analysis.profiler import Profiler
+        profiler = Profiler()
+        inter.add_tracer(profiler)
+        reports += [profiler.annotate, profiler.hotspots]
+
+    if args.callgraph:
+        from analysis.callgraph import CallGraph
+        graph = CallGraph()
+        inter.add_tracer(graph)
+
+        def save_stacks() -> None:
+            with open(args.callgraph, 'w') as f:
+                graph.collapsed(f)
+
+        reports += [graph.report, save_stacks]
+
+    if args.mix:
+        from analysis.mix import InstructionMix
+        mix = InstructionMix()
+        inter.add_tracer(mix)
+        reports.append(lambda: mix.report(fmt=args.mix))
+
+    if args.cache is not None:
+        from analysis.cache import CacheSim, parse_cache
+        caches = CacheSim(parse_cache('L1 instruction', args.cache), parse_cache('L1 data', args.cache))
+        inter.add_tracer(caches)
+        reports.append(caches.report)
+
+    if args.branch is not None:
+        from analysis import branch
+        predictors = branch.parse_predictors(args.branch)
+        trace = branch.BranchTrace()
+        inter.add_tracer(trace)
+        reports.append(lambda: branch.report(trace, predictors))
+
+    if args.pipeline is not None:
+        from analysis.pipeline import parse_pipeline
+        pipeline = parse_pipeline(args.pipeline)
+        inter.add_tracer(pipeline)
+        reports.append(pipeline.report)
+
+    if args.coverage:
+        from analysis.coverage import Coverage
+        coverage = Coverage()
+        inter.add_tracer(coverage)
+        reports += [coverage.report, lambda: coverage.save(args.coverage, args.coverage_name)]
+
+    if args.trace:
+        from analysis.trace import TraceWriter
+        writer = TraceWriter(args.trace)
+        inter.add_tracer(writer)
+        reports.append(writer.close)
+
+    return reports
 
 
 def init_settings(args: argparse.Namespace) -> None:
@@ -51,7 +210,7 @@ def init_settings(args: argparse.Namespace) -> None:
         settings['max_instructions'] = args.max_instructions
 
 
-def assemble(filename: str) -> List:
+def assemble(filename: str, stats: Optional[Stats] = None) -> List:
     path = Path(filename)
     path.resolve()
 
@@ -59,7 +218,8 @@ def assemble(filename: str) -> List:
     eqv_dict = {}
     abs_to_rel = {}
 
-    walk(path, files, eqv_dict, abs_to_rel, path.parent)
+    with phase(stats, 'walk'):
+        walk(path, files, eqv_dict, abs_to_rel, path.parent)
     contents = {}
     results = {}
     processed = {}
@@ -69,44 +229,98 @@ def assemble(filename: str) -> List:
             file = file.as_posix()
 
             contents[file] = ''.join(s)
-            processed[file] = preprocess(contents[file], file, eqv_dict)
+            with phase(stats, 'preprocess'):
+                processed[file] = preprocess(contents[file], file, eqv_dict)
 
             lexer = MipsLexer(file)
             parser = MipsParser(contents[file], file)
 
-            tokenized = lexer.tokenize(processed[file])
-            results[file] = parser.parse(tokenized)
+            results[file] = parse(parser, lexer, processed[file], stats)
 
     if settings['assemble']:
         print('Program assembled successfully.')
         exit()
 
-    og_text, text = link(files, contents, processed, abs_to_rel)
+    with phase(stats, 'link'):
+        og_text, text = link(files, contents, processed, abs_to_rel)
     # print(f'*****\n{og_text}')
     # print(f'*****\n{text}')
     parser = MipsParser(og_text, files[0])
     lexer = MipsLexer(files[0].as_posix())
 
-    t = lexer.tokenize(text)
-    # for toks in t:
+    # for toks in lexer.tokenize(text):
     #     print(toks)
-    return parser.parse(t)
+    return parse(parser, lexer, text, stats)
+
 
+def parse(parser: MipsParser, lexer: MipsLexer, text: str, stats: Optional[Stats]):
+    # Tokens are produced as the parser asks for them, so errors are reported in the same order
+    # with and without stats. The time spent lexing them is moved from parse to lex afterwards.
+    if stats is None:
+        return parser.parse(lexer.tokenize(text))
+
+    tokens = TimedTokens(lexer.tokenize(text))
+    try:
+        with phase(stats, 'parse'):
+            return parser.parse(tokens)
+    finally:
+        stats.split('parse', 'lex', tokens.seconds)
+
+
+class TimedTokens:
+    '''Iterator over tokens adding up the time spent producing them.'''
+
+    def __init__(self, tokens: Iterator) -> None:
+        self.tokens = tokens
+        self.seconds = 0.0
+
+    def __iter__(self) -> 'TimedTokens':
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self.tokens)
+        finally:
+            self.seconds += time.perf_counter() - start
 
 
 if __name__ == '__main__':
     args = init_args()
     init_settings(args)
 
+    if args.batch:
+        run_batch(args)
+        sys.exit()
+
     pArgs = args.pa if args.pa else []
 
+    if args.reference or args.record:
+        sys.exit(run_lockstep(args, pArgs))
+    reports = []
+    stats = Stats() if args.stats else None
+    if stats is not None:
+        reports.append(stats.report)
+
     try:
-        result = assemble(args.filename)
-        inter = Interpreter(result, pArgs)
-        inter.interpret()
+        result = assemble(args.filename, stats)
+        inter = Interpreter(result, pArgs, RunConfig(time_limit=args.time_limit), stats=stats)
+        reports = attach_tools(inter, args) + reports
+        if args.gdb:
+            run_gdb(inter, args.gdb)
+            sys.exit(inter.exit_code)
+        with phase(stats, 'execute'):
+            inter.interpret()
 
         if settings['disp_instr_count']:
             inter.out(f'\nInstruction count: {inter.instruction_count}')
+        if inter.exit_code:
+            sys.exit(inter.exit_code)
 
     except Exception as e:
         print(f"{type(e).__name__}: {str(e)}", file=sys.stderr)
+
+    finally:
+        # Also report runs that ended with an error
+        for report in reports:
+            report()
@@ -32,6 +32,10 @@ settings = {
     'max_instructions': 1_000_000,  # Maximum instruction count
     'garbage_registers': False,  # Garbage values in registers / memory
     'garbage_memory': False,
+    'reverse_stepping': True,  # Record an undo history so the debugger can step backwards
+    'undo_depth': 100_000,  # Maximum number of undo history entries kept
+    'checkpoint_interval': 10_000,  # Instructions between time travel checkpoints in debugging mode (0 to disable)
+    'max_checkpoints': 64,
 
     'pseudo_ops': {'R_TYPE3': [
         'seq',
@@ -86,3 +90,51 @@ settings = {
 
     'enabled_syscalls': {1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 13, 14, 15, 16, 17, 30, 31, 32, 34, 35, 36, 40, 41}
 }
+
+
+class RunConfig:
+    '''Configuration for a single Interpreter run.
+
+    Defaults are copied from the settings dict when the object is created, so
+    command line flags still apply, and any setting can be overridden by keyword:
+    RunConfig(max_instructions=500, garbage_memory=True, seed=42).
+    Each Interpreter keeps its own RunConfig, so several runs with different
+    limits can share one process.'''
+
+    def __init__(self, **overrides) -> None:
+        # Memory layout
+        self.data_min = settings['data_min']
+        self.data_max = settings['data_max']
+        self.mmio_base = settings['mmio_base']
+        # Initial register contents, keyed by register name ('$sp', 'pc', ...)
+        self.initial_registers = {key[len('initial_'):]: value for key, value in settings.items()
+                                  if key.startswith('initial_')}
+
+        self.max_instructions = settings['max_instructions']
+        self.time_limit = None  # Wall-clock limit for interpret() in seconds (None for no limit)
+        self.garbage_registers = settings['garbage_registers']
+        self.garbage_memory = settings['garbage_memory']
+        self.debug = settings['debug']
+        self.reverse_stepping = settings['reverse_stepping']
+        self.undo_depth = settings['undo_depth']
+        self.checkpoint_interval = settings['checkpoint_interval']
+        self.max_checkpoints = settings['max_checkpoints']
+        self.disp_instr_count = settings['disp_instr_count']
+        self.warnings = settings['warnings']
+        self.gui = settings['gui']
+        self.enabled_syscalls = set(settings['enabled_syscalls'])
+        # Seed for the interpreter's random number generator (None for a random seed)
+        self.seed = None
+
+        for key, value in overrides.items():
+            if not hasattr(self, key):
+                raise TypeError(f'{key} is not a valid run setting')
+            setattr(self, key, value)
+
+    @property
+    def initial_pc(self) -> int:
+        return self.initial_registers['pc']
+
+    @property
+    def initial_sp(self) -> int:
+        return self.initial_registers['$sp']
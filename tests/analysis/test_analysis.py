@@ -0,0 +1,329 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.branch import BranchTrace, evaluate, parse_predictors
+from analysis.cache import Cache, CacheSim
+from analysis.callgraph import CallGraph
+from analysis.coverage import Coverage, read_lcov
+from analysis.mix import InstructionMix
+from analysis.pipeline import Pipeline
+from analysis.trace import LOAD, NO_REG, REG_NAMES, STORE, TraceWriter, load_trace
+from analysis.profiler import Profiler
+from interpreter.interpreter import Interpreter
+from runner import load_program
+from settings import RunConfig
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+LOOP = '''.text
+main:
+    li $t0, 0
+    li $t1, 10
+loop:
+    addi $t0, $t0, 1
+    blt $t0, $t1, loop
+    li $v0, 10
+    syscall
+'''
+
+
+CALLS = '''.text
+main:
+    jal f
+    jal g
+    li $v0, 10
+    syscall
+f:
+    addi $sp, $sp, -4
+    sw $ra, 0($sp)
+    jal g
+    lw $ra, 0($sp)
+    addi $sp, $sp, 4
+    jr $ra
+g:
+    nop
+    jr $ra
+'''
+
+
+def run(program, *tracers):
+    inter = Interpreter(load_program(program), [], RunConfig())
+    for tracer in tracers:
+        inter.add_tracer(tracer)
+    inter.interpret()
+    return inter
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_profile_counts(self):
+        profiler = Profiler()
+        inter = run(LOOP, profiler)
+        self.assertEqual(profiler.total, inter.instruction_count)
+
+        counts = {line_no: count for (_, line_no), count in profiler.line_counts().items()}
+        # li is one instruction; blt with a register is slt + bne
+        self.assertEqual(counts, {3: 1, 4: 1, 6: 10, 7: 20, 8: 1, 9: 1})
+
+    def test_profile_report(self):
+        profiler = Profiler()
+        run(LOOP, profiler)
+
+        out = io.StringIO()
+        profiler.hotspots(out, limit=2)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1].split()[:2], ['20', '58.82'])  # 20 of 34 instructions
+        self.assertIn(':7', lines[1])
+
+        # The temporary source file is gone, so the listing falls back to the instructions
+        out = io.StringIO()
+        profiler.annotate(out)
+        self.assertIn('10      6  addi $t0, $t0, 1', out.getvalue())
+
+    def test_callgraph(self):
+        graph = CallGraph()
+        inter = run(CALLS, graph)
+
+        functions = {name: (calls, inclusive, exclusive) for name, calls, inclusive, exclusive in graph.functions()}
+        self.assertEqual(functions, {'main': (0, inter.instruction_count, 4), 'f': (1, 8, 6), 'g': (2, 4, 4)})
+        self.assertEqual(graph.calls, {('main', 'f'): 1, ('f', 'g'): 1, ('main', 'g'): 1})
+
+        out = io.StringIO()
+        graph.collapsed(out)
+        self.assertEqual(sorted(out.getvalue().splitlines()), ['main 4', 'main;f 6', 'main;f;g 2', 'main;g 2'])
+
+        # Branch and link calls when taken
+        graph = CallGraph()
+        run('''.text
+main:
+    li $t0, 1
+    bltzal $t0, f
+    bgezal $t0, f
+    li $v0, 10
+    syscall
+f:
+    jr $ra
+''', graph)
+        self.assertEqual(graph.calls, {('main', 'f'): 1})
+        self.assertEqual(graph.stack, [('main', None)])
+
+    def test_instruction_mix(self):
+        mix = InstructionMix()
+        run('''.data
+x: .double 1.5
+.text
+main:
+    li $t0, 0
+    li $t1, 10
+loop:
+    addi $t0, $t0, 1
+    blt $t0, $t1, loop
+    la $t2, x
+    lb $t3, 0($t2)
+    l.d $f2, 0($t2)
+    sw $t3, 0($t2)
+    add.d $f4, $f2, $f2
+''', mix)
+
+        stats = mix.stats()
+        # The loop takes its branch 9 times out of 10
+        self.assertEqual(stats['branches'], {'taken': 9, 'not_taken': 1})
+        self.assertEqual(dict(stats['loads']), {1: 1, 8: 1})
+        self.assertEqual(dict(stats['stores']), {4: 1})
+        self.assertEqual(stats['classes']['fpu'], 1)
+        self.assertEqual(stats['opcodes']['addi'], 10)
+        self.assertEqual(stats['total'], sum(mix.counts))
+
+    def test_cache_policies(self):
+        # One set of two 16 byte blocks: A B A C A
+        addrs = np.array([0, 16, 4, 32, 8])
+        slots = np.arange(5)
+        stores = np.array([True, False, False, False, False])
+
+        misses = {}
+        for policy in ['lru', 'fifo']:
+            cache = Cache('L1', size=32, assoc=2, block_size=16, policy=policy)
+            cache.simulate(addrs, slots, stores)
+            misses[policy] = cache.misses
+            # The store to A is written back when A is evicted
+            self.assertEqual(cache.writes, 0 if policy == 'lru' else 1)
+        # LRU evicts B for C, FIFO evicts A
+        self.assertEqual(misses, {'lru': 3, 'fifo': 4})
+
+        cache = Cache('L1', size=32, assoc=2, block_size=16, write_back=False)
+        cache.simulate(addrs, slots, stores)
+        self.assertEqual(cache.writes, 1)
+
+    def test_cache_lines(self):
+        sim = CacheSim(Cache('L1 instruction'), Cache('L1 data', size=64, block_size=16))
+        inter = run('''.text
+main:
+    li $t0, 0x10010000
+    li $t1, 64
+loop:
+    lw $t2, 0($t0)
+    sw $t2, 0($t0)
+    addi $t0, $t0, 4
+    addi $t1, $t1, -1
+    bgtz $t1, loop
+''', sim)
+        sim.flush()
+
+        self.assertEqual(sim.icache.accesses, inter.instruction_count)
+        # A miss per 16 byte block loaded; the stores always hit
+        self.assertEqual((sim.dcache.accesses, sim.dcache.misses), (128, 16))
+        self.assertEqual(sim.dcache.line_misses.sum(), 16)
+        self.assertEqual(sorted(sim.dcache.line_accesses[sim.dcache.line_accesses > 0]), [64, 64])
+
+    def test_branch_predictors(self):
+        trace = BranchTrace()
+        run(LOOP, trace)
+
+        results = evaluate(trace, parse_predictors('not-taken,taken,btfn,1bit,2bit,gshare:64:4'))
+        self.assertEqual(results['branches'], 10)
+        mispredicted = {name: result['mispredictions'] for name, result in results['predictors'].items()}
+        # Taken 9 times, then not taken: the dynamic predictors miss the first and the last one,
+        # gshare also misses while its history fills up (4 more counters to warm up)
+        self.assertEqual(mispredicted, {'not-taken': 9, 'taken': 1, 'btfn': 1, '1bit:1024': 2, '2bit:1024': 2,
+                                        'gshare:64:4': 6})
+        site, = results['sites']
+        self.assertEqual(results['sites'][site], {'executed': 10, 'taken': 9})
+
+    def test_pipeline(self):
+        program = '''.text
+main:
+    lui $t0, 0x1001
+    lw $t1, 0($t0)
+    add $t2, $t1, $t1
+    add $t3, $t2, $t2
+    j end
+end:
+    nop
+'''
+        forwarding = Pipeline()
+        run(program, forwarding)
+        # 6 instructions, 4 cycles to fill the pipeline, a load-use stall and a taken jump
+        self.assertEqual(forwarding.stats(), {'instructions': 6, 'cycles': 12, 'cpi': 2.0,
+                                              'stalls': {'raw': 0, 'load_use': 1, 'branch': 1}})
+
+        stalling = Pipeline(forwarding=False, branch_penalty=2)
+        run(program, stalling)
+        # Each of the 3 dependent instructions waits 2 cycles for the write back
+        self.assertEqual(stalling.stats()['stalls'], {'raw': 4, 'load_use': 2, 'branch': 2})
+        self.assertEqual(stalling.cycles, 18)
+
+    def test_trace(self):
+        program = '''.text
+main:
+    lui $t0, 0x1001
+    addi $t1, $zero, -2
+    sh $t1, 2($t0)
+    lw $t2, 0($t0)
+'''
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ['trace.bin', 'trace.bin.gz']:
+                path = os.path.join(tmp, name)
+                writer = TraceWriter(path)
+                inter = run(program, writer)
+                writer.close()
+
+                records = load_trace(path)
+                self.assertEqual(len(records), inter.instruction_count)
+                self.assertEqual(list(records['pc']), [0x400000, 0x400004, 0x400008, 0x40000c])
+
+                store, load = records[2], records[3]
+                self.assertEqual((store['access'], store['addr'], store['size'], store['mem_value'], store['reg']),
+                                 (STORE, 0x10010002, 2, 0xfffe, NO_REG))
+                self.assertEqual((load['access'], load['size'], load['mem_value']), (LOAD, 4, 0xfffe0000))
+                self.assertEqual((REG_NAMES[load['reg']], load['value']), ('$t2', 0xfffe0000))
+                del records  # Release the memory map before the directory is removed
+
+    def test_trace_values(self):
+        program = '''.text
+main:
+    li $t0, 3
+    mtc1 $t0, $f2
+    cvt.d.w $f4, $f2
+    add.d $f6, $f4, $f4
+    li $v0, 1
+    syscall
+    li $a0, 5
+    li $v0, 41
+    syscall
+'''
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.bin')
+            writer = TraceWriter(path)
+            inter = run(program, writer)
+            writer.close()
+
+            records = load_trace(path)
+            # Double results are recorded as all 64 bits, named by the even register
+            convert, add = records[2], records[3]
+            bits = lambda d: struct.unpack('<Q', struct.pack('<d', d))[0]
+            self.assertEqual((REG_NAMES[convert['reg']], convert['value']), ('$f4', bits(3.0)))
+            self.assertEqual((REG_NAMES[add['reg']], add['value']), ('$f6', bits(6.0)))
+
+            # Printing doesn't write $v0, the random integer syscall does
+            print_int, rand_int = records[5], records[8]
+            self.assertEqual(print_int['reg'], NO_REG)
+            self.assertEqual((REG_NAMES[rand_int['reg']], rand_int['value']), ('$v0', inter.reg['$v0']))
+            del records
+
+    def test_coverage(self):
+        program = '''.text
+main:
+    li $v0, 5
+    syscall
+    bgtz $v0, positive
+    li $a0, 0
+    j done
+positive:
+    li $a0, 1
+done:
+    li $v0, 10
+    syscall
+'''
+        code = load_program(program)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'coverage.info')
+            for stdin in ['5\n', '7\n', '-1\n']:
+                inter = Interpreter(code, [], RunConfig())
+                inter.set_streams(io.StringIO(stdin), io.StringIO())
+                coverage = Coverage()
+                inter.add_tracer(coverage)
+                inter.interpret()
+                coverage.save(path)
+
+                if stdin == '5\n':
+                    out = io.StringIO()
+                    coverage.report(out)
+                    self.assertIn('lines 6/8 (75.00%)  branches 1/2 (50.00%)', out.getvalue())
+                    self.assertIn('not executed: 6-7', out.getvalue())
+                    self.assertIn('branches taken one way only: 5', out.getvalue())
+
+            with open(path) as f:
+                (name, files), = read_lcov(f).items()
+            (record, ) = files.values()
+            # Hits count the runs: two of the three take the branch
+            self.assertEqual(record['lines'], {3: 3, 4: 3, 5: 3, 6: 1, 7: 1, 9: 2, 11: 3, 12: 3})
+            self.assertEqual(record['branches'], {(5, 0, 0): 2, (5, 0, 1): 1})
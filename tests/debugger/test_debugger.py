@@ -0,0 +1,445 @@
+import io
+import socket
+import struct
+import unittest
+from contextlib import redirect_stdout
+from threading import Thread
+
+from controller import Controller
+from gdbstub import GdbServer, checksum
+from interpreter.interpreter import Interpreter
+from runner import load_program
+from settings import RunConfig
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+PROGRAM = '''.data
+x: .word 7
+.text
+main:
+    lw $t0, x
+    addi $t0, $t0, 5
+    sw $t0, x
+    li $t1, 0x10010100
+    sb $t0, 0($t1)
+    mult $t0, $t0
+    mtc1 $t0, $f2
+    cvt.d.w $f4, $f2
+    add.d $f6, $f4, $f4
+    c.lt.d 1, $f4, $f6
+    jal end
+end:
+    nop
+'''
+
+
+LOOP = '''.text
+main:
+    li $v0, 5
+    syscall
+    move $t0, $v0
+loop:
+    li $a0, 1000
+    li $v0, 41
+    syscall
+    add $t1, $t1, $a0
+    sw $t1, 0($sp)
+    addi $sp, $sp, -4
+    li $v0, 5
+    syscall
+    add $t1, $t1, $v0
+    addi $t0, $t0, -1
+    bgtz $t0, loop
+'''
+
+
+CALLS = '''.text
+main:
+    jal f
+    nop
+    li $v0, 10
+    syscall
+f:
+    addi $sp, $sp, -4
+    sw $ra, 0($sp)
+    jal g
+    lw $ra, 0($sp)
+    addi $sp, $sp, 4
+    jr $ra
+g:
+    jr $ra
+'''
+
+
+# Calls through branch and link, taken and not taken
+BRANCH_CALLS = '''.text
+main:
+    li $t0, 1
+    bltzal $t0, f
+    bgezal $t0, f
+    nop
+    li $v0, 10
+    syscall
+f:
+    jr $ra
+'''
+
+
+PRINTS = '''.data
+x: .asciiz "X"
+y: .asciiz "Y"
+.text
+main:
+    li $t0, 3
+loop:
+    la $a0, x
+    li $v0, 4
+    syscall
+    li $a0, 1
+    la $a1, y
+    li $a2, 1
+    li $v0, 15
+    syscall
+    addi $t0, $t0, -1
+    bgtz $t0, loop
+'''
+
+
+def fetch(inter):
+    # Start of an iteration of the interpret loop, up to the debugger check
+    travel = inter.debug.travel
+    if travel is not None and inter.instruction_count >= travel.next_checkpoint:
+        travel.checkpoint(inter)
+    pc = inter.reg['pc']
+    inter.instr = inter.mem.text[str(pc)]
+    inter.reg['pc'] += 4
+    inter.instruction_count += 1
+    return pc
+
+
+def step(inter):
+    # One iteration of the interpret loop, recording history like debugging mode does
+    fetch(inter)
+    inter.debug.record(inter)
+    inter.execute_instr(inter.instr)
+
+
+def resume(inter):
+    # Execute the instruction the debugger stopped at and run until it stops again
+    inter.execute_instr(inter.instr)
+    while True:
+        pc = fetch(inter)
+        if inter.debug.debug(pc, inter):
+            return pc
+        inter.execute_instr(inter.instr)
+
+
+def state(inter):
+    # pc is left out: reverse leaves pc after the undone instruction, which is executed again on resume
+    reg = {name: value for name, value in inter.reg.items() if name != 'pc'}
+    return reg, dict(inter.mem.data), list(inter.condition_flags)
+
+
+class TestDebugger(unittest.TestCase):
+    def setUp(self):
+        self.code = load_program(PROGRAM)
+
+    def test_reverse_every_step(self):
+        inter = Interpreter(self.code, [], RunConfig(debug=True))
+        states = []
+        for _ in range(12):
+            states.append(state(inter))
+            step(inter)
+
+        for i in reversed(range(12)):
+            inter.debug.reverse(None, inter)
+            self.assertEqual(state(inter), states[i])
+            self.assertEqual(inter.reg['pc'], inter.config.initial_pc + 4 * i + 4)
+
+        # Nothing left to undo
+        inter.debug.reverse(None, inter)
+        self.assertEqual(state(inter), states[0])
+
+    def test_undo_depth(self):
+        inter = Interpreter(self.code, [], RunConfig(debug=True, undo_depth=3))
+        states = []
+        for _ in range(6):
+            states.append(state(inter))
+            step(inter)
+
+        self.assertEqual(len(inter.debug.undo), 3)
+        for _ in range(5):
+            inter.debug.reverse(None, inter)
+        self.assertEqual(state(inter), states[3])
+
+    def test_reverse_stepping_disabled(self):
+        inter = Interpreter(self.code, [], RunConfig(debug=True, reverse_stepping=False))
+        for _ in range(4):
+            step(inter)
+        self.assertEqual(len(inter.debug.undo), 0)
+
+    def test_goto(self):
+        config = RunConfig(debug=True, checkpoint_interval=7, max_checkpoints=4, seed=5)
+        inter = Interpreter(load_program(LOOP), [], config, stdin=io.StringIO('\n'.join(map(str, range(40, 81)))))
+        states = {}  # Instruction number -> state when the loop is about to execute it
+        pcs = {}  # Instruction number -> pc once it is fetched
+        for _ in range(300):
+            states[inter.instruction_count + 1] = state(inter)
+            step(inter)
+            pcs[inter.instruction_count] = inter.reg['pc']
+
+        # Thinned to at most max_checkpoints
+        self.assertLessEqual(len(inter.debug.travel.checkpoints), 4)
+
+        for count in [250, 3, 1, 120, 300, 57]:
+            inter.debug.goto(['goto', str(count)], inter)
+            self.assertEqual(inter.instruction_count, count)
+            self.assertEqual(state(inter), states[count])
+
+        # Running on from a jump reads the logged input again
+        inter.execute_instr(inter.instr)
+        for count in range(58, 70):
+            self.assertEqual(state(inter), states[count])
+            step(inter)
+
+        self.assertFalse(inter.debug.travel.goto(inter, 301))
+
+        # The instruction jumped to isn't executed yet, so the first reverse goes back to the one before
+        for count in [250, 120, 57]:
+            inter.debug.goto(['goto', str(count)], inter)
+            inter.debug.reverse(['r'], inter)
+            self.assertEqual(inter.reg['pc'], pcs[count - 1])
+            self.assertEqual(state(inter), states[count - 1])
+
+    def test_goto_is_silent(self):
+        out = io.StringIO()
+        inter = Interpreter(load_program(PRINTS), [], RunConfig(debug=True, checkpoint_interval=100), stdout=out)
+        for _ in range(35):
+            step(inter)
+        self.assertEqual(out.getvalue(), 'XYXYXY')
+
+        # Neither the print syscall nor the write to fd 1 is repeated by the replay
+        self.assertTrue(inter.debug.travel.goto(inter, 20))
+        self.assertEqual(out.getvalue(), 'XYXYXY')
+        self.assertIs(inter.stdout, out)
+        self.assertIs(inter.mem.fileTable[1], out)
+
+        # An out set on the instance by a front end is kept
+        printed = []
+        inter.out = lambda s, end='': printed.append(s)
+        self.assertTrue(inter.debug.travel.goto(inter, 4))
+        self.assertEqual(printed, [])
+        inter.execute_instr(inter.instr)
+        for _ in range(7):
+            step(inter)
+        self.assertEqual(printed, ['X'])
+        self.assertEqual(out.getvalue(), 'XYXYXYY')
+
+    def test_breakpoints(self):
+        inter = Interpreter(self.code, [], RunConfig(debug=True))
+        debug = inter.debug
+        name = inter.mem.text[str(inter.config.initial_pc)].filetag.file_name[1:-1]
+
+        # lw from a label is two instructions
+        debug.addBreakpoint(['b', name, '5'], inter)
+        self.assertEqual(debug.break_pcs, {inter.config.initial_pc, inter.config.initial_pc + 4})
+        debug.addBreakpoint(['b', name, '1'], inter)  # Not an instruction
+        self.assertEqual(list(debug.breakpoints), [(name, '5')])
+
+        debug.continueFlag = True
+        self.assertFalse(debug.debug(inter.config.initial_pc + 8, inter))
+        self.assertTrue(debug.debug(inter.config.initial_pc + 4, inter))
+        self.assertFalse(debug.continueFlag)
+
+        debug.removeBreakpoint((name, '5'), inter)
+        self.assertEqual(debug.break_pcs, set())
+
+    def test_conditional_breakpoint(self):
+        inter = Interpreter(self.code, [], RunConfig(debug=True))
+        debug = inter.debug
+        name = inter.mem.text[str(inter.config.initial_pc)].filetag.file_name[1:-1]
+        pc = inter.config.initial_pc + 8  # addi
+
+        debug.addBreakpoint(['b', name, '6', 'if', '$t0', '>=', '0x8'], inter)
+        debug.continueFlag = True
+        inter.reg['$t0'] = 7
+        self.assertFalse(debug.debug(pc, inter))
+        inter.reg['$t0'] = 8
+        self.assertTrue(debug.debug(pc, inter))
+
+        debug.addBreakpoint(['b', name, '6', 'if', '$t0==$t1'], inter)
+        debug.continueFlag = True
+        self.assertFalse(debug.debug(pc, inter))
+        inter.reg['$t1'] = 8
+        self.assertTrue(debug.debug(pc, inter))
+
+    def test_watchpoint(self):
+        inter = Interpreter(self.code, [], RunConfig(debug=True))
+        debug = inter.debug
+        debug.addWatchpoint(['w', 'x'], inter)
+        debug.continueFlag = True
+
+        # lw and sw from a label are two instructions each
+        for _ in range(4):
+            step(inter)
+            self.assertFalse(debug.debug(inter.reg['pc'], inter))
+
+        step(inter)
+        x = inter.mem.getLabel('x')
+        self.assertEqual(inter.mem.watch_hit, (x, 4, 7, 12))
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertTrue(debug.debug(inter.reg['pc'], inter))
+        self.assertEqual(out.getvalue(), f'Watchpoint: 4 byte store to {x:#010x} changed 0x00000007 to 0x0000000c\n')
+        self.assertFalse(debug.continueFlag)
+
+        # A hit covers the whole store, also when it only overlaps the watched range
+        mem = inter.mem
+        mem.addHWord(-2, x + 2)
+        self.assertEqual(mem.watch_hit, (x + 2, 2, 0, 0xFFFE))
+        mem.addDouble(1.0, x)
+        self.assertEqual(mem.watch_hit, (x, 8, 0xFFFE000C, 0x3FF0000000000000))
+        mem.addAsciiz('hi', x + 2)
+        self.assertEqual(mem.watch_hit, (x + 2, 3, 0, 0x6968))
+        mem.watch_hit = None
+        mem.addByte(1, x + 4)
+        self.assertIsNone(mem.watch_hit)
+
+        # Reading bytes that were never written fills them in without counting as a store
+        heap = 0x10040000
+        mem.add_watch(heap, 8)
+        self.assertEqual(mem.getWord(heap), 0)
+        self.assertEqual(mem.getByte(heap + 4), 0)
+        self.assertIsNone(mem.watch_hit)
+
+        debug.clearBreakpoints(['d'], inter)
+        self.assertEqual(inter.mem.watched_pages, set())
+
+    def test_over_finish_until(self):
+        inter = Interpreter(load_program(CALLS), [], RunConfig(debug=True))
+        debug = inter.debug
+        main, f, g = (inter.mem.getLabel(label) for label in ('main', 'f', 'g'))
+        fetch(inter)  # Stopped at jal f
+
+        self.assertFalse(debug.over(['o'], inter))
+        self.assertEqual(resume(inter), main + 4)
+
+        inter = Interpreter(load_program(CALLS), [], RunConfig(debug=True))
+        debug = inter.debug
+        fetch(inter)
+        debug.until(['u', 'g'], inter)
+        self.assertEqual(resume(inter), g)
+
+        debug.finish(['f'], inter)
+        self.assertEqual(resume(inter), f + 12)  # lw $ra after jal g
+        debug.finish(['f'], inter)
+        self.assertEqual(resume(inter), main + 4)
+        self.assertIsNone(debug.stop_at)
+
+    def test_controller_rejected_commands(self):
+        # The GUI only lets the program run on when the debugger accepted the command
+        inter = Interpreter(load_program(CALLS), [], RunConfig(debug=True, gui=True))
+        controller = Controller(inter.debug, inter)
+        fetch(inter)
+
+        with redirect_stdout(io.StringIO()):
+            self.assertFalse(controller.run_until('no_such_label'))
+        self.assertFalse(inter.pause_lock.is_set())
+        self.assertIsNone(inter.debug.stop_at)
+
+        self.assertTrue(controller.run_until('g'))
+        self.assertTrue(inter.pause_lock.is_set())
+
+    def test_over_finish_branch_and_link(self):
+        inter = Interpreter(load_program(BRANCH_CALLS), [], RunConfig(debug=True))
+        debug = inter.debug
+        main, f = inter.mem.getLabel('main'), inter.mem.getLabel('f')
+        fetch(inter)
+        self.assertEqual(resume(inter), main + 4)  # Stopped at bltzal, which isn't taken
+
+        self.assertFalse(debug.over(['o'], inter))
+        self.assertEqual(resume(inter), main + 8)
+        self.assertFalse(debug.over(['o'], inter))  # bgezal calls f
+        self.assertEqual(resume(inter), main + 12)
+
+        # finish from main's first instructions is not thrown off by the branch that isn't taken
+        inter = Interpreter(load_program(BRANCH_CALLS), [], RunConfig(debug=True))
+        debug = inter.debug
+        fetch(inter)
+        debug.until(['u', 'f'], inter)
+        self.assertEqual(resume(inter), f)
+        debug.finish(['f'], inter)
+        self.assertEqual(resume(inter), main + 12)
+
+    def test_gdb_stub(self):
+        inter = Interpreter(load_program(CALLS), [], RunConfig())
+        server = GdbServer(inter, port=0)
+        thread = Thread(target=server.serve, daemon=True)
+        thread.start()
+
+        with socket.create_connection(server.address) as conn:
+            def request(packet):
+                data = packet.encode()
+                conn.sendall(b'$' + data + b'#' + checksum(data).encode())
+                received = b''
+                while True:
+                    received += conn.recv(4096)
+                    start = received.find(b'$')
+                    end = received.find(b'#', start)
+                    if start >= 0 and end >= 0 and len(received) >= end + 3:
+                        conn.sendall(b'+')
+                        return received[start + 1:end].decode()
+
+            self.assertEqual(request('?'), 'S05')
+            registers = request('g')
+            self.assertEqual(len(registers), 72 * 8)
+            self.assertEqual(registers[37 * 8:38 * 8], struct.pack('<I', inter.config.initial_pc).hex())
+
+            self.assertEqual(request('P2=0a000000'), 'OK')
+            self.assertEqual(inter.reg['$v0'], 10)
+
+            # Malformed packets get an error reply and the session goes on
+            self.assertEqual(request(''), '')
+            for packet in ['Z0,400000', 'Z0,zz,4', 'P2', 'mzz,4']:
+                self.assertEqual(request(packet), 'E01')
+            self.assertEqual(request('?'), 'S05')
+
+            g = inter.mem.getLabel('g')
+            self.assertEqual(request(f'Z0,{g:x},4'), 'OK')
+            self.assertEqual(request('c'), 'S05')
+            self.assertEqual(inter.reg['pc'], g)
+
+            # f saved $ra on the stack
+            sp = inter.reg['$sp']
+            self.assertEqual(request(f'm{sp:x},4'), struct.pack('<I', inter.mem.getWord(sp)).hex())
+            self.assertEqual(request(f'M{sp:x},4:2a000000'), 'OK')
+            self.assertEqual(inter.mem.getWord(sp), 42)
+
+            self.assertEqual(request('s'), 'S05')
+            self.assertEqual(request(f'z0,{g:x},4'), 'OK')
+            self.assertEqual(request('c'), 'S0b')  # f returns to the address written over its saved $ra
+            request('D')
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_gdb_stub_limits(self):
+        # An endless loop stops with SIGXCPU at the instruction limit instead of running until interrupted
+        inter = Interpreter(load_program('.text\nmain:\n    j main\n'), [], RunConfig(max_instructions=1000))
+        server = GdbServer(inter, port=0)
+        self.assertEqual(server.handle('c'), 'S18')
+        self.assertEqual(inter.instruction_count, 1001)
+        self.assertEqual(server.handle('c'), 'S18')
+        server.sock.close()
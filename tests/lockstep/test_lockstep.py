@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+from lockstep import compare, load_events, parse_registers, record, save_events
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Prints 0 to n
+REFERENCE = '''.text
+main:
+    li $v0, 5
+    syscall
+    move $t0, $v0
+    li $t1, 0
+loop:
+    move $a0, $t1
+    li $v0, 1
+    syscall
+    addi $t1, $t1, 1
+    ble $t1, $t0, loop
+    li $v0, 10
+    syscall
+'''
+
+# Same output, counting down in a different register
+SAME = '''.text
+main:
+    li $v0, 5
+    syscall
+    li $s0, 0
+    addi $s1, $v0, 1
+count:
+    li $v0, 1
+    move $a0, $s0
+    syscall
+    addi $s0, $s0, 1
+    addi $s1, $s1, -1
+    bnez $s1, count
+    li $v0, 10
+    syscall
+'''
+
+# Prints 0 to n-1 forever
+WRONG = '''.text
+main:
+    li $v0, 5
+    syscall
+    move $t0, $v0
+restart:
+    li $t1, 0
+loop:
+    move $a0, $t1
+    li $v0, 1
+    syscall
+    addi $t1, $t1, 1
+    blt $t1, $t0, loop
+    j restart
+'''
+
+
+class TestLockstep(unittest.TestCase):
+    def test_match(self):
+        self.assertIsNone(compare(SAME, REFERENCE, stdin='4\n'))
+
+    def test_early_stop(self):
+        divergence = compare(WRONG, REFERENCE, stdin='4\n', limits={'max_instructions': 10 ** 7})
+        # The read, 0 to 3, then 0 instead of 4
+        self.assertEqual(divergence.index, 5)
+        self.assertEqual(divergence.field, 'output')
+        self.assertEqual((divergence.expected['output'], divergence.actual['output']), ('4', '0'))
+        self.assertTrue(divergence.line.endswith(', 11'))
+        self.assertLess(divergence.actual['instruction_count'], 100)
+
+    def test_registers(self):
+        # Same output, but the registers differ at the print syscalls
+        divergence = compare(SAME, REFERENCE, stdin='1\n', registers=['$a0', '$t0'])
+        self.assertEqual((divergence.index, divergence.field), (1, 'registers'))
+        self.assertIsNone(compare(SAME, REFERENCE, stdin='1\n', registers=['$a0'], memory=True))
+
+        # As given on the command line
+        self.assertEqual(parse_registers('a0,$t0,f2,pc'), ['$a0', '$t0', '$f2', 'pc'])
+        self.assertEqual(parse_registers(''), [])
+        with self.assertRaises(ValueError):
+            parse_registers('a0,x9')
+
+    def test_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reference.jsonl')
+            save_events(record(REFERENCE, stdin='3\n'), path)
+            events = load_events(path)
+
+        self.assertEqual(events[-1]['exit'], 0)
+        self.assertIsNone(compare(SAME, events, stdin='3\n'))
+        self.assertEqual(compare(WRONG, events, stdin='3\n').index, 4)
+
+        # Registers can only be compared with events recorded with them
+        with self.assertRaisesRegex(ValueError, 'no registers'):
+            compare(SAME, events, stdin='3\n', registers=['$a0'])
+        events = record(REFERENCE, stdin='3\n', registers=['$a0', '$t0'])
+        self.assertEqual(compare(SAME, events, stdin='3\n', registers=['$a0', '$t0']).field, 'registers')
+
+    def test_limits(self):
+        # The limits are checked by Interpreter.step like in any other run
+        events = record(WRONG, stdin='2\n', limits={'max_instructions': 50})
+        self.assertTrue(events[-1]['error'].startswith('InstrCountExceed: Exceeded maximum instruction count: 50'))
+        self.assertEqual(events[-1]['instruction_count'], 51)
+
+        events = record(WRONG, stdin='2\n', limits={'max_instructions': 10 ** 9, 'time_limit': 0.1})
+        self.assertTrue(events[-1]['error'].startswith('TimeLimitExceed'))
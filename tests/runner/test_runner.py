@@ -0,0 +1,199 @@
+import unittest
+
+import forkserver
+from batch import load_manifest, make_tasks, run_batch, run_job
+from runner import RunResult, load_program, run
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+ECHO = '''.text
+main:
+    li $v0, 5
+    syscall
+    move $a0, $v0
+    li $v0, 1
+    syscall
+    li $a0, 3
+    li $v0, 17
+    syscall
+'''
+
+LOOP = '''.text
+main:
+    j main
+'''
+
+COUNT = '''.text
+main:
+    li $t0, 0
+loop:
+    addi $t0, $t0, 1
+    move $a0, $t0
+    li $v0, 1
+    syscall
+    li $a0, 10
+    li $v0, 11
+    syscall
+    j loop
+'''
+
+
+class TestRunner(unittest.TestCase):
+    def test_run_output(self):
+        result = run(ECHO, stdin='42\n')
+        self.assertIsInstance(result, RunResult)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.output, '42')
+        self.assertEqual(result.exit_code, 3)
+        self.assertEqual(result.registers['$a0'], 3)
+
+    def test_run_exit_does_not_raise(self):
+        # The exit syscalls must not raise SystemExit into the caller
+        try:
+            run(ECHO, stdin='1\n')
+        except SystemExit:
+            self.fail('exit syscall raised SystemExit')
+
+    def test_run_limits(self):
+        result = run(LOOP, limits={'max_instructions': 50})
+        self.assertEqual(result.exception, 'InstrCountExceed')
+        self.assertIsNone(result.exit_code)
+        self.assertIn('main.asm", 3', result.location)
+
+    def test_run_no_input(self):
+        result = run(ECHO)
+        self.assertEqual(result.exception, 'EOFError')
+
+    def test_run_missing_file(self):
+        for path in ['nonexistent.asm', 'missing/main.asm', 'no_such_program']:
+            with self.assertRaises(FileNotFoundError):
+                load_program(path)
+        self.assertEqual(run('nonexistent.asm').exception, 'FileNotFoundError')
+
+        job = {'id': 'typo', 'program': 'ehco.asm'}
+        self.assertEqual(run_job(job)['exception'], 'FileNotFoundError')
+
+    def test_run_time_limit(self):
+        result = run(LOOP, limits={'max_instructions': 10 ** 9, 'time_limit': 0.1})
+        self.assertEqual(result.exception, 'TimeLimitExceed')
+
+    def test_batch(self):
+        jobs = load_manifest('manifest.json')
+        # All the jobs use the same program, so they are sent to one worker together
+        self.assertEqual(len(make_tasks(jobs)), 1)
+
+        results = {r['id']: r for r in run_batch(jobs, processes=1)}
+        self.assertEqual(results['one']['output'], '1')
+        self.assertEqual(results['two']['output'], '2')
+        self.assertEqual(results['none']['exception'], 'EOFError')
+        self.assertEqual(results['wrong']['exception'], 'OutputMismatch')
+        self.assertEqual(results['wrong']['mismatch']['offset'], 0)
+
+    def test_expected_output_stops_early(self):
+        # The loop never ends: the run must stop at the first wrong line
+        result = run(COUNT, expected='1\n2\n3\n5\n', limits={'max_instructions': 10 ** 7})
+        self.assertEqual(result.exception, 'OutputMismatch')
+        self.assertEqual(result.output, '1\n2\n3\n')
+        self.assertEqual(result.mismatch['offset'], 6)
+        self.assertEqual(result.mismatch['output_line'], 4)
+        self.assertIn('main.asm", 8', result.mismatch['location'])
+        self.assertLess(result.instruction_count, 50)
+
+    def test_expected_output_without_stopping(self):
+        result = run(ECHO, stdin='42\n', expected='42')
+        self.assertTrue(result.ok)
+        self.assertIsNone(result.mismatch)
+
+        result = run(ECHO, stdin='42\n', expected='4', stop_on_mismatch=False)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.exit_code, 3)
+        self.assertEqual(result.mismatch['offset'], 1)
+
+        # Output that ends too soon differs where it ends
+        result = run(ECHO, stdin='42\n', expected='42\n')
+        self.assertEqual(result.mismatch, {'offset': 2, 'output_line': 1, 'location': None})
+
+    def test_stats(self):
+        self.assertIsNone(run(ECHO, stdin='42\n').stats)
+
+        stats = run(ECHO, stdin='42\n', stats=True).stats
+        self.assertEqual(list(stats['phases']), ['walk', 'preprocess', 'lex', 'parse', 'link', 'initialize', 'execute'])
+        self.assertEqual({code: entry['count'] for code, entry in stats['syscalls'].items()}, {'1': 1, '5': 1, '17': 1})
+        self.assertEqual(stats['syscalls']['5']['name'], 'readInteger')
+        self.assertAlmostEqual(stats['seconds'], sum(phase['seconds'] for phase in stats['phases'].values()))
+        # How much each phase raised the process's peak RSS, where it can be read
+        for phase in stats['phases'].values():
+            self.assertTrue(phase['rss_growth'] is None or phase['rss_growth'] >= 0)
+
+        # Programs that don't assemble still report the phases that ran
+        stats = run('.text\nmain:\n    add $t0\n', stats=True).stats
+        self.assertIn('walk', stats['phases'])
+        self.assertNotIn('execute', stats['phases'])
+
+        # Lexing is measured as the parser goes, so the first error is still the parse error on line 3,
+        # not the bad character on line 4
+        for measured in (False, True):
+            result = run('.text\nmain:\n    add $t0\n    li $t0, 1 `\n', stats=measured)
+            self.assertTrue(result.message.startswith('Unexpected'))
+            self.assertTrue(result.message.endswith(':3'))
+
+    @unittest.skipUnless(forkserver.available(), 'needs os.fork')
+    def test_fork_server(self):
+        server = forkserver.ForkServer(ECHO)
+        results = dict(server.map(['5\n', '6\n', ('7\n', {'max_instructions': 2})], processes=2))
+        self.assertEqual(results[0].output, '5')
+        self.assertEqual(results[0].exit_code, 3)
+        self.assertEqual(results[1].output, '6')
+        self.assertEqual(results[2].exception, 'InstrCountExceed')
+        self.assertEqual(list(server.run('8\n', stats=True).stats['phases']), ['execute'])
+        # The server's own machine is left untouched
+        self.assertEqual(server.inter.instruction_count, 0)
+
+    @unittest.skipUnless(forkserver.available(), 'needs os.fork')
+    def test_fork_server_expected_output(self):
+        server = forkserver.ForkServer(ECHO)
+        results = dict(server.map([('42\n', None, '4'), ('42\n', None, '4', False)]))
+        self.assertEqual(results[0].exception, 'OutputMismatch')
+        self.assertEqual(results[0].output, '4')
+        self.assertTrue(results[1].ok)
+        self.assertEqual(results[1].output, '42')
+        self.assertEqual(results[1].mismatch['offset'], 1)
+
+        # A batch job's stop_on_mismatch applies the same with and without fork
+        job = {'id': 'keep_going', 'program': ECHO, 'stdin': '42\n', 'expected': '4', 'stop_on_mismatch': False}
+        for fork in (False, True):
+            record = run_job(job, fork=fork)
+            self.assertIsNone(record['exception'])
+            self.assertEqual(record['output'], '42')
+
+    @unittest.skipUnless(forkserver.available(), 'needs os.fork')
+    def test_fork_server_init_settings(self):
+        # The children start from the server's initialized machine, so these can't change per job
+        server = forkserver.ForkServer(ECHO, limits={'garbage_registers': True, 'seed': 1})
+        self.assertEqual(server.run('42\n').output, '42')
+        with self.assertRaisesRegex(ValueError, 'garbage_memory, seed'):
+            server.run('42\n', {'seed': 2, 'garbage_memory': True})
+
+        job = {'id': 'garbage', 'program': ECHO, 'stdin': '42\n', 'garbage_memory': True}
+        self.assertEqual(run_job(job, fork=True)['exception'], 'ValueError')
+        self.assertEqual(run_job(job, {'garbage_memory': True}, fork=True)['exception'], 'ValueError')
+        del job['garbage_memory']
+        self.assertEqual(run_job(job, {'garbage_memory': True}, fork=True)['output'], '42')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import unittest
+
+from interpreter import snapshot
+from interpreter.interpreter import Interpreter
+from runner import load_program, run_interpreter
+from settings import RunConfig
+
+'''
+https://github.com/sbustars/STARS
+
+Copyright 2020 Kevin McDonnell, Jihu Mun, and Ian Peitzsch
+
+Developed by Kevin McDonnell (ktm@cs.stonybrook.edu),
+Jihu Mun (jihu1011@gmail.com),
+and Ian Peitzsch (irpeitzsch@gmail.com)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+'''
+
+# Sums 1..n into a word in .data, printing the running total; also touches the heap, a float and the RNG
+COUNT = '''.data
+total: .word 0
+.text
+main:
+    li $v0, 5
+    syscall
+    move $t0, $v0
+    li $a0, 16
+    li $v0, 9
+    syscall
+    move $s0, $v0
+    li $t1, 0x3fc00000
+    mtc1 $t1, $f2
+loop:
+    lw $t2, total
+    add $t2, $t2, $t0
+    sw $t2, total
+    sw $t2, 0($s0)
+    move $a0, $t2
+    li $v0, 1
+    syscall
+    li $a0, 100
+    li $v0, 41
+    syscall
+    addi $t0, $t0, -1
+    bgtz $t0, loop
+    li $v0, 10
+    syscall
+'''
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.code = load_program(COUNT)
+
+    def new_interpreter(self):
+        return Interpreter(self.code, [], RunConfig(seed=1))
+
+    def test_restore_initial_state(self):
+        inter = self.new_interpreter()
+        snap = inter.snapshot()
+
+        first = run_interpreter(inter, '5\n')
+        inter.restore(snap)
+        second = run_interpreter(inter, '3\n')
+
+        self.assertEqual(first.output, '59121415')
+        self.assertEqual(second.output, '356')
+
+    def test_resume_mid_run(self):
+        expected = run_interpreter(self.new_interpreter(), '20\n')
+
+        inter = self.new_interpreter()
+        inter.config.max_instructions = 60
+        before = run_interpreter(inter, '20\n')
+        self.assertEqual(before.exception, 'InstrCountExceed')
+        snap = inter.snapshot()
+
+        # Clobber the machine, then resume from the snapshot
+        inter.mem.data.clear()
+        inter.reg['$t0'] = 0
+        inter.restore(snap)
+        inter.config.max_instructions = RunConfig().max_instructions
+        rest = run_interpreter(inter, '')
+
+        self.assertTrue(rest.ok)
+        self.assertEqual(before.output + rest.output, expected.output)
+        self.assertEqual(rest.registers, expected.registers)
+        self.assertEqual(inter.instruction_count, expected.instruction_count)
+
+    def test_save_load(self):
+        inter = self.new_interpreter()
+        inter.config.max_instructions = 40
+        run_interpreter(inter, '9\n')
+        snap = inter.snapshot()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'state.snap')
+            snapshot.save(snap, path)
+            loaded = snapshot.load(path)
+
+        self.assertEqual(loaded.reg, snap.reg)
+        self.assertEqual(dict(loaded.data), dict(snap.data))
+        self.assertEqual(loaded.heap_ptr, snap.heap_ptr)
+        self.assertEqual(loaded.rng_state, snap.rng_state)
+
+        other = self.new_interpreter()
+        other.restore(loaded)
+        inter.restore(snap)
+        inter.config.max_instructions = other.config.max_instructions
+        self.assertEqual(run_interpreter(other, '').output, run_interpreter(inter, '').output)
+
+    def test_shared_pages(self):
+        inter = self.new_interpreter()
+        inter.config.max_instructions = 40
+        run_interpreter(inter, '9\n')
+        other = 0x10020000  # A page the program never writes
+        inter.mem.setByte(other, 7)
+        inter.debug.undo.mem(0, 0x10030000, 1, inter.mem.data)
+        inter.mem.setByte(0x10030000, 1)
+        first = inter.snapshot()
+
+        total = inter.mem.getLabel('total')
+        before = inter.mem.getWord(total)
+        inter.mem.addWord(1234, total)
+        # Undone stores count as writes too: the byte that was never written goes away again
+        inter.debug.undo.pop(inter)
+        second = inter.snapshot()
+
+        self.assertIs(second.pages[other >> 12], first.pages[other >> 12])
+        self.assertIsNot(second.pages[total >> 12], first.pages[total >> 12])
+        self.assertEqual(first.data[str(0x10030000)], 1)
+        expected = {**first.data, **{str(total + i): b for i, b in enumerate([0xD2, 4, 0, 0])}}
+        del expected[str(0x10030000)]
+        self.assertEqual(second.data, expected)
+
+        # A snapshot is unaffected by the run after it, also through the pages it shares
+        inter.restore(first)
+        self.assertEqual(inter.mem.getWord(total), before)
+        inter.mem.setByte(other, 8)
+        self.assertEqual(first.data[str(other)], 7)
+        self.assertEqual(inter.snapshot().data[str(other)], 8)
+
+    def test_wrong_program(self):
+        snap = self.new_interpreter().snapshot()
+        other = Interpreter(load_program('.text\nmain:\n    nop\n'), [])
+        with self.assertRaises(ValueError):
+            other.restore(snap)
@@ -6,6 +6,7 @@ from io import StringIO
 from numpy import float32
 
 import settings
+from settings import RunConfig
 from interpreter import exceptions as ex
 from interpreter import memory, syscalls
 from interpreter.classes import Label
@@ -565,6 +566,27 @@ $a0  0x80000000 -2147483648
         syscalls.printUnsignedInt(inter)
         self.assertEqual(mock_stdout.getvalue(), str(0x80000000))
 
+    # syscalls 40, 41
+    def test_randIntSeeded(self):
+        inters = []
+        for i in range(2):
+            inter = Interpreter([Label('main')], [])
+            inter.reg = {'$a0': 1234, '$v0': 0}
+            syscalls.setSeed(inter)
+            inter.reg['$a0'] = 1000
+            inters.append(inter)
+        # Each interpreter has its own generator, so interleaved calls do not interfere
+        syscalls.randInt(inters[0])
+        syscalls.randInt(inters[1])
+        self.assertEqual(inters[0].reg['$v0'], inters[1].reg['$v0'])
+
+    def test_runConfigPerInstance(self):
+        inter = Interpreter([Label('main')], [], RunConfig(enabled_syscalls={1}, max_instructions=5))
+        default = Interpreter([Label('main')], [])
+        self.assertEqual(inter.config.max_instructions, 5)
+        self.assertEqual(default.config.max_instructions, settings.settings['max_instructions'])
+        self.assertRaises(TypeError, RunConfig, not_a_setting=1)
+
 
 if __name__ == '__main__':
     unittest.main()